@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+
+import game_io
+import journal
+import metrics
+import parking
+import run
+import session_host
+
+
+class TerminalPort(game_io.Port):
+    """
+    A player's raw terminal stream over an asyncio connection, with the
+    same line discipline and newline translation as a TerminalSession.
+    """
+    def __init__(self, reader, writer):
+        """
+        Initialises the TerminalPort.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            The connection's incoming stream.
+        writer : asyncio.StreamWriter
+            The connection's outgoing stream.
+        """
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+        self._discipline = session_host.LineDiscipline()
+        self._output = []
+
+    def write(self, text):
+        self._output.append(session_host.terminal_output(text))
+        return len(text)
+
+    async def flush(self):
+        if not self._output or self.closed:
+            self._output.clear()
+            return
+        self.writer.write(''.join(self._output).encode('utf-8'))
+        self._output.clear()
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            self.closed = True
+
+    async def readline(self, timeout=None):
+        await self.flush()
+        return await asyncio.wait_for(self._readline(), timeout)
+
+    async def _readline(self):
+        while not self.closed:
+            line, echo = self._discipline.take_line()
+            if self._discipline.hung_up:
+                self.closed = True
+            elif echo:
+                self.writer.write(echo.encode('utf-8'))
+            if line is not None:
+                return line
+            if self.closed:
+                break
+            try:
+                data = await self.reader.read(4096)
+            except ConnectionError:
+                data = b''
+            if not data:
+                self.closed = True
+                break
+            self._discipline.feed(data)
+        return ''
+
+    def close(self):
+        self.closed = True
+
+
+class AsyncSessionHost:
+    """
+    Hosts many Game sessions as coroutines on one event loop, one per
+    connection.
+
+    Each session awaits its player's next line through a TerminalPort
+    instead of blocking a thread on input(), so an idle player costs only
+    their Game and a suspended coroutine. With a ParkingLot, idle Games
+    beyond its memory budget are parked to disk as well. Clients see the
+    same terminal protocol as from session_host.py.
+    """
+    def __init__(self, policy=None, report_interval=0, journal_dir=None,
+                 metrics_registry=None, parking_lot=None):
+        """
+        Initialises the AsyncSessionHost.
+
+        Parameters
+        ----------
+        policy : game_io.IdlePolicy, optional
+            The prompt and idle timeouts for every session. Defaults to
+            game_io.IdlePolicy().
+        report_interval : float, optional
+            Seconds between memory reports on stderr. Defaults to 0, which
+            never reports, since measuring thousands of sessions on every
+            connection would stall the loop.
+        journal_dir : str, optional
+            Records each session's inputs to a journal in this directory.
+            Defaults to None, which records nothing.
+        metrics_registry : metrics.Metrics, optional
+            Records every session's latencies here. Defaults to None, which
+            leaves sessions uninstrumented.
+        parking_lot : parking.ParkingLot, optional
+            Parks idle sessions to disk to keep within a memory budget.
+            Defaults to None, which keeps every session in memory.
+        """
+        self.policy = game_io.IdlePolicy() if policy is None else policy
+        self.report_interval = report_interval
+        self.journal_dir = journal_dir
+        self.metrics = metrics_registry
+        self.parking = parking_lot
+        # Games by session id, unless the parking lot holds them
+        self.sessions = {}
+        self.next_session_id = 1
+        self.total_sessions = 0
+        self.shared_ids = session_host._shared_object_ids()
+        game_io.install_routing()
+
+    async def handle_connection(self, reader, writer):
+        """
+        Plays one Game for the lifetime of a client connection.
+        """
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        session_id = self.next_session_id
+        self.next_session_id += 1
+        self.total_sessions += 1
+        port = TerminalPort(reader, writer)
+        game = run.Game()
+        self.sessions[session_id] = None
+        session_journal = None
+        try:
+            record = None
+            if self.journal_dir is not None:
+                session_journal = journal.Journal(
+                    os.path.join(self.journal_dir,
+                                 f"session-{session_id}.jsonl"),
+                    game.rng.seed)
+                record = session_journal.record
+            if self.metrics is not None:
+                self.metrics.instrument(game)
+            if self.parking is None:
+                self.sessions[session_id] = game
+                steps = game.play()
+            else:
+                steps = self.parking.play(game)
+            # Parking frees nothing while this frame holds the game
+            del game
+            if self.metrics is None:
+                await game_io.play(steps, port, self.policy, record)
+            else:
+                with self.metrics.session():
+                    await game_io.play(steps, port, self.policy, record)
+        except (SystemExit, EOFError):
+            pass
+        finally:
+            if session_journal is not None:
+                session_journal.close()
+            del self.sessions[session_id]
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def stats(self):
+        """
+        Reports memory use for the host process and each live session.
+
+        Returns
+        -------
+        dict
+            The process RSS, the number of live and total sessions, and
+            the mean heap estimate per resident session, with the parking
+            lot's stats when there is one.
+        """
+        if self.parking is None:
+            games = [game for game in list(self.sessions.values())
+                     if game is not None]
+        else:
+            games = self.parking.resident_games()
+        sizes = [session_host.deep_sizeof(game, self.shared_ids)
+                 for game in games]
+        stats = {
+            'pid': os.getpid(),
+            'process_rss_bytes': session_host.process_rss(),
+            'live_sessions': len(self.sessions),
+            'total_sessions': self.total_sessions,
+            'mean_session_heap_bytes': sum(sizes) // len(sizes)
+                                       if sizes else 0,
+        }
+        if self.parking is not None:
+            stats.update(self.parking.stats())
+        return stats
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            stats = self.stats()
+            stats['event'] = 'interval'
+            sys.__stderr__.write(json.dumps(stats) + '\n')
+            sys.__stderr__.flush()
+
+    async def serve(self, host, port):
+        """
+        Serves connections on an address until cancelled.
+
+        Parameters
+        ----------
+        host : str
+            The address to listen on.
+        port : int
+            The port to listen on.
+        """
+        server = await asyncio.start_server(self.handle_connection, host,
+                                            port, backlog=1024)
+        reporter = None
+        if self.report_interval:
+            reporter = asyncio.create_task(self._report_loop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+
+
+def main(argv=None):
+    """
+    Parses command line options and serves game sessions until interrupted.
+    """
+    parser = argparse.ArgumentParser(
+        description="Host thousands of Subterranean Script sessions on one"
+                    " event loop.")
+    parser.add_argument('--host', default=session_host.DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=session_host.DEFAULT_PORT)
+    parser.add_argument('--prompt-timeout', type=float,
+                        default=game_io.DEFAULT_PROMPT_TIMEOUT,
+                        help="seconds before an unanswered prompt is repeated,"
+                             " 0 for never")
+    parser.add_argument('--idle-timeout', type=float,
+                        default=game_io.DEFAULT_IDLE_TIMEOUT,
+                        help="seconds without input before disconnecting,"
+                             " 0 for never")
+    parser.add_argument('--report-interval', type=float, default=0,
+                        help="seconds between memory reports on stderr")
+    parser.add_argument('--journal-dir', default=None,
+                        help="record each session's inputs in this directory")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="serve Prometheus metrics on this local port")
+    parser.add_argument('--park-dir', default=None,
+                        help="park idle sessions in this directory to stay"
+                             " within the memory budget")
+    parser.add_argument('--memory-budget', type=float,
+                        default=parking.DEFAULT_BUDGET / 2 ** 20,
+                        help="MiB of game state to keep resident when"
+                             " parking")
+    args = parser.parse_args(argv)
+
+    registry = None
+    if args.metrics_port is not None:
+        registry = metrics.Metrics()
+        registry.serve('127.0.0.1', args.metrics_port)
+    lot = None
+    if args.park_dir is not None:
+        lot = parking.ParkingLot(
+            args.park_dir, int(args.memory_budget * 2 ** 20),
+            None if registry is None else registry.instrument, registry)
+    policy = game_io.IdlePolicy(args.prompt_timeout or None,
+                                args.idle_timeout or None)
+    host = AsyncSessionHost(policy, args.report_interval, args.journal_dir,
+                            registry, lot)
+    sys.__stderr__.write(f"Async session host listening on {args.host}:"
+                         f"{args.port}\n")
+    try:
+        asyncio.run(host.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+import objects
+import rng_service
+import simulator
+import vectorized_combat
+
+# Matrix file format version, stored in its header line
+VERSION = 1
+
+# Loadout name for a hero who left the object behind
+NO_OBJECT = None
+
+
+def loadouts():
+    """
+    Returns the objects a hero can carry into a fight: nothing, or any one
+    first layer object.
+    """
+    return [NO_OBJECT] + [obj['name'] for obj in objects.OBJECTS_FIRST_LAYER]
+
+
+def shards():
+    """
+    Returns every matchup in the matrix as an (enemy, object) pair. Each
+    shard covers the whole hero distribution.
+    """
+    return [(template['name'], loadout)
+            for template in vectorized_combat.enemy_templates()
+            for loadout in loadouts()]
+
+
+def _shard_key(enemy, loadout):
+    return f"{enemy}|{loadout}"
+
+
+def _equip(hero, loadout):
+    """
+    Applies an object's stat changes to a hero, as picking it up does.
+    """
+    if loadout is NO_OBJECT:
+        return hero
+    obj = next(obj for obj in objects.OBJECTS_FIRST_LAYER
+               if obj['name'] == loadout)
+    for stat, change in obj['stat_changes'].items():
+        setattr(hero, stat.lower(), getattr(hero, stat.lower()) + change)
+    hero.weapon = obj
+    return hero
+
+
+def run_shard(task):
+    """
+    Simulates one enemy against every hero stat line with one loadout.
+
+    Only strength and dexterity affect a fight, so the hero distribution
+    is the 4d6 drop lowest stat line for each, weighted by probability.
+    The shard's dice are seeded from the master seed and the matchup, so a
+    shard gives the same result whichever worker runs it, and when.
+
+    The vectorized engine draws every enemy action at random, so an enemy
+    whose template names another policy is refused rather than simulated
+    as if it played randomly.
+
+    Parameters
+    ----------
+    task : tuple
+        The enemy name, the object name or NO_OBJECT, the fights per hero
+        stat line, the hero's policy name from
+        vectorized_combat.POLICY_WEIGHTS, and the master seed.
+
+    Returns
+    -------
+    dict
+        The matchup's row: fights simulated and the probability weighted
+        win rate, mean turns and mean hit points the hero and enemy have
+        left.
+
+    Raises
+    ------
+    ValueError
+        If the enemy's policy is not 'random'.
+    """
+    enemy_name, loadout, fights, policy, seed = task
+    foe = simulator.create_enemy(simulator.find_enemy_template(enemy_name))
+    if foe.policy != 'random':
+        raise ValueError(f"Enemy '{enemy_name}' uses the {foe.policy!r}"
+                         " policy, but the balance matrix can only simulate"
+                         " enemies that act at random")
+    heroes = vectorized_combat.stat_line_heroes()
+    weights = np.array([weight for _, weight in heroes])
+    columns = vectorized_combat.combatant_arrays(
+        [_equip(hero, loadout) for hero, _ in heroes])
+    rng = np.random.default_rng(
+        rng_service.derive_seed(seed, 'balance', enemy_name, loadout))
+
+    # Per stat line means, simulated a few lines at a time to bound memory
+    means = {name: np.empty(len(heroes)) for name in
+             ('player_won', 'turns', 'player_hit_points', 'enemy_hit_points')}
+    per_chunk = max(1, vectorized_combat.SWEEP_CHUNK // fights)
+    for first in range(0, len(heroes), per_chunk):
+        lines = slice(first, first + per_chunk)
+        player = {name: np.repeat(column[lines], fights)
+                  for name, column in columns.items()}
+        count = len(player['hit_points']) // fights
+        enemy = vectorized_combat.repeat_combatant(foe, count * fights)
+        results = vectorized_combat.simulate(player, enemy, policy, rng=rng)
+        for name, column in means.items():
+            column[lines] = results[name].reshape(count, fights).mean(axis=1)
+
+    return {
+        'enemy': enemy_name,
+        'object': loadout,
+        'fights': len(heroes) * fights,
+        'win_rate': float(means['player_won'] @ weights),
+        'mean_turns': float(means['turns'] @ weights),
+        'mean_hit_points_left': float(means['player_hit_points'] @ weights),
+        'mean_enemy_hit_points_left':
+            float(means['enemy_hit_points'] @ weights),
+    }
+
+
+def _header(seed, fights, policy):
+    return {'version': VERSION, 'seed': seed, 'fights_per_hero': fights,
+            'policy': policy}
+
+
+def read_matrix(path, seed, fights, policy):
+    """
+    Reads the rows already written to a matrix file, so an interrupted
+    sweep can carry on.
+
+    Returns
+    -------
+    dict
+        The finished rows by shard key, empty if the file does not exist.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a matrix or was swept with other settings.
+    """
+    rows = {}
+    try:
+        file = open(path, encoding='utf-8')
+    except FileNotFoundError:
+        return rows
+    with file:
+        try:
+            header = json.loads(file.readline())
+        except ValueError:
+            raise ValueError(f"'{path}' is not a balance matrix")
+        expected = _header(seed, fights, policy)
+        if header != expected:
+            raise ValueError(f"'{path}' was swept with {header}, not"
+                             f" {expected}")
+        # A row cut short by an interruption is dropped and redone
+        for text in file:
+            if not text.endswith('\n'):
+                break
+            row = json.loads(text)
+            rows[_shard_key(row['enemy'], row['object'])] = row
+    return rows
+
+
+def sweep(path, fights=1000, seed=0, policy='random', processes=None,
+          progress=None):
+    """
+    Builds the balance matrix, sharding matchups across a process pool and
+    appending each finished row to a JSON lines file as it arrives.
+
+    Rows already in the file are kept and their shards skipped, so a sweep
+    resumes where it was interrupted. A file whose last line was cut short
+    is truncated to its complete rows first.
+
+    Parameters
+    ----------
+    path : str
+        The matrix file: a header line, then one row per matchup.
+    fights : int, optional
+        Fights per hero stat line in each matchup. Defaults to 1000.
+    seed : int, optional
+        The master seed. Defaults to 0.
+    policy : str, optional
+        The hero's policy name from vectorized_combat.POLICY_WEIGHTS.
+        Defaults to 'random'. Enemies act at random, and any enemy whose
+        template names another policy fails its shard with a ValueError.
+    processes : int, optional
+        Worker processes. Defaults to one per core.
+    progress : callable, optional
+        Called with each new row and the number of rows still to come.
+
+    Returns
+    -------
+    list of dict
+        Every row in the matrix.
+    """
+    done = read_matrix(path, seed, fights, policy)
+    pending = [(enemy, loadout, fights, policy, seed)
+               for enemy, loadout in shards()
+               if _shard_key(enemy, loadout) not in done]
+    header = json.dumps(_header(seed, fights, policy)) + '\n'
+    lines = [header] + [json.dumps(row) + '\n' for row in done.values()]
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        file.write(''.join(lines))
+    os.replace(temporary, path)
+    if not pending:
+        return list(done.values())
+    with multiprocessing.Pool(processes) as pool, \
+            open(path, 'a', encoding='utf-8') as file:
+        remaining = len(pending)
+        for row in pool.imap_unordered(run_shard, pending):
+            file.write(json.dumps(row) + '\n')
+            file.flush()
+            done[_shard_key(row['enemy'], row['object'])] = row
+            remaining -= 1
+            if progress is not None:
+                progress(row, remaining)
+    return list(done.values())
+
+
+def main(argv=None):
+    """
+    Sweeps the balance matrix from the command line and prints it as JSON.
+    """
+    parser = argparse.ArgumentParser(
+        description="Simulate every enemy against the rolled hero"
+                    " distribution, with and without each object.")
+    parser.add_argument('path', help="matrix file, resumed if it exists")
+    parser.add_argument('--fights', type=int, default=1000,
+                        help="fights per hero stat line in each matchup")
+    parser.add_argument('--policy',
+                        choices=sorted(vectorized_combat.POLICY_WEIGHTS),
+                        default='random')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=None,
+                        help="worker processes, one per core by default")
+    args = parser.parse_args(argv)
+
+    def progress(row, remaining):
+        sys.stderr.write(f"{row['enemy']} / {row['object'] or 'no object'}:"
+                         f" win rate {row['win_rate']:.3f},"
+                         f" {remaining} to go\n")
+
+    start = time.perf_counter()
+    try:
+        rows = sweep(args.path, args.fights, args.seed, args.policy,
+                     args.processes, progress)
+    except ValueError as error:
+        parser.error(str(error))
+    elapsed = time.perf_counter() - start
+    order = {key: index for index, key in
+             enumerate(_shard_key(*shard) for shard in shards())}
+    rows.sort(key=lambda row: order.get(
+        _shard_key(row['enemy'], row['object']), len(order)))
+    print(json.dumps({
+        'fights': sum(row['fights'] for row in rows),
+        'seconds': round(elapsed, 3),
+        'processes': args.processes or os.cpu_count(),
+        'matrix': rows,
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
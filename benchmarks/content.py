@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import content_packs
+
+
+def write_synthetic_pack(directory, enemies):
+    """
+    Writes a second layer pack with many generated enemies and rooms.
+    """
+    layer = os.path.join(directory, 'second_layer')
+    os.makedirs(layer)
+    pack = {
+        'layer': 'second_layer',
+        'entering_text': "The doors slam shut behind you.",
+        'rooms': [{'name': f"room {index}",
+                   'description': "A {Fore.RED}generated{Fore.RESET} room.",
+                   'prompt': "\nAs you step inside, {entering_text}"}
+                  for index in range(enemies // 10)],
+        'common_enemies': [{
+            'name': f"Generated Enemy {index}",
+            'entity_type': 'beast',
+            'strength': 1 + index % 5, 'dexterity': 2, 'constitution': 3,
+            'intelligence': 1, 'wisdom': 1, 'charisma': 1,
+            'weapon': {'name': 'claws', 'description': "Sharp claws."},
+        } for index in range(enemies)],
+    }
+    with open(os.path.join(layer, 'generated.json'), 'w') as file:
+        json.dump(pack, file)
+
+
+def _best_ms(function, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 3)
+
+
+def run_benchmark(enemies):
+    """
+    Times loading a large layer by parsing and validating its packs, and
+    by reading the compiled cache.
+
+    Returns
+    -------
+    dict
+        Milliseconds for each path and the size of the cache file.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        content_packs.CONTENT_DIR = directory
+        content_packs.CACHE_DIR = os.path.join(directory, '__cache__')
+        write_synthetic_pack(directory, enemies)
+        sources, digest = content_packs._read_sources('second_layer')
+        build_ms = _best_ms(
+            lambda: content_packs.build_layer('second_layer', sources))
+        content_packs.load_layer_uncached('second_layer')
+        cache_ms = _best_ms(
+            lambda: content_packs.load_layer_uncached('second_layer'))
+        cache_bytes = os.path.getsize(
+            content_packs._cache_path('second_layer', digest))
+    return {
+        'enemies': enemies,
+        'parse_and_validate_ms': build_ms,
+        'cached_load_ms': cache_ms,
+        'cache_bytes': cache_bytes,
+    }
+
+
+def main(argv=None):
+    """
+    Prints the content loading benchmarks as JSON.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare building content packs with loading the cache.")
+    parser.add_argument('--enemies', type=int, default=10000)
+    args = parser.parse_args(argv)
+    print(json.dumps(run_benchmark(args.enemies), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
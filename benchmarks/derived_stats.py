@@ -0,0 +1,77 @@
+import argparse
+import json
+import sys
+import timeit
+
+import rng_service
+import run
+import spawn_tables
+
+
+def _combatants():
+    """
+    Creates a rolled hero and an enemy with seeded randomness.
+    """
+    hero = run.Character('hero')
+    hero.roll_stats(rng_service.RngService(0).stream('stats'))
+    enemy = run.Enemy.from_template(
+        spawn_tables.spawn_table('guard barracks').templates[-1])
+    return hero, enemy
+
+
+def _per_call_ns(statement, number):
+    """
+    Returns the best time per call in nanoseconds over five repeats.
+    """
+    return round(min(timeit.repeat(statement, number=number, repeat=5))
+                 / number * 1e9, 1)
+
+
+def run_benchmark(number):
+    """
+    Times the attack hot path with derived stats cached and with the cache
+    cleared before every call, which is what recomputing them costs.
+
+    Returns
+    -------
+    dict
+        Nanoseconds per call for each case.
+    """
+    hero, enemy = _combatants()
+    fight = run.Fight(verbose=False)
+    fight.dodge_flags = {hero: False, enemy: False}
+
+    def attack():
+        enemy.hit_points = 1000
+        fight.attack(hero, enemy, 'quick')
+
+    def attack_uncached():
+        hero._derived_stats = enemy._derived_stats = None
+        attack()
+
+    def ac_uncached():
+        enemy._derived_stats = None
+        return enemy.calculate_ac()
+
+    return {
+        'calculate_ac_cached_ns': _per_call_ns(enemy.calculate_ac, number),
+        'calculate_ac_uncached_ns': _per_call_ns(ac_uncached, number),
+        'attack_cached_ns': _per_call_ns(attack, number),
+        'attack_uncached_ns': _per_call_ns(attack_uncached, number),
+    }
+
+
+def main(argv=None):
+    """
+    Prints the derived stat microbenchmarks as JSON.
+    """
+    parser = argparse.ArgumentParser(
+        description="Time derived stats on the attack hot path.")
+    parser.add_argument('--number', type=int, default=200000)
+    args = parser.parse_args(argv)
+    print(json.dumps(run_benchmark(args.number), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
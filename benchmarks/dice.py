@@ -0,0 +1,71 @@
+import argparse
+import json
+import random
+import sys
+import timeit
+
+import rng_service
+import simulator
+
+
+def rolls_per_second(roll, number):
+    """
+    Returns the best rate of d20 rolls per second over five repeats.
+    """
+    return round(number / min(timeit.repeat(roll, number=number, repeat=5)))
+
+
+def fights_per_second(fights, seed):
+    """
+    Returns the rate of headless fights against a Dungeon Goblin when the
+    dice come from an RngStream.
+    """
+    hero = simulator.create_hero(seed=seed)
+    enemy = simulator.create_enemy(
+        simulator.find_enemy_template('Dungeon Goblin'))
+    rng = rng_service.RngService(seed).stream('combat')
+    best = min(timeit.repeat(
+        lambda: simulator.summarise(
+            simulator.simulate_fights(hero, enemy, fights, rng=rng)),
+        number=1, repeat=3))
+    return round(fights / best)
+
+
+def run_benchmark(number, fights, seed):
+    """
+    Compares one random.randint call per die with buffered RngStream rolls,
+    and measures the combat loop that uses them.
+
+    Returns
+    -------
+    dict
+        Rolls per second for each source and fights per second.
+    """
+    stream = rng_service.RngService(seed).stream('combat')
+    generator = random.Random(seed)
+    return {
+        'randint_rolls_per_second': rolls_per_second(
+            lambda: generator.randint(1, 20), number),
+        'stream_rolls_per_second': rolls_per_second(
+            lambda: stream.roll(20), number),
+        'fights_per_second': fights_per_second(fights, seed),
+    }
+
+
+def main(argv=None):
+    """
+    Prints the dice throughput benchmarks as JSON.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure dice and combat loop throughput.")
+    parser.add_argument('--number', type=int, default=500000)
+    parser.add_argument('--fights', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(run_benchmark(args.number, args.fights, args.seed),
+                     indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import dungeon
+
+
+def walk(maze, depths, timings=None):
+    """
+    Walks a dungeon from the starting room, alternating doors, appending
+    the microseconds taken by each door choice to timings if given.
+    """
+    depth, index = 0, 0
+    for step in range(depths):
+        door = dungeon.DOORS[step % len(dungeon.DOORS)]
+        start = time.perf_counter()
+        depth, index = maze.follow(depth, index, door)
+        maze.room(depth, index)
+        if timings is not None:
+            timings.append((time.perf_counter() - start) * 1e6)
+
+
+def run_benchmark(depths, seed):
+    """
+    Measures door choices and memory while walking a dungeon to each of
+    the given depths.
+
+    Returns
+    -------
+    dict
+        Per depth walked, the median and worst microseconds per door
+        choice and the peak traced memory in KiB.
+    """
+    # Load the room and enemy templates before anything is measured
+    dungeon.Dungeon(seed).room(1, 0)
+    results = {}
+    for depth in depths:
+        timings = []
+        walk(dungeon.Dungeon(seed), depth, timings)
+        timings.sort()
+        # Traced separately, since tracing slows every allocation
+        maze = dungeon.Dungeon(seed)
+        tracemalloc.start()
+        walk(maze, depth)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[depth] = {
+            'median_us': round(timings[len(timings) // 2], 2),
+            'max_us': round(timings[-1], 2),
+            'peak_kib': round(peak / 1024, 1),
+        }
+    return results
+
+
+def main(argv=None):
+    """
+    Prints the dungeon generation benchmarks as JSON.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure lazy dungeon generation while walking deeper.")
+    parser.add_argument('--depths', type=int, nargs='+',
+                        default=[100, 1000, 10000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(run_benchmark(args.depths, args.seed), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
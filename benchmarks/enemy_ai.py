@@ -0,0 +1,182 @@
+import argparse
+import json
+import random
+import sys
+import time
+
+import enemy_ai
+import rng_service
+import run
+import simulator
+import vectorized_combat
+
+
+def decision_states(count, seed):
+    """
+    Builds seeded decision points: an enemy from every template against a
+    rolled hero, at random hit points and with the hero dodging or not.
+
+    Returns
+    -------
+    list of tuple
+        (enemy, hero, fight, enemy hit points, hero hit points) tuples.
+    """
+    picker = random.Random(seed)
+    templates = vectorized_combat.enemy_templates()
+    fight = run.Fight(verbose=False,
+                      rng=rng_service.RngService(seed).stream('combat'))
+    states = []
+    for index in range(count):
+        enemy = simulator.create_enemy(picker.choice(templates))
+        hero = simulator.create_hero(seed=seed + index)
+        hero.calculate_hit_points()
+        states.append((enemy, hero, fight,
+                       picker.randint(1, enemy.hit_points),
+                       picker.randint(1, hero.hit_points)))
+    return states
+
+
+def time_decisions(policy, states, rng, cold=False):
+    """
+    Times one decision by a policy at each state.
+
+    Parameters
+    ----------
+    cold : bool, optional
+        Empties the expectimax transposition tables before each decision,
+        so every search starts from nothing. Defaults to False.
+
+    Returns
+    -------
+    list of float
+        The microseconds each decision took, sorted.
+    """
+    timings = []
+    for index, (enemy, hero, fight, enemy_hp, hero_hp) in enumerate(states):
+        enemy.hit_points, hero.hit_points = enemy_hp, hero_hp
+        fight.dodge_flags = {enemy: False, hero: index % 2 == 1}
+        if cold:
+            enemy_ai._matchups.clear()
+        start = time.perf_counter()
+        policy(enemy, hero, fight, rng)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return timings
+
+
+def _summary(timings):
+    return {
+        'mean_us': round(sum(timings) / len(timings), 2),
+        'median_us': round(timings[len(timings) // 2], 2),
+        'p99_us': round(timings[int(len(timings) * 0.99)], 2),
+        'max_us': round(timings[-1], 2),
+    }
+
+
+def run_benchmark(count, seed):
+    """
+    Measures the decision latency of every policy in enemy_ai.POLICIES.
+
+    Expectimax is measured cold, with empty transposition tables, and then
+    warm, with the tables the cold pass and a full warming pass left.
+
+    Returns
+    -------
+    dict
+        Latency summaries by policy, and the transposition table entries
+        held after the warm pass.
+    """
+    states = decision_states(count, seed)
+    rng = rng_service.RngService(seed).stream('enemy_ai')
+    results = {}
+    for name, policy in enemy_ai.POLICIES.items():
+        if policy is enemy_ai.expectimax_policy:
+            results[f"{name} (cold)"] = _summary(
+                time_decisions(policy, states, rng, cold=True))
+            time_decisions(policy, states, rng)
+            results[f"{name} (warm)"] = _summary(
+                time_decisions(policy, states, rng))
+        else:
+            time_decisions(policy, states, rng)
+            results[name] = _summary(time_decisions(policy, states, rng))
+    results['table_entries'] = sum(len(matchup.table) for matchup
+                                   in enemy_ai._matchups.values())
+    return results
+
+
+def compare_strength(heroes, fights, seed):
+    """
+    Plays every enemy template with each policy against random players, on
+    the same heroes and dice for every policy.
+
+    Returns
+    -------
+    dict
+        The share of fights the player wins, by template and then policy.
+        The lower it is, the stronger the policy.
+    """
+    results = {}
+    for template in vectorized_combat.enemy_templates():
+        win_rates = {}
+        for name in enemy_ai.POLICIES:
+            policy = simulator.enemy_policy(name)
+            wins = 0
+            for index in range(heroes):
+                hero = simulator.create_hero(seed=seed + index)
+                hero.calculate_hit_points()
+                rng = rng_service.RngService(seed + index).stream('combat')
+                wins += sum(result.winner == 'player' for result
+                            in simulator.simulate_fights(
+                                hero, simulator.create_enemy(template),
+                                fights, simulator.random_policy, policy,
+                                rng))
+            win_rates[name] = round(wins / (heroes * fights), 4)
+        results[template['name']] = win_rates
+    return results
+
+
+def main(argv=None):
+    """
+    Prints the enemy AI decision latency benchmarks as JSON, or with
+    --strength the player win rates against each policy.
+
+    With --strength it exits with status 1 if the player beats expectimax
+    more often than greedy on any template.
+    """
+    parser = argparse.ArgumentParser(
+        description="Time one decision by each enemy AI policy.")
+    parser.add_argument('--decisions', type=int, default=2000)
+    parser.add_argument('--depth', type=int, default=enemy_ai.SEARCH_DEPTH,
+                        help="expectimax search depth in plies")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--strength', action='store_true',
+                        help="compare how often random players beat each"
+                             " policy instead of timing decisions")
+    parser.add_argument('--heroes', type=int, default=20,
+                        help="heroes per template for --strength")
+    parser.add_argument('--fights', type=int, default=200,
+                        help="fights per hero for --strength")
+    args = parser.parse_args(argv)
+    enemy_ai.SEARCH_DEPTH = args.depth
+    if args.strength:
+        results = compare_strength(args.heroes, args.fights, args.seed)
+        print(json.dumps({
+            'depth': args.depth,
+            'player_win_rates': results,
+        }, indent=2))
+        weaker = [name for name, rates in results.items()
+                  if rates['expectimax'] > rates['greedy']]
+        if weaker:
+            print(f"expectimax is weaker than greedy against: "
+                  f"{', '.join(weaker)}", file=sys.stderr)
+            return 1
+        return 0
+    print(json.dumps({
+        'depth': args.depth,
+        'policies': run_benchmark(args.decisions, args.seed),
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+import entity_table
+import run
+import spawn_tables
+import utilities
+
+
+class DictEntity:
+    """
+    Entity as it was before it had __slots__, keeping its attributes in a
+    per-instance __dict__ in the order it assigned them.
+    """
+    def __init__(self, entity_type, name, strength, dexterity, constitution,
+                 intelligence, wisdom, charisma):
+        self.entity_type = entity_type
+        self.name = name
+        self.strength = strength
+        self.dexterity = dexterity
+        self.constitution = constitution
+        self.intelligence = intelligence
+        self.wisdom = wisdom
+        self.charisma = charisma
+        self.calculate_hit_points()
+        self.weapon = None
+        self.armor_bonus = None
+        self.shield_bonus = None
+        self.other_bonuses = None
+
+    def calculate_modifier(self, ability_score):
+        return (ability_score - 5) // 2
+
+    def calculate_hit_points(self):
+        self.hit_points = (10 + self.calculate_modifier(self.constitution)
+                           + utilities.HP_TYPE_MODIFIERS.get(self.entity_type,
+                                                             0))
+
+
+class DictEnemy(DictEntity):
+    """
+    Enemy as it was before it had __slots__.
+    """
+    def __init__(self, entity_type, name, strength, dexterity, constitution,
+                 intelligence, wisdom, charisma, weapon):
+        super().__init__(entity_type, name, strength, dexterity, constitution,
+                         intelligence, wisdom, charisma)
+        self.weapon = weapon
+
+
+def _dict_enemy(enemy):
+    """
+    Creates a DictEnemy with the same stats and weapon as an Enemy.
+    """
+    return DictEnemy(enemy.entity_type, enemy.name, enemy.strength,
+                     enemy.dexterity, enemy.constitution, enemy.intelligence,
+                     enemy.wisdom, enemy.charisma, enemy.weapon)
+
+
+def _enemies(count):
+    """
+    Creates count enemies from the spawn tables.
+    """
+    rooms = list(spawn_tables.SPAWN_TABLES)
+    return [run.Enemy.generate_enemy(rooms[index % len(rooms)])
+            for index in range(count)]
+
+
+def bytes_per_entity(build, count):
+    """
+    Measures the memory allocated per entity by a builder.
+
+    Parameters
+    ----------
+    build : callable
+        Called with count and returns a container of that many entities.
+    count : int
+        The number of entities to build.
+
+    Returns
+    -------
+    float
+        The bytes allocated per entity while the result is alive.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return (after - before) / count
+
+
+def run_benchmark(count):
+    """
+    Compares bytes per entity for the layout before __slots__, slotted
+    entities and EntityTable rows.
+
+    Returns
+    -------
+    dict
+        Bytes per entity for each layout.
+    """
+    source = _enemies(count)
+    return {
+        'entities': count,
+        'dict_entity_bytes': round(bytes_per_entity(
+            lambda n: [_dict_enemy(e) for e in source[:n]], count), 1),
+        'slotted_entity_bytes': round(bytes_per_entity(_enemies, count), 1),
+        'entity_table_row_bytes': round(bytes_per_entity(
+            lambda n: entity_table.EntityTable.from_entities(source[:n]),
+            count), 1),
+    }
+
+
+def main(argv=None):
+    """
+    Prints bytes per entity for each layout as JSON, exiting with status 1
+    if slotted entities take no less memory than the layout before
+    __slots__.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure the memory cost of one entity.")
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args(argv)
+    results = run_benchmark(args.count)
+    print(json.dumps(results, indent=2))
+    if results['slotted_entity_bytes'] >= results['dict_entity_bytes']:
+        print("Slotted entities are no smaller than the layout before"
+              " __slots__", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import argparse
+import contextlib
+import json
+import sys
+
+import renderer
+import run
+
+# A play-through that visits every state, including a fight
+INPUTS = ('enter', 'help', 'return', 'hero', 'stats', 'return', 'pick up',
+          'left') + ('quick', 'heavy') * 10
+
+
+class TerminalCounter:
+    """
+    Counts the writes a line-buffered terminal stream would make: one per
+    write containing a newline and one per flush of leftover text, which is
+    how sys.stdout behaves on a tty.
+    """
+    def __init__(self):
+        self.writes = 0
+        self.bytes = 0
+        self._pending = 0
+
+    def write(self, text):
+        self._pending += len(text.encode('utf-8'))
+        if '\n' in text:
+            self._emit()
+        return len(text)
+
+    def flush(self):
+        if self._pending:
+            self._emit()
+
+    def _emit(self):
+        self.writes += 1
+        self.bytes += self._pending
+        self._pending = 0
+
+
+def _scripted_input(inputs):
+    """
+    Returns an input function that writes the prompt and flushes stdout,
+    as input() does, then answers from inputs.
+    """
+    lines = iter(inputs)
+
+    def read_input(prompt=''):
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        line = next(lines, None)
+        if line is None:
+            raise EOFError
+        return line
+    return read_input
+
+
+def count_writes(buffered, seed):
+    """
+    Plays the scripted session and counts terminal writes.
+
+    Parameters
+    ----------
+    buffered : bool
+        Whether output goes through a Renderer.
+    seed : int
+        The session's master seed.
+
+    Returns
+    -------
+    dict
+        Turns played, and writes and bytes per turn.
+    """
+    counter = TerminalCounter()
+    game = run.Game(seed)
+    game.read_input = _scripted_input(INPUTS)
+    with contextlib.redirect_stdout(counter):
+        try:
+            if buffered:
+                with renderer.buffered_output():
+                    game.run()
+            else:
+                game.run()
+        except EOFError:
+            pass
+    counter.flush()
+    turns = len(INPUTS)
+    return {
+        'turns': turns,
+        'writes_per_turn': round(counter.writes / turns, 2),
+        'bytes_per_turn': round(counter.bytes / turns, 1),
+    }
+
+
+def main(argv=None):
+    """
+    Prints writes and bytes per turn with and without the renderer.
+    """
+    parser = argparse.ArgumentParser(
+        description="Count terminal writes per turn.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps({
+        'print_calls': count_writes(False, args.seed),
+        'renderer': count_writes(True, args.seed),
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+
+import game_io
+import parking
+import run
+
+# Inputs every scripted player chooses from after creating a hero
+CHOICES = ('quick', 'heavy', 'dodge', 'left', 'right', 'pick up', 'leave',
+           'hero')
+
+
+class ScriptedPort(game_io.Port):
+    """
+    A port that answers every prompt from a fixed list of lines and
+    discards all output.
+    """
+    def __init__(self, lines):
+        self.lines = iter(lines)
+
+    def write(self, text):
+        return len(text)
+
+    async def flush(self):
+        pass
+
+    async def readline(self, timeout=None):
+        # Let every other session take its turn first
+        await asyncio.sleep(0)
+        return next(self.lines, '')
+
+
+def _script(seed, turns):
+    """
+    Returns a seeded player's lines: enter, name a hero, then random
+    choices.
+    """
+    picker = random.Random(seed)
+    return ['enter\n', 'hero\n'] + [f"{picker.choice(CHOICES)}\n"
+                                    for _ in range(turns)]
+
+
+async def _play_all(sessions, turns, seed, lot):
+    async def one(index):
+        game = run.Game(seed + index)
+        steps = game.play() if lot is None else lot.play(game)
+        del game
+        try:
+            await game_io.play(steps, ScriptedPort(_script(seed + index,
+                                                           turns)),
+                               game_io.IdlePolicy(None, None))
+        except (SystemExit, EOFError):
+            pass
+    await asyncio.gather(*(one(index) for index in range(sessions)))
+
+
+def run_benchmark(sessions, turns, budget, seed):
+    """
+    Plays interleaved sessions on one event loop, first with every session
+    resident and then under a ParkingLot, so that nearly every input
+    restores a parked session.
+
+    Returns
+    -------
+    dict
+        Inputs per second for both runs, and the lot's parks, restores and
+        mean restore time.
+    """
+    game_io.install_routing()
+    inputs = sessions * (turns + 2)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for lot in (None, parking.ParkingLot(directory, budget)):
+            start = time.perf_counter()
+            asyncio.run(_play_all(sessions, turns, seed, lot))
+            name = 'resident' if lot is None else 'parked'
+            results[f"{name}_inputs_per_second"] = round(
+                inputs / (time.perf_counter() - start), 1)
+    stats = lot.stats()
+    for key in ('parks', 'restores', 'mean_restore_ms'):
+        results[key] = stats[key]
+    return results
+
+
+def main(argv=None):
+    """
+    Prints the parking benchmarks as JSON.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure the cost of parking idle sessions to disk.")
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--turns', type=int, default=20)
+    parser.add_argument('--budget-kib', type=int, default=512,
+                        help="resident memory budget for the parked run")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    results = run_benchmark(args.sessions, args.turns,
+                            args.budget_kib * 1024, args.seed)
+    sys.__stdout__.write(json.dumps(results, indent=2) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import argparse
+import json
+import sys
+import timeit
+
+import game_states
+import run
+import snapshot
+
+
+def _session(seed):
+    """
+    Creates a session mid-game: a named hero holding a weapon, about to
+    fight an enemy, with every random stream in use.
+    """
+    game = run.Game(seed)
+    game.character.name = 'hero'
+    game.character.roll_stats(game.rng.stream('stats'))
+    game.prompt_room_pickup()
+    game.character.weapon = game.object_choice
+    game.character.object_picked_FL = True
+    game.character.stat_changes = dict(game.object_choice['stat_changes'])
+    game.depth, game.room_index = game.dungeon.follow(0, 0, 'left')
+    room = game.dungeon.room(game.depth, game.room_index)
+    game.room_choice_name = room.template['name']
+    game.enemy_instance = run.Enemy.from_template(room.enemy)
+    game.rng.stream('combat').roll(20)
+    game.rng.stream('enemy_ai').random()
+    game.state = game_states.SECOND_LAYER_STATES['FIGHT_SECOND_LAYER']
+    return game
+
+
+def _per_call_us(statement, number):
+    """
+    Returns the best time per call in microseconds over five repeats.
+    """
+    return round(min(timeit.repeat(statement, number=number, repeat=5))
+                 / number * 1e6, 2)
+
+
+def run_benchmark(number, seed):
+    """
+    Measures the size of a mid-game snapshot and how long it takes to
+    serialise and restore.
+
+    Returns
+    -------
+    dict
+        The snapshot size in bytes and microseconds per call.
+    """
+    game = _session(seed)
+    data = snapshot.snapshot(game)
+    return {
+        'snapshot_bytes': len(data),
+        'snapshot_us': _per_call_us(lambda: snapshot.snapshot(game), number),
+        'restore_us': _per_call_us(lambda: snapshot.restore(data), number),
+    }
+
+
+def main(argv=None):
+    """
+    Prints the snapshot benchmarks as JSON.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure game snapshot size and speed.")
+    parser.add_argument('--number', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(run_benchmark(args.number, args.seed), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Repository root, where run.py lives
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Text of the first prompt a new session shows
+FIRST_PROMPT = b"Ready to step into the unknown?"
+
+# Measures how long importing run takes inside a fresh interpreter
+IMPORT_SNIPPET = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import run\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def measure_import():
+    """
+    Measures importing run.py in a fresh interpreter.
+
+    Returns
+    -------
+    tuple
+        The in-process import time and the wall time of the whole
+        interpreter, both in seconds.
+    """
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', IMPORT_SNIPPET],
+                            cwd=ROOT, capture_output=True, check=True)
+    wall = time.perf_counter() - start
+    return float(output.stdout), wall
+
+
+def measure_first_prompt():
+    """
+    Measures the time from launching run.py until the first prompt is
+    written to its output.
+
+    Returns
+    -------
+    float
+        The time to first prompt in seconds.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'run.py'], cwd=ROOT,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    output = b''
+    try:
+        while FIRST_PROMPT not in output:
+            chunk = os.read(process.stdout.fileno(), 65536)
+            if not chunk:
+                raise RuntimeError("run.py exited before its first prompt")
+            output += chunk
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+        process.stdout.close()
+        process.stdin.close()
+
+
+def run_benchmark(repeats):
+    """
+    Runs the startup measurements several times and summarises them.
+
+    Parameters
+    ----------
+    repeats : int
+        How many fresh interpreters to start for each measurement.
+
+    Returns
+    -------
+    dict
+        The median and minimum of each measurement in milliseconds.
+    """
+    imports, interpreters, prompts = [], [], []
+    for _ in range(repeats):
+        import_time, interpreter_time = measure_import()
+        imports.append(import_time)
+        interpreters.append(interpreter_time)
+        prompts.append(measure_first_prompt())
+    results = {}
+    for name, samples in (('import_run', imports),
+                          ('interpreter_with_import', interpreters),
+                          ('time_to_first_prompt', prompts)):
+        results[name] = {
+            'median_ms': round(statistics.median(samples) * 1000, 3),
+            'min_ms': round(min(samples) * 1000, 3),
+        }
+    return results
+
+
+def main(argv=None):
+    """
+    Prints the startup benchmark and checks it against a budget.
+
+    Returns
+    -------
+    int
+        The exit status: 1 if the median time to first prompt exceeds the
+        budget, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure run.py import time and time to first prompt.")
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="fail if the median time to first prompt is"
+                             " slower than this")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.repeats)
+    print(json.dumps(results, indent=2))
+    first_prompt = results['time_to_first_prompt']['median_ms']
+    if args.budget_ms is not None and first_prompt > args.budget_ms:
+        print(f"Time to first prompt {first_prompt}ms exceeds the"
+              f" {args.budget_ms}ms budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,396 @@
+import argparse
+import contextlib
+import json
+import platform
+import sys
+import timeit
+
+import game_states
+import rng_service
+import run
+import spawn_tables
+
+# Timing repeats per case; the best one is kept
+REPEATS = 5
+
+# Slowdown over the baseline flagged as a regression, as a fraction
+DEFAULT_THRESHOLD = 0.10
+
+# Results file format version
+VERSION = 1
+
+# Ability scores restored before each timed turn that changes them
+ABILITIES = ('strength', 'dexterity', 'constitution', 'intelligence',
+             'wisdom', 'charisma')
+
+
+class _Discard:
+    """
+    Captures printed output and throws it away, so the suite measures
+    building the text rather than the terminal drawing it.
+    """
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _hero(seed):
+    """
+    Creates a named hero with seeded stats.
+    """
+    hero = run.Character('hero')
+    hero.roll_stats(rng_service.RngService(seed).stream('stats'))
+    hero.calculate_hit_points()
+    return hero
+
+
+def _enemy():
+    """
+    Creates the strongest guard barracks enemy.
+    """
+    return run.Enemy.from_template(
+        spawn_tables.spawn_table('guard barracks').templates[-1])
+
+
+def _fight(seed):
+    """
+    Creates a quiet Fight with seeded dice between a hero and an enemy.
+    """
+    hero, enemy = _hero(seed), _enemy()
+    fight = run.Fight(verbose=False,
+                      rng=rng_service.RngService(seed).stream('combat'))
+    fight.dodge_flags = {hero: False, enemy: False}
+    return fight, hero, enemy
+
+
+def bench_attack(seed):
+    fight, hero, enemy = _fight(seed)
+
+    def attack():
+        enemy.hit_points = 1000
+        fight.attack(hero, enemy, 'quick')
+    return attack
+
+
+def bench_initiative(seed):
+    fight, hero, enemy = _fight(seed)
+    return lambda: fight.initiative(hero, enemy)
+
+
+def bench_calculate_ac(seed):
+    return _enemy().calculate_ac
+
+
+def bench_calculate_hit_points(seed):
+    return _hero(seed).calculate_hit_points
+
+
+def bench_roll_stats(seed):
+    hero = run.Character('hero')
+    rng = rng_service.RngService(seed).stream('stats')
+    return lambda: hero.roll_stats(rng)
+
+
+def bench_generate_enemy(seed):
+    rng = rng_service.RngService(seed).stream('spawn')
+    return lambda: run.Enemy.generate_enemy('guard barracks', rng)
+
+
+def bench_print_stats(seed):
+    hero = _hero(seed)
+    stat_changes = {'Strength': 2, 'Dexterity': -1}
+    return lambda: hero.print_stats(stat_changes=stat_changes)
+
+
+def play_turn(game, user_input):
+    """
+    Plays one turn of Game.run in the game's current state: the prompt,
+    the universal commands when the state reads input, then the state's
+    handler through Game.handle_input.
+    """
+    spec = game.STATES[game.state]
+    spec.prompt(game)
+    if spec.reads_input:
+        new_state = game.handle_universal_commands(
+            user_input, game.state, game.previous_state, game.character)
+        if new_state is not None:
+            game.state = new_state
+            return
+    game.handle_input(user_input)
+
+
+def _game(seed):
+    """
+    Creates a session with a named, rolled hero standing in the starting
+    room, as if character creation had just finished.
+    """
+    game = run.Game(seed)
+    game.character.name = 'hero'
+    game.character.roll_stats(game.rng.stream('stats'))
+    game.character.calculate_hit_points()
+    return game
+
+
+def _turn(seed, state, user_input, reset=None):
+    """
+    Builds a benchmark of one turn in a state. The game is put back in the
+    state, and reset(game) undoes what the previous turn changed, before
+    each timed turn.
+    """
+    game = _game(seed)
+
+    def turn():
+        game.state = state
+        if reset is not None:
+            reset(game)
+        play_turn(game, user_input)
+    return turn
+
+
+def bench_turn_help(seed):
+    def reset(game):
+        game.previous_state = (game_states.FIRST_LAYER_STATES
+                               ['ROOM_PICKUP_FIRST_LAYER'])
+    return _turn(seed, game_states.GENERAL_GAME_STATES['HELP'], 'return',
+                 reset)
+
+
+def bench_turn_stats(seed):
+    def reset(game):
+        game.previous_state = (game_states.FIRST_LAYER_STATES
+                               ['ROOM_PICKUP_FIRST_LAYER'])
+    return _turn(seed, game_states.GENERAL_GAME_STATES['CHARACTER_STATS'],
+                 'return', reset)
+
+
+def bench_turn_initialise(seed):
+    return _turn(seed, game_states.FIRST_LAYER_STATES['INITIALISE'], None)
+
+
+def bench_turn_game_start(seed):
+    return _turn(seed, game_states.FIRST_LAYER_STATES['GAME_START'],
+                 'enter')
+
+
+def bench_turn_character_creation(seed):
+    return _turn(seed, game_states.FIRST_LAYER_STATES['CHARACTER_CREATION'],
+                 'hero')
+
+
+def bench_turn_room_pickup(seed):
+    baseline = {}
+
+    def reset(game):
+        character = game.character
+        if not baseline:
+            baseline.update((name, getattr(character, name))
+                            for name in ABILITIES)
+        for name, value in baseline.items():
+            setattr(character, name, value)
+        character.stat_changes = {}
+        character.object_picked_FL = False
+    return _turn(seed,
+                 game_states.FIRST_LAYER_STATES['ROOM_PICKUP_FIRST_LAYER'],
+                 'pick up', reset)
+
+
+def bench_turn_door_choice(seed):
+    def reset(game):
+        game.depth = game.room_index = 0
+        game.enemy_instance = None
+    return _turn(seed,
+                 game_states.FIRST_LAYER_STATES
+                 ['ROOM_DOOR_CHOICE_FIRST_LAYER'],
+                 'left', reset)
+
+
+def bench_turn_fight(seed):
+    def reset(game):
+        # Fight lengths vary, so every timed turn replays the same fight
+        game.rng = rng_service.RngService(seed)
+        game.character.calculate_hit_points()
+        game.enemy_instance = _enemy()
+        game.read_input = lambda prompt='': 'quick'
+    return _turn(seed, game_states.SECOND_LAYER_STATES['FIGHT_SECOND_LAYER'],
+                 None, reset)
+
+
+# Every case in the suite, by the name its results are stored under
+CASES = (
+    ('Fight.attack', bench_attack),
+    ('Fight.initiative', bench_initiative),
+    ('Entity.calculate_ac', bench_calculate_ac),
+    ('Entity.calculate_hit_points', bench_calculate_hit_points),
+    ('Character.roll_stats', bench_roll_stats),
+    ('Enemy.generate_enemy', bench_generate_enemy),
+    ('Character.print_stats', bench_print_stats),
+    ('turn.help', bench_turn_help),
+    ('turn.stats', bench_turn_stats),
+    ('turn.game_initialise', bench_turn_initialise),
+    ('turn.game_start', bench_turn_game_start),
+    ('turn.create_character_stats', bench_turn_character_creation),
+    ('turn.room_pickup_first_layer', bench_turn_room_pickup),
+    ('turn.room_door_choice_first_layer', bench_turn_door_choice),
+    ('turn.fight_second_layer', bench_turn_fight),
+)
+
+
+def time_case(statement, repeats=REPEATS):
+    """
+    Times a benchmark, calibrating the number of calls so each repeat runs
+    for at least 0.2 seconds.
+
+    Returns
+    -------
+    float
+        The best time per call in nanoseconds.
+    """
+    timer = timeit.Timer(statement)
+    number = timer.autorange()[0]
+    return min(timer.repeat(repeats, number)) / number * 1e9
+
+
+def run_suite(seed=0, only=None, repeats=REPEATS):
+    """
+    Runs the suite with all game output captured.
+
+    Parameters
+    ----------
+    seed : int, optional
+        Seeds every random stream the cases use. Defaults to 0.
+    only : iterable of str, optional
+        Runs just the cases whose names contain one of these strings.
+        Defaults to None, which runs every case.
+    repeats : int, optional
+        Timing repeats per case. Defaults to REPEATS.
+
+    Returns
+    -------
+    dict
+        The results document: the format version, the interpreter and
+        platform, and nanoseconds per call by case name.
+    """
+    results = {}
+    with contextlib.redirect_stdout(_Discard()):
+        for name, factory in CASES:
+            if only and not any(part in name for part in only):
+                continue
+            results[name] = round(time_case(factory(seed), repeats), 1)
+    return {
+        'version': VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ns_per_call': results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares two results documents case by case.
+
+    Parameters
+    ----------
+    baseline : dict
+        The results to judge against.
+    current : dict
+        The new results.
+    threshold : float, optional
+        The slowdown, as a fraction of the baseline time, beyond which a
+        case is flagged. Defaults to DEFAULT_THRESHOLD.
+
+    Returns
+    -------
+    dict
+        Per case in both documents, both times, the change in percent and
+        whether it is a regression, plus the names of the regressions.
+
+    Raises
+    ------
+    ValueError
+        If either document has an unsupported version.
+    """
+    for document in (baseline, current):
+        if document.get('version') != VERSION:
+            raise ValueError(f"Results version {document.get('version')}"
+                             " is not supported")
+    cases = {}
+    regressions = []
+    for name, after in current['ns_per_call'].items():
+        before = baseline['ns_per_call'].get(name)
+        if before is None:
+            continue
+        regression = after > before * (1 + threshold)
+        cases[name] = {
+            'baseline_ns': before,
+            'current_ns': after,
+            'change_percent': round((after / before - 1) * 100, 1),
+            'regression': regression,
+        }
+        if regression:
+            regressions.append(name)
+    return {'threshold_percent': round(threshold * 100, 1),
+            'cases': cases, 'regressions': regressions}
+
+
+def _load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def main(argv=None):
+    """
+    Runs the suite, or compares against a baseline, and prints JSON.
+
+    Returns
+    -------
+    int
+        The exit status: 1 if any case regressed beyond the threshold,
+        otherwise 0.
+    """
+    parser = argparse.ArgumentParser(
+        description="Time the game's hot paths and compare them against a"
+                    " saved baseline.")
+    parser.add_argument('--save', metavar='PATH',
+                        help="write the results to this file")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="flag cases slower than this results file")
+    parser.add_argument('--current', metavar='PATH',
+                        help="compare this results file instead of running"
+                             " the suite")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown fraction flagged as a regression")
+    parser.add_argument('--only', nargs='+', default=None,
+                        help="run cases whose names contain these strings")
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.current and not args.compare:
+        parser.error("--current needs --compare")
+
+    if args.current:
+        results = _load(args.current)
+    else:
+        results = run_suite(args.seed, args.only, args.repeats)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+            file.write('\n')
+    if not args.compare:
+        print(json.dumps(results, indent=2))
+        return 0
+    try:
+        report = compare(_load(args.compare), results, args.threshold)
+    except ValueError as error:
+        parser.error(str(error))
+    print(json.dumps(report, indent=2))
+    if report['regressions']:
+        print(f"{len(report['regressions'])} case(s) regressed beyond"
+              f" {report['threshold_percent']}%", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
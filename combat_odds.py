@@ -0,0 +1,372 @@
+import sys
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import enemies
+
+# Probability of quick, heavy and dodge under the named policies
+POLICY_WEIGHTS = {
+    'random': (1 / 3, 1 / 3, 1 / 3),
+    'quick': (1.0, 0.0, 0.0),
+    'heavy': (0.0, 1.0, 0.0),
+}
+
+# Base damage for quick and heavy attacks, as in Fight.attack
+BASE_DAMAGE = (5, 10)
+
+# Whose turn a state belongs to
+PLAYER_TURN, ENEMY_TURN = 0, 1
+
+# Exact answer for the start of a fight
+FightOdds = namedtuple('FightOdds', ['win_probability', 'expected_turns'])
+
+# The combat-relevant numbers of one combatant
+Combatant = namedtuple('Combatant', ['dex_mod', 'str_mod', 'ac',
+                                     'hit_points'])
+
+
+def combatant(entity):
+    """
+    Extracts the numbers that matter in a fight from an entity.
+
+    Parameters
+    ----------
+    entity : Entity
+        The character or enemy.
+
+    Returns
+    -------
+    Combatant
+        The dexterity and strength modifiers, the armour class from
+        calculate_ac and the current hit points.
+    """
+    return Combatant(entity.calculate_modifier(entity.dexterity),
+                     entity.calculate_modifier(entity.strength),
+                     entity.calculate_ac(), entity.hit_points)
+
+
+def hit_chance(attack_modifier, defender_ac, dodge_modifier=None):
+    """
+    Computes the exact chance that d20 plus a modifier reaches the
+    defender's AC, optionally raised by a d6 dodge bonus.
+
+    Parameters
+    ----------
+    attack_modifier : int
+        The attacker's ability modifier for the attack.
+    defender_ac : int
+        The defender's armour class.
+    dodge_modifier : int, optional
+        The defender's dexterity modifier when they are dodging. None
+        means the defender is not dodging.
+
+    Returns
+    -------
+    float
+        The probability that the attack hits.
+    """
+    if dodge_modifier is None:
+        targets = [defender_ac]
+    else:
+        targets = [defender_ac + roll + dodge_modifier for roll in range(1, 7)]
+    hits = 0
+    for target in targets:
+        needed = target - attack_modifier
+        hits += min(20, max(0, 21 - needed))
+    return hits / (20 * len(targets))
+
+
+def initiative_chance(player_dex_mod, enemy_dex_mod):
+    """
+    Computes the chance that the player wins initiative, ties included.
+    """
+    wins = sum(1 for player_roll in range(1, 21)
+               for enemy_roll in range(1, 21)
+               if player_roll + player_dex_mod
+               >= enemy_roll + enemy_dex_mod)
+    return wins / 400
+
+
+def _moves(attacker, defender, policy):
+    """
+    Lists the outcomes of an attacker's turn for both dodge flags.
+
+    Returns
+    -------
+    tuple
+        The probability of dodging, and for each defender dodge flag a list
+        of (probability, damage) pairs for the attacks that hit. Misses
+        are the remaining probability.
+    """
+    weights = POLICY_WEIGHTS[policy] if isinstance(policy, str) else policy
+    hits = ([], [])
+    for action, modifier in ((0, attacker.dex_mod), (1, attacker.str_mod)):
+        if not weights[action]:
+            continue
+        damage = BASE_DAMAGE[action] + modifier
+        for dodging, dodge_modifier in ((0, None), (1, defender.dex_mod)):
+            chance = hit_chance(modifier, defender.ac, dodge_modifier)
+            hits[dodging].append((weights[action] * chance, damage))
+    return weights[2], hits
+
+
+def _solve(player_dodge, player_missed, enemy_dodge, enemy_missed,
+           vectors):
+    """
+    Solves the four states sharing a pair of hit points for each vector of
+    their values after a hit.
+
+    A player's turn only leads to an enemy's turn and the other way round,
+    so the enemy's states are substituted into the player's, leaving two
+    equations solved directly.
+
+    Parameters
+    ----------
+    player_dodge, enemy_dodge : float
+        The chance of each side dodging on its turn.
+    player_missed, enemy_missed : tuple of float
+        The chance of each side missing, or not attacking, for each
+        defender dodge flag.
+    vectors : list of list of float
+        Values of the states, in the order of MatchupSolution.win, from
+        the hits out of them.
+    """
+    # (I - a) P = c, with a and c the same for every vector but for c
+    a00 = player_dodge * enemy_missed[1] + player_missed[0] * enemy_missed[0]
+    a10 = player_dodge * enemy_missed[1] + player_missed[1] * enemy_missed[0]
+    a01 = enemy_dodge * (player_dodge + player_missed[0])
+    a11 = enemy_dodge * (player_dodge + player_missed[1])
+    determinant = (1.0 - a00) * (1.0 - a11) - a01 * a10
+    solutions = []
+    for b in vectors:
+        c0 = (player_dodge * b[3] + player_missed[0] * b[2]) + b[0]
+        c1 = (player_dodge * b[3] + player_missed[1] * b[2]) + b[1]
+        p0 = ((1.0 - a11) * c0 + a01 * c1) / determinant
+        p1 = (a10 * c0 + (1.0 - a00) * c1) / determinant
+        solutions.append((p0, p1,
+                          enemy_dodge * p1 + enemy_missed[0] * p0 + b[2],
+                          enemy_dodge * p1 + enemy_missed[1] * p0 + b[3]))
+    return solutions
+
+
+class MatchupSolution:
+    """
+    Holds the exact win probability and expected remaining turns for every
+    state of one matchup.
+
+    A state is (player HP, enemy HP, whose turn, whether the defender is
+    dodging). The player whose turn it is never has a dodge of their own
+    in effect, because a dodge ends when the dodger's turn comes round.
+    """
+    def __init__(self, player, enemy, player_policy, enemy_policy):
+        """
+        Solves the matchup by dynamic programming over hit points.
+
+        Hits only ever lower hit points, so states are solved in order of
+        increasing hit points. The four states sharing a pair of hit
+        points can reach each other through misses and dodges, and are
+        solved together as a small linear system by _solve.
+
+        Parameters
+        ----------
+        player : Combatant
+            The player's combat numbers.
+        enemy : Combatant
+            The enemy's combat numbers.
+        player_policy, enemy_policy : str or tuple
+            Policy names from POLICY_WEIGHTS or (quick, heavy, dodge)
+            probabilities.
+        """
+        self.player = player
+        self.enemy = enemy
+        self.player_first = initiative_chance(player.dex_mod, enemy.dex_mod)
+        player_dodge, player_hits = _moves(player, enemy, player_policy)
+        enemy_dodge, enemy_hits = _moves(enemy, player, enemy_policy)
+
+        # win[p][e] and turns[p][e] hold the values of the four states
+        # (player turn, no dodge), (player turn, enemy dodging),
+        # (enemy turn, no dodge), (enemy turn, player dodging)
+        self.win = [[None] * (enemy.hit_points + 1)
+                    for _ in range(player.hit_points + 1)]
+        self.turns = [[None] * (enemy.hit_points + 1)
+                      for _ in range(player.hit_points + 1)]
+        # Chance of each side missing, or not attacking, by dodge flag
+        player_missed = tuple(1.0 - player_dodge - sum(
+            chance for chance, _ in hits) for hits in player_hits)
+        enemy_missed = tuple(1.0 - enemy_dodge - sum(
+            chance for chance, _ in hits) for hits in enemy_hits)
+        for p in range(1, player.hit_points + 1):
+            for e in range(1, enemy.hit_points + 1):
+                win_b = [0.0] * 4
+                turns_b = [1.0] * 4
+                for dodging in (0, 1):
+                    # Player's turn: hit the enemy, or dodge or miss
+                    row = dodging
+                    for chance, damage in player_hits[dodging]:
+                        win, turns = self._value(p, e - damage, ENEMY_TURN)
+                        win_b[row] += chance * win
+                        turns_b[row] += chance * turns
+                    # Enemy's turn: hit the player, or dodge or miss
+                    row = 2 + dodging
+                    for chance, damage in enemy_hits[dodging]:
+                        win, turns = self._value(p - damage, e, PLAYER_TURN)
+                        win_b[row] += chance * win
+                        turns_b[row] += chance * turns
+                self.win[p][e], self.turns[p][e] = _solve(
+                    player_dodge, player_missed, enemy_dodge, enemy_missed,
+                    [win_b, turns_b])
+
+    def _value(self, player_hit_points, enemy_hit_points, turn):
+        """
+        Returns the win probability and expected turns after a hit, where
+        the next actor faces no dodge.
+        """
+        if enemy_hit_points <= 0:
+            return 1.0, 0.0
+        if player_hit_points <= 0:
+            return 0.0, 0.0
+        index = 2 * turn
+        return (self.win[player_hit_points][enemy_hit_points][index],
+                self.turns[player_hit_points][enemy_hit_points][index])
+
+    def state(self, player_hit_points, enemy_hit_points, turn,
+              defender_dodging=False):
+        """
+        Looks up the exact value of any state of the fight.
+
+        Parameters
+        ----------
+        player_hit_points, enemy_hit_points : int
+            The current hit points, at most the starting hit points.
+        turn : int
+            PLAYER_TURN or ENEMY_TURN.
+        defender_dodging : bool, optional
+            Whether the combatant not on turn is dodging.
+
+        Returns
+        -------
+        FightOdds
+            The player's win probability and the expected remaining turns.
+        """
+        if enemy_hit_points <= 0:
+            return FightOdds(1.0, 0.0)
+        if player_hit_points <= 0:
+            return FightOdds(0.0, 0.0)
+        index = 2 * turn + bool(defender_dodging)
+        return FightOdds(
+            self.win[player_hit_points][enemy_hit_points][index],
+            self.turns[player_hit_points][enemy_hit_points][index])
+
+    def start(self):
+        """
+        Returns the exact odds at the start of the fight, averaging over
+        who wins initiative.
+        """
+        first = self.state(self.player.hit_points, self.enemy.hit_points,
+                           PLAYER_TURN)
+        second = self.state(self.player.hit_points, self.enemy.hit_points,
+                            ENEMY_TURN)
+        chance = self.player_first
+        return FightOdds(
+            chance * first.win_probability
+            + (1 - chance) * second.win_probability,
+            chance * first.expected_turns
+            + (1 - chance) * second.expected_turns)
+
+
+@lru_cache(maxsize=4096)
+def solve_matchup(player, enemy, player_policy='random',
+                  enemy_policy='random'):
+    """
+    Solves a matchup once and memoizes the solution.
+
+    Parameters
+    ----------
+    player, enemy : Combatant
+        The combat numbers of both sides.
+    player_policy, enemy_policy : str or tuple, optional
+        Policies as accepted by MatchupSolution. Both default to 'random'.
+
+    Returns
+    -------
+    MatchupSolution
+        The solved matchup.
+    """
+    return MatchupSolution(player, enemy, player_policy, enemy_policy)
+
+
+@lru_cache(maxsize=65536)
+def _start_odds(player, enemy, player_policy, enemy_policy):
+    return solve_matchup(player, enemy, player_policy, enemy_policy).start()
+
+
+def fight_odds(player, enemy, player_policy='random',
+               enemy_policy='random'):
+    """
+    Returns the exact chance that the player wins a fight and its expected
+    length in turns.
+
+    Parameters
+    ----------
+    player : Entity
+        The player's character.
+    enemy : Entity
+        The enemy, for example one created from enemies.COMMON_ENEMIES or
+        enemies.SPECIFIC_ENEMIES.
+    player_policy, enemy_policy : str or tuple, optional
+        Policies as accepted by MatchupSolution. Both default to 'random',
+        which is how the game picks the enemy's moves.
+
+    Returns
+    -------
+    FightOdds
+        The win probability and expected number of turns.
+    """
+    return _start_odds(combatant(player), combatant(enemy), player_policy,
+                       enemy_policy)
+
+
+def main(argv=None):
+    """
+    Prints the exact odds of a rolled hero against every enemy template.
+    """
+    # Imported here, since the game imports this module through enemy_ai
+    # and never runs main
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(
+        description="Exact win probabilities for player versus enemy.")
+    parser.add_argument('--policy', choices=sorted(POLICY_WEIGHTS),
+                        default='random')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    # Imported here, since simulator imports enemy_ai, which imports this
+    # module
+    import simulator
+    hero = simulator.create_hero(seed=args.seed)
+    rows = []
+    for template in (enemies.COMMON_ENEMIES
+                     + list(enemies.SPECIFIC_ENEMIES.values())):
+        enemy = simulator.create_enemy(template)
+        start = time.perf_counter()
+        odds = fight_odds(hero, enemy, args.policy)
+        solved = time.perf_counter() - start
+        start = time.perf_counter()
+        fight_odds(hero, enemy, args.policy)
+        cached = time.perf_counter() - start
+        rows.append({
+            'enemy': enemy.name,
+            'win_probability': odds.win_probability,
+            'expected_turns': odds.expected_turns,
+            'solve_us': round(solved * 1e6, 1),
+            'cached_query_us': round(cached * 1e6, 1),
+        })
+    print(json.dumps(rows, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
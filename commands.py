@@ -0,0 +1,133 @@
+# Commands every state that reads input understands
+UNIVERSAL_COMMANDS = ('help', 'stats', 'exit')
+
+# Commands that must be typed in full, so a stray key cannot end a session
+EXACT_COMMANDS = frozenset({'exit'})
+
+# Short forms, offered wherever the command they stand for is valid. They
+# win over prefix completion, so 'h' is a heavy attack in a fight even
+# though 'hint' starts the same way.
+ALIASES = {
+    'q': 'quick',
+    'h': 'heavy',
+    'd': 'dodge',
+    'l': 'left',
+    'r': 'right',
+    'p': 'pick up',
+    'pickup': 'pick up',
+    '?': 'help',
+    'back': 'return',
+}
+
+# Marks the node where a command ends
+_END = ''
+
+
+class CommandTrie:
+    """
+    A prefix trie of the commands valid in one state, compiled into a flat
+    table of everything a player may type for each command.
+
+    The table maps each command to itself, each alias to its command, and
+    each prefix that only one command starts with to that command. Looking
+    an input up is then a single dict access, however many commands the
+    state has.
+    """
+    def __init__(self, commands=()):
+        """
+        Initialises the CommandTrie.
+
+        Parameters
+        ----------
+        commands : iterable of str, optional
+            The commands to add. Defaults to none.
+        """
+        self._root = {}
+        self.commands = set()
+        for command in commands:
+            self.add(command)
+
+    def add(self, command):
+        """
+        Adds a command to the trie.
+
+        Raises
+        ------
+        ValueError
+            If the command is empty or not in lower case.
+        """
+        if not command or command != command.lower():
+            raise ValueError(f"Command '{command}' must be non-empty lower"
+                             " case")
+        node = self._root
+        for char in command:
+            node = node.setdefault(char, {})
+        node[_END] = command
+        self.commands.add(command)
+
+    def _complete(self, node, prefix, table):
+        """
+        Adds every unambiguous prefix below a node to the table.
+
+        Returns
+        -------
+        list of str
+            The commands that start with the node's prefix.
+        """
+        found = []
+        for char, child in node.items():
+            if char == _END:
+                found.append(child)
+            else:
+                found.extend(self._complete(child, prefix + char, table))
+        completions = [command for command in found
+                       if command not in EXACT_COMMANDS]
+        # A prefix ending in a space would be stripped before any lookup
+        if (prefix and not prefix.endswith(' ') and len(found) == 1
+                and completions):
+            table[prefix] = completions[0]
+        return found
+
+    def compile(self, aliases=ALIASES, complete=True):
+        """
+        Builds the lookup table for the trie's commands.
+
+        Parameters
+        ----------
+        aliases : dict, optional
+            Short forms by the command they stand for. Only those whose
+            command is in the trie are used. Defaults to ALIASES.
+        complete : bool, optional
+            Whether to accept aliases and unambiguous prefixes. States that
+            read free text, such as a name, pass False so that only whole
+            commands are recognised. Defaults to True.
+
+        Returns
+        -------
+        dict
+            Maps each accepted input to the command it stands for.
+        """
+        table = {}
+        if complete:
+            self._complete(self._root, '', table)
+            for alias, command in aliases.items():
+                if command in self.commands and command not in EXACT_COMMANDS:
+                    table[alias] = command
+        for command in self.commands:
+            table[command] = command
+        return table
+
+
+def resolve(table, user_input):
+    """
+    Returns the command a player's input stands for, or the input itself
+    when it is not one, such as a name or a typo.
+
+    Parameters
+    ----------
+    table : dict
+        A table from CommandTrie.compile.
+    user_input : str
+        The lower case line the player typed.
+    """
+    return table.get(user_input.strip(), user_input)
@@ -0,0 +1,437 @@
+import _thread
+import hashlib
+import importlib
+import marshal
+import os
+import sys
+
+from colorama import Fore, Back, Style
+
+# Directory holding one subdirectory of pack files per layer
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'content')
+
+# Where compiled layers are cached, overridable for read-only deployments
+CACHE_DIR = os.environ.get('CONTENT_CACHE_DIR',
+                           os.path.join(CONTENT_DIR, '__cache__'))
+
+# Bumped whenever validation or compilation changes, so stale caches miss
+SCHEMA_VERSION = 2
+
+# Layers in the order the player reaches them
+LAYERS = ('first_layer', 'second_layer')
+
+# Pack file extensions and the modules whose loads() parses them. The
+# parsers are only imported when a cache misses, which keeps them out of
+# worker startup. TOML packs need Python 3.11 or later.
+PARSERS = {'.json': 'json', '.toml': 'tomllib'}
+
+# Ability scores every enemy must define
+ABILITIES = ('strength', 'dexterity', 'constitution', 'intelligence',
+             'wisdom', 'charisma')
+
+# Markup names that text fields may use, such as {Fore.RED}
+MARKUP = {'Fore': Fore, 'Back': Back, 'Style': Style}
+
+
+def _require(condition, where, message):
+    """
+    Raises a ValueError naming where in a pack the problem is.
+    """
+    if not condition:
+        raise ValueError(f"{where}: {message}")
+
+
+def _check_text(value, where):
+    _require(isinstance(value, str), where, "must be a string")
+
+
+def _check_object(value, where):
+    _require(isinstance(value, dict), where, "must be an object")
+    for key in ('name', 'description'):
+        _check_text(value.get(key), f"{where}.{key}")
+    changes = value.get('stat_changes')
+    _require(isinstance(changes, dict), f"{where}.stat_changes",
+             "must map ability names to changes")
+    for stat, change in changes.items():
+        _require(stat.lower() in ABILITIES, f"{where}.stat_changes",
+                 f"'{stat}' is not an ability")
+        _require(isinstance(change, int), f"{where}.stat_changes.{stat}",
+                 "must be an integer")
+
+
+def _check_area(value, where):
+    _require(isinstance(value, dict), where, "must be an object")
+    _check_text(value.get('flavor_text_intro'), f"{where}.flavor_text_intro")
+    _check_strings(value.get('door_choices'), f"{where}.door_choices")
+
+
+def _check_room(value, where):
+    _require(isinstance(value, dict), where, "must be an object")
+    for key in ('name', 'description', 'prompt'):
+        _check_text(value.get(key), f"{where}.{key}")
+
+
+def _check_enemy(value, where):
+    _require(isinstance(value, dict), where, "must be an object")
+    for key in ('name', 'entity_type'):
+        _check_text(value.get(key), f"{where}.{key}")
+    for ability in ABILITIES:
+        _require(isinstance(value.get(ability), int), f"{where}.{ability}",
+                 "must be an integer")
+    weapon = value.get('weapon')
+    _require(isinstance(weapon, dict), f"{where}.weapon", "must be an object")
+    for key in ('name', 'description'):
+        _check_text(weapon.get(key), f"{where}.weapon.{key}")
+    if 'policy' in value:
+        _check_text(value['policy'], f"{where}.policy")
+
+
+def _check_weight(value, where):
+    # bool is an int, but true is not a weight; spawn tables also reject 0
+    _require(isinstance(value, (int, float)) and not isinstance(value, bool)
+             and value > 0, where, "must be a positive number")
+
+
+def _check_strings(value, where):
+    _require(isinstance(value, list)
+             and all(isinstance(item, str) for item in value), where,
+             "must be a list of strings")
+
+
+# Each top-level field a pack may define: how packs in the same layer
+# combine it, and how each entry is checked. Lists are concatenated,
+# maps are merged without overwriting, and values may only be set once.
+LIST, MAP, VALUE = 'list', 'map', 'value'
+SCHEMA = {
+    'objects': (LIST, _check_object),
+    'skill_check_objects': (LIST, _check_object),
+    'rooms': (LIST, _check_room),
+    'common_enemies': (LIST, _check_enemy),
+    'areas': (MAP, _check_area),
+    'specific_enemies': (MAP, _check_enemy),
+    'spawn_weights': (MAP, _check_weight),
+    'common_enemy_weight': (VALUE, _check_weight),
+    'specific_enemy_weight': (VALUE, _check_weight),
+    'door_choices': (VALUE, _check_strings),
+    'flavor_text': (VALUE, _check_text),
+    'entering_text': (VALUE, _check_text),
+}
+
+# Values for fields no pack in a layer sets
+DEFAULTS = {'common_enemy_weight': 1, 'specific_enemy_weight': 1}
+
+
+def validate_pack(pack, layer, where):
+    """
+    Checks one parsed pack against SCHEMA.
+
+    Parameters
+    ----------
+    pack : dict
+        The parsed pack file.
+    layer : str
+        The layer the pack's directory belongs to.
+    where : str
+        The pack's file name, used in error messages.
+
+    Raises
+    ------
+    ValueError
+        If the pack names another layer, has an unknown field, or an entry
+        is malformed.
+    """
+    _require(isinstance(pack, dict), where, "must be an object")
+    _require(pack.get('layer') == layer, where,
+             f"must declare \"layer\": \"{layer}\"")
+    for field, value in pack.items():
+        if field == 'layer':
+            continue
+        _require(field in SCHEMA, where, f"unknown field '{field}'")
+        kind, check = SCHEMA[field]
+        if kind == LIST:
+            _require(isinstance(value, list), f"{where}.{field}",
+                     "must be a list")
+            for index, entry in enumerate(value):
+                check(entry, f"{where}.{field}[{index}]")
+        elif kind == MAP:
+            _require(isinstance(value, dict), f"{where}.{field}",
+                     "must be an object")
+            for key, entry in value.items():
+                check(entry, f"{where}.{field}.{key}")
+        else:
+            check(value, f"{where}.{field}")
+
+
+def _render(text, values, where):
+    """
+    Resolves {Fore.RED}-style colour markup and shared text such as
+    {entering_text} once, so the game prints finished strings.
+    """
+    try:
+        return text.format_map(values)
+    except (KeyError, AttributeError, IndexError, ValueError) as error:
+        raise ValueError(f"{where}: bad markup in text ({error})")
+
+
+def compile_layer(layer, packs):
+    """
+    Merges a layer's validated packs and resolves their markup.
+
+    Parameters
+    ----------
+    layer : str
+        The layer name.
+    packs : list of tuple
+        (file name, parsed pack) pairs in load order.
+
+    Returns
+    -------
+    dict
+        Every SCHEMA field, with the structures the game modules expose.
+
+    Raises
+    ------
+    ValueError
+        If packs conflict, such as two defining the same map key or value.
+    """
+    compiled = {}
+    for field, (kind, _) in SCHEMA.items():
+        compiled[field] = ([] if kind == LIST else {} if kind == MAP
+                           else DEFAULTS.get(field))
+    defined = {}
+    for where, pack in packs:
+        for field, value in pack.items():
+            if field == 'layer':
+                continue
+            kind = SCHEMA[field][0]
+            if kind == LIST:
+                compiled[field].extend(value)
+            elif kind == MAP:
+                for key, entry in value.items():
+                    _require(key not in compiled[field], f"{where}.{field}",
+                             f"'{key}' is already defined")
+                    compiled[field][key] = entry
+            else:
+                _require(field not in defined, f"{where}.{field}",
+                         f"already set by {defined.get(field)}")
+                defined[field] = where
+                compiled[field] = value
+
+    values = dict(MARKUP, entering_text=compiled['entering_text'] or '')
+    for name, area in compiled['areas'].items():
+        area['flavor_text_intro'] = _render(
+            area['flavor_text_intro'], values, f"{layer}.areas.{name}")
+        # Every area offers the objects of its layer
+        area['object_choices'] = compiled['objects']
+    for index, room in enumerate(compiled['rooms']):
+        for key in ('description', 'prompt'):
+            room[key] = _render(room[key], values,
+                                f"{layer}.rooms[{index}].{key}")
+    names = [room['name'] for room in compiled['rooms']]
+    _require(len(names) == len(set(names)), layer, "room names must be unique")
+    return compiled
+
+
+def pack_files(layer):
+    """
+    Lists a layer's pack files in load order.
+    """
+    directory = os.path.join(CONTENT_DIR, layer)
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names
+            if os.path.splitext(name)[1] in PARSERS]
+
+
+def _read_sources(layer):
+    """
+    Reads a layer's pack files and hashes them with the schema version and
+    the Python version, whose marshal format the cache depends on.
+
+    Returns
+    -------
+    tuple
+        The list of (path, bytes) pairs and the hex digest.
+    """
+    digest = hashlib.sha256(
+        f"{SCHEMA_VERSION}:{sys.version_info[:2]}:{layer}".encode())
+    sources = []
+    for path in pack_files(layer):
+        with open(path, 'rb') as file:
+            data = file.read()
+        digest.update(os.path.basename(path).encode() + b'\0')
+        digest.update(hashlib.sha256(data).digest())
+        sources.append((path, data))
+    return sources, digest.hexdigest()
+
+
+def _cache_path(layer, digest):
+    return os.path.join(CACHE_DIR, f"{layer}-{digest[:24]}.marshal")
+
+
+def build_layer(layer, sources):
+    """
+    Parses, validates and compiles a layer's pack files.
+    """
+    packs = []
+    for path, data in sources:
+        where = os.path.relpath(path, CONTENT_DIR)
+        parser = importlib.import_module(
+            PARSERS[os.path.splitext(path)[1]])
+        try:
+            pack = parser.loads(data.decode('utf-8'))
+        except ValueError as error:
+            raise ValueError(f"{where}: cannot be parsed ({error})")
+        validate_pack(pack, layer, where)
+        packs.append((where, pack))
+    return compile_layer(layer, packs)
+
+
+def _write_cache(path, compiled):
+    """
+    Stores a compiled layer, replacing the file atomically. A cache that
+    cannot be written only costs the next process a rebuild.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(temporary, 'wb') as file:
+            file.write(marshal.dumps(compiled))
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def load_layer_uncached(layer):
+    """
+    Loads a layer from its compiled cache, building and caching it when the
+    packs have changed.
+
+    Parameters
+    ----------
+    layer : str
+        The layer name, one of LAYERS.
+
+    Returns
+    -------
+    dict
+        The compiled layer.
+    """
+    sources, digest = _read_sources(layer)
+    path = _cache_path(layer, digest)
+    try:
+        with open(path, 'rb') as file:
+            return marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    compiled = build_layer(layer, sources)
+    _write_cache(path, compiled)
+    return compiled
+
+
+# Layers loaded so far in this process. The lock comes from _thread, as
+# importing threading would add to the startup of single-game workers.
+_layers = {}
+_layers_lock = _thread.allocate_lock()
+
+
+def layer(name):
+    """
+    Returns a compiled layer, loading it on first use. A session only pays
+    for the layers it reaches.
+
+    Parameters
+    ----------
+    name : str
+        The layer name, one of LAYERS.
+
+    Returns
+    -------
+    dict
+        The compiled layer. Callers share it and must not modify it.
+
+    Raises
+    ------
+    ValueError
+        If the name is not a layer or its packs are invalid.
+    """
+    compiled = _layers.get(name)
+    if compiled is None:
+        if name not in LAYERS:
+            raise ValueError(f"'{name}' is not a content layer")
+        with _layers_lock:
+            compiled = _layers.get(name)
+            if compiled is None:
+                compiled = _layers[name] = load_layer_uncached(name)
+    return compiled
+
+
+def loaded_layers():
+    """
+    Returns the names of the layers loaded so far.
+    """
+    return tuple(name for name in LAYERS if name in _layers)
+
+
+def lazy_attribute(module_globals, attributes, name):
+    """
+    Resolves a module attribute from a content layer for a module-level
+    __getattr__, and stores it on the module so later lookups are direct.
+
+    Parameters
+    ----------
+    module_globals : dict
+        The calling module's globals().
+    attributes : dict
+        Maps attribute names to (layer, builder) pairs, where builder is
+        called with the compiled layer.
+    name : str
+        The attribute being looked up.
+
+    Returns
+    -------
+    object
+        The attribute's value.
+
+    Raises
+    ------
+    AttributeError
+        If the module has no such attribute.
+    """
+    if name not in attributes:
+        raise AttributeError(
+            f"module '{module_globals['__name__']}' has no attribute"
+            f" '{name}'")
+    layer_name, build = attributes[name]
+    value = module_globals[name] = build(layer(layer_name))
+    return value
+
+
+def main(argv=None):
+    """
+    Validates every layer and writes its compiled cache, so deployed
+    workers start from the cache.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Validate content packs and build their cache.")
+    parser.parse_args(argv)
+    for name in LAYERS:
+        sources, digest = _read_sources(name)
+        compiled = build_layer(name, sources)
+        _write_cache(_cache_path(name, digest), compiled)
+        print(f"{name}: {len(sources)} pack(s), {len(compiled['rooms'])}"
+              f" room(s), {len(compiled['common_enemies'])} common"
+              f" enemy(ies), {len(compiled['objects'])} object(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,40 @@
 const Pty = require('node-pty');
 const fs = require('fs');
+const net = require('net');
+
+// Address of a running session_host.py, e.g. "127.0.0.1:8765".
+// When set, every WebSocket becomes a connection to that single Python
+// process instead of a dedicated `python3 run.py` under node-pty.
+const SESSION_HOST = process.env.SESSION_HOST;
+
+// Number of pre-started warm_worker.py interpreters kept parked before the
+// intro. Zero disables the pool and every connection spawns run.py cold.
+const POOL_SIZE = parseInt(process.env.POOL_SIZE || '0');
+
+// Written by warm_worker.py once its imports have finished
+const READY_MARKER = '\x1b]0;subterranean-script-ready\x07';
+
+// Number of connect latency samples kept per spawn kind
+const METRIC_SAMPLES = 1000;
+
+var pool = {
+    idle: [],
+    warming: 0,
+    misses: 0,
+    latency: {
+        warm: [],
+        cold: []
+    }
+};
 
 exports.install = function () {
 
     ROUTE('/');
+    ROUTE('GET /pool/', poolMetrics);
     WEBSOCKET('/', socket, ['raw']);
 
+    fillPool();
+
 };
 
 function socket() {
@@ -15,24 +44,22 @@ function socket() {
 
     this.on('open', function (client) {
 
-        // Spawn terminal
-        client.tty = Pty.spawn('python3', ['run.py'], {
-            name: 'xterm-color',
-            cols: 80,
-            rows: 24,
-            cwd: process.env.PWD,
-            env: process.env
-        });
-
-        client.tty.on('exit', function (code, signal) {
-            client.tty = null;
-            client.close();
-            console.log("Process killed");
-        });
+        if (SESSION_HOST) {
+            connectSessionHost(client);
+            return;
+        }
 
-        client.tty.on('data', function (data) {
-            client.send(data);
-        });
+        var worker = pool.idle.shift();
+        if (worker) {
+            handOff(worker, client);
+            // Replenish the pool in the background
+            setImmediate(fillPool);
+        } else {
+            if (POOL_SIZE > 0) {
+                pool.misses++;
+            }
+            spawnCold(client);
+        }
 
     });
 
@@ -49,6 +76,168 @@ function socket() {
     });
 }
 
+function spawnTerminal(script) {
+    return Pty.spawn('python3', [script], {
+        name: 'xterm-color',
+        cols: 80,
+        rows: 24,
+        cwd: process.env.PWD,
+        env: process.env
+    });
+}
+
+function spawnCold(client) {
+
+    var opened = Date.now();
+    var waiting = true;
+
+    // Spawn terminal
+    client.tty = spawnTerminal('run.py');
+
+    client.tty.on('exit', function (code, signal) {
+        client.tty = null;
+        client.close();
+        console.log("Process killed");
+    });
+
+    client.tty.on('data', function (data) {
+        if (waiting) {
+            waiting = false;
+            recordLatency('cold', Date.now() - opened);
+        }
+        client.send(data);
+    });
+}
+
+function fillPool() {
+    while (pool.idle.length + pool.warming < POOL_SIZE) {
+        startWarmWorker();
+    }
+}
+
+function startWarmWorker() {
+
+    var worker = {
+        tty: spawnTerminal('warm_worker.py'),
+        ready: false,
+        client: null,
+        opened: 0,
+        waiting: true
+    };
+    pool.warming++;
+
+    worker.tty.on('data', function (data) {
+        var client = worker.client;
+        if (client) {
+            if (worker.waiting) {
+                worker.waiting = false;
+                recordLatency('warm', Date.now() - worker.opened);
+            }
+            client.send(data);
+        } else if (!worker.ready && data.indexOf(READY_MARKER) !== -1) {
+            worker.ready = true;
+            pool.warming--;
+            pool.idle.push(worker);
+        }
+    });
+
+    worker.tty.on('exit', function (code, signal) {
+        var client = worker.client;
+        if (client) {
+            client.tty = null;
+            client.close();
+            console.log("Process killed");
+            return;
+        }
+        // The worker died while parked, so take it out of the pool
+        if (worker.ready) {
+            pool.idle.splice(pool.idle.indexOf(worker), 1);
+        } else {
+            pool.warming--;
+        }
+        setTimeout(fillPool, 1000);
+    });
+}
+
+function handOff(worker, client) {
+    worker.client = client;
+    worker.opened = Date.now();
+    client.tty = worker.tty;
+    // Any line releases the parked worker into the game
+    client.tty.write('start\r');
+}
+
+function recordLatency(kind, milliseconds) {
+    var samples = pool.latency[kind];
+    samples.push(milliseconds);
+    if (samples.length > METRIC_SAMPLES) {
+        samples.shift();
+    }
+}
+
+function summarise(samples) {
+    var sorted = samples.slice().sort(function (a, b) {
+        return a - b;
+    });
+    var percentile = function (p) {
+        return sorted.length ? sorted[Math.min(sorted.length - 1,
+            Math.floor(sorted.length * p))] : null;
+    };
+    return {
+        count: sorted.length,
+        p50_ms: percentile(0.5),
+        p95_ms: percentile(0.95),
+        max_ms: sorted.length ? sorted[sorted.length - 1] : null
+    };
+}
+
+function poolMetrics() {
+    this.json({
+        size: POOL_SIZE,
+        idle: pool.idle.length,
+        warming: pool.warming,
+        misses: pool.misses,
+        time_to_first_output: {
+            warm: summarise(pool.latency.warm),
+            cold: summarise(pool.latency.cold)
+        }
+    });
+}
+
+function connectSessionHost(client) {
+
+    var address = SESSION_HOST.split(':');
+
+    // Mirror the node-pty interface so the message and close handlers
+    // work unchanged for both kinds of session.
+    var connection = net.connect(parseInt(address[1]), address[0]);
+    connection.setNoDelay(true);
+    client.tty = {
+        write: function (msg) {
+            connection.write(msg);
+        },
+        kill: function () {
+            connection.destroy();
+        }
+    };
+
+    connection.on('data', function (data) {
+        client.send(data);
+    });
+
+    connection.on('error', function (err) {
+        console.log('Session host error: ', err.message);
+    });
+
+    connection.on('close', function () {
+        if (client.tty) {
+            client.tty = null;
+            client.close();
+            console.log("Session closed");
+        }
+    });
+}
+
 if (process.env.CREDS != null) {
     console.log("Creating creds.json file.");
     fs.writeFile('creds.json', process.env.CREDS, 'utf8', function (err) {
@@ -0,0 +1,197 @@
+import random
+from array import array
+from collections import OrderedDict, namedtuple
+
+import dungeon_areas
+import rng_service
+import spawn_tables
+
+# Doors out of every room, in the order their targets are stored
+DOORS = ('left', 'right')
+
+# Number of rooms generated at each depth below the starting room
+MIN_WIDTH = 2
+MAX_WIDTH = 6
+
+# Generated layers kept in memory; older ones are regenerated on demand
+CACHED_LAYERS = 8
+
+# One generated depth of the dungeon, stored as parallel arrays indexed by
+# room. doors[room * len(DOORS) + door] is the room the door leads to at
+# the next depth.
+Layer = namedtuple('Layer', ['depth', 'rooms', 'enemies', 'doors'])
+
+# A room as the game sees it
+Room = namedtuple('Room', [
+    'depth',     # 0 for the starting room
+    'index',     # position within its depth
+    'template',  # the room's entry from dungeon_areas.ROOMS
+    'enemy',     # the spawn_tables.EnemyTemplate placed there, or None
+])
+
+
+class Dungeon:
+    """
+    A seeded, arbitrarily deep dungeon graph generated one depth at a time.
+
+    Depth 0 is the starting room. Every deeper depth holds a few rooms
+    built from the second layer room templates, each with an enemy placed
+    from its spawn table and a door for each of DOORS leading to a room one
+    depth further down. Each depth is generated from its own derived seed,
+    so any depth can be built on its own, in constant time, and rebuilt
+    identically after it has been evicted from the cache. Memory stays
+    bounded however deep a session goes.
+    """
+    def __init__(self, seed, cached_layers=CACHED_LAYERS):
+        """
+        Initialises the Dungeon.
+
+        Parameters
+        ----------
+        seed : int
+            The dungeon's seed. The same seed always builds the same
+            dungeon.
+        cached_layers : int, optional
+            How many generated depths to keep. Defaults to CACHED_LAYERS.
+        """
+        self.seed = seed
+        self.cached_layers = cached_layers
+        self._layers = OrderedDict()
+
+    def width(self, depth):
+        """
+        Returns the number of rooms at a depth.
+        """
+        if depth == 0:
+            return 1
+        return random.Random(
+            rng_service.derive_seed(self.seed, 'width', depth)).randint(
+                MIN_WIDTH, MAX_WIDTH)
+
+    def layer(self, depth):
+        """
+        Returns the generated rooms at a depth, generating them on first
+        use.
+
+        Parameters
+        ----------
+        depth : int
+            The depth, 0 for the starting room.
+
+        Returns
+        -------
+        Layer
+            The depth's rooms, enemies and door targets.
+        """
+        layer = self._layers.get(depth)
+        if layer is not None:
+            self._layers.move_to_end(depth)
+            return layer
+        layer = self._generate(depth)
+        self._layers[depth] = layer
+        if len(self._layers) > self.cached_layers:
+            self._layers.popitem(last=False)
+        return layer
+
+    def _generate(self, depth):
+        """
+        Builds one depth from its own derived seed.
+        """
+        rng = random.Random(rng_service.derive_seed(self.seed, 'layer',
+                                                    depth))
+        width = self.width(depth)
+        next_width = self.width(depth + 1)
+        templates = _room_templates()
+        enemy_indexes = _enemy_templates()[1]
+        rooms = array('H')
+        placed = array('H')
+        doors = array('H')
+        for _ in range(width):
+            if depth == 0:
+                # The starting room has no template index or enemy
+                rooms.append(0)
+                placed.append(0)
+            else:
+                room = rng.randrange(len(templates))
+                enemy = spawn_tables.spawn_table(
+                    templates[room]['name']).sample(rng)
+                rooms.append(room)
+                placed.append(enemy_indexes[enemy.name])
+            for _ in DOORS:
+                doors.append(rng.randrange(next_width))
+        return Layer(depth, rooms, placed, doors)
+
+    def room(self, depth, index):
+        """
+        Returns a room by its position.
+
+        Parameters
+        ----------
+        depth : int
+            The room's depth.
+        index : int
+            The room's position within its depth.
+
+        Returns
+        -------
+        Room
+            The room, its template and its enemy.
+        """
+        if depth == 0:
+            return Room(0, 0,
+                        dungeon_areas.ROOMS['first_layer']['starting_room'],
+                        None)
+        layer = self.layer(depth)
+        return Room(depth, index, _room_templates()[layer.rooms[index]],
+                    _enemy_templates()[0][layer.enemies[index]])
+
+    def follow(self, depth, index, door):
+        """
+        Returns the position a door leads to.
+
+        Parameters
+        ----------
+        depth : int
+            The depth of the room the player is in.
+        index : int
+            The room's position within its depth.
+        door : str
+            One of DOORS.
+
+        Returns
+        -------
+        tuple
+            The (depth, index) of the room behind the door.
+        """
+        doors = self.layer(depth).doors
+        return depth + 1, doors[index * len(DOORS) + DOORS.index(door)]
+
+
+def _room_templates():
+    """
+    Returns the room templates deeper rooms are built from.
+    """
+    return dungeon_areas.ROOMS_SECOND_LAYER
+
+
+# Built on first use, with the second layer's content
+_enemy_template_index = None
+
+
+def _enemy_templates():
+    """
+    Returns every spawnable enemy template in a stable order, so placed
+    enemies can be stored as indexes, and the indexes by enemy name.
+    """
+    global _enemy_template_index
+    if _enemy_template_index is None:
+        templates = []
+        indexes = {}
+        for table in (spawn_tables.COMMON_SPAWN_TABLE,
+                      *spawn_tables.SPAWN_TABLES.values()):
+            for template in table.templates:
+                if template.name not in indexes:
+                    indexes[template.name] = len(templates)
+                    templates.append(template)
+        _enemy_template_index = tuple(templates), indexes
+    return _enemy_template_index
@@ -1,99 +1,70 @@
-import objects
-import enemies
-from colorama import Fore, Back, Style, init
-# init colorama
-init()
+from collections.abc import Mapping
+from operator import itemgetter
 
-'''
-A description that encapsulates the sensation of entering a room,
-emphasizing the closing of doors and the feeling of entrapment.
-'''
-entering_room_flavour_text = (
-    "a chill runs down your spine. The ominous\n"
-    "creaking of metal reverberates through the air,"
-    " and with a thunderous crash,\n"
-    "bars slide down, sealing the doors behind you shut.\n"
-    "\nYour heart pounds in your chest as you notice two other doors in the"
-    " shadowy\n"
-    "corners of the room, only to watch as they too are sealed shut"
-    " by sliding\n"
-    "metal bars."
-)
+import content_packs
 
-'''
-Definition of rooms in the second layer of the dungeon. Each room contains a
-unique name and description, and a prompt that combines the specific setting
-with the shared flavor text for entering a room.
-'''
-ROOMS_SECOND_LAYER = [
-    {
-        "name": "torture chamber",
-        "description": ("A grim room filled with instruments of pain and"
-                        " torment, echoes of past\n"
-                        "suffering linger in the air."),
-        "prompt": (f"\nAs you step into the chamber,"
-                   f" {entering_room_flavour_text}")
-    },
-    {
-        "name": "alchemist's lab",
-        "description": ("Shelves lined with mysterious potions and alchemical"
-                        " tools.\n"
-                        "The scent of strange chemicals fills the room."),
-        "prompt": (f"\nAs you step into the lab,"
-                   f" {entering_room_flavour_text}")
-    },
-    {
-        "name": "guard barracks",
-        "description": ("A room containing bunks and personal belongings of"
-                        " the dungeon's guards.\nIt's eerily quiet."),
-        "prompt": (f"\nAs you step into the barracks,"
-                   f"{entering_room_flavour_text}")
-    },
-    {
-        "name": "crypt of forgotten souls",
-        "description": ("A dimly lit crypt, filled with ancient coffins and"
-                        " marked by an unsettling\nstillness."),
-        "prompt": (f"\nAs you step into the crypt,"
-                   f"{entering_room_flavour_text}")
-    },
-    {
-        "name": "underground lake",
-        "description": ("A subterranean lake, its dark waters reflecting"
-                        " the flicker of distant torches.\n"
-                        "Something moves beneath the surface."),
-        "prompt": (f"\nAs you step into the cavern,"
-                   f"{entering_room_flavour_text}")
+
+def _second_layer_rooms(layer):
+    """
+    Builds the details for rooms in the second layer.
+    """
+    return {
+        'rooms': layer['rooms'],
+        'object_choices': layer['objects'],
+        'door_choices': layer['door_choices'],
+        'flavor_text': layer['flavor_text'],
+        'common_enemies': layer['common_enemies'],
+        'specific_enemies': layer['specific_enemies'],
     }
-]
 
-# Room dictionary that will contain all layers
-ROOMS = {
-    'first_layer': {
-        # Details for the starting room in the first layer
-        'starting_room': {
-            'object_choices': objects.OBJECTS_FIRST_LAYER,
-            'door_choices': ['left', 'right'],
-            'flavor_text_intro': (
-                "\nAwakening in a room, a sense of déjà vu strikes you...\n"
-                "Have you visited this place before?\n"
-                "A shroud of darkness wraps the space, its cold grip only\n"
-                "punctuated by the echoing drip of " + Fore.WHITE + Back.BLUE
-                + "water" + Fore.RESET + Back.RESET + " against stone"
-                " walls.\n"
-                "In the feeble light, an inscription comes to view on your"
-                " arm,\n"
-                + Fore.WHITE + Back.RED + "etched" + Fore.RESET + Back.RESET +
-                " crudely by an apparent blade.\n"
-            ),
-        },
-    },
-    'second_layer': {
-        # Details for rooms in the second layer
-        'rooms': ROOMS_SECOND_LAYER,
-        'object_choices': objects.OBJECTS_SECOND_LAYER,
-        'door_choices': ['left', 'right'],
-        'flavor_text': "You find yourself in a new room...",
-        'common_enemies': enemies.COMMON_ENEMIES,
-        'specific_enemies': enemies.SPECIFIC_ENEMIES,
-    },
+
+# How each layer's entry in ROOMS is built from its content
+_LAYER_ROOMS = {
+    # Named areas of the first layer, such as the starting room
+    'first_layer': itemgetter('areas'),
+    'second_layer': _second_layer_rooms,
 }
+
+
+class _Rooms(Mapping):
+    """
+    Room dictionary that will contain all layers. A layer's content is only
+    loaded when its rooms are first looked up.
+    """
+    def __init__(self):
+        self._built = {}
+
+    def __getitem__(self, name):
+        rooms = self._built.get(name)
+        if rooms is None:
+            if name not in _LAYER_ROOMS:
+                raise KeyError(name)
+            rooms = self._built[name] = _LAYER_ROOMS[name](
+                content_packs.layer(name))
+        return rooms
+
+    def __iter__(self):
+        return iter(_LAYER_ROOMS)
+
+    def __len__(self):
+        return len(_LAYER_ROOMS)
+
+
+ROOMS = _Rooms()
+
+# Rooms and text are defined in the content packs under content/ and
+# loaded with their layer the first time they are used.
+_ATTRIBUTES = {
+    # Definition of rooms in the second layer of the dungeon. Each room
+    # contains a unique name and description, and a prompt that combines
+    # the specific setting with the shared flavor text for entering a room.
+    'ROOMS_SECOND_LAYER': ('second_layer', itemgetter('rooms')),
+    # A description that encapsulates the sensation of entering a room,
+    # emphasizing the closing of doors and the feeling of entrapment.
+    'entering_room_flavour_text': ('second_layer',
+                                   itemgetter('entering_text')),
+}
+
+
+def __getattr__(name):
+    return content_packs.lazy_attribute(globals(), _ATTRIBUTES, name)
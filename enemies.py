@@ -1,131 +1,36 @@
-# Enemy dictionary that will contain all enemies
-ENEMIES = {
-    "common_enemies": [
-        # Common enemies that can be encountered in various locations
-        {
-            "name": "Dungeon Rat",
-            "entity_type": "beast",
-            "strength": 2,
-            "dexterity": 3,
-            "constitution": 2,
-            "intelligence": 1,
-            "wisdom": 1,
-            "charisma": 1,
-            "weapon": {
-                "name": "teeth",
-                "description": "Sharp little teeth."
-            }
-        },
-        {
-            "name": "Cave Spider",
-            "entity_type": "beast",
-            "strength": 3,
-            "dexterity": 5,
-            "constitution": 3,
-            "intelligence": 1,
-            "wisdom": 2,
-            "charisma": 1,
-            "weapon": {
-                "name": "venomous bite",
-                "description": "A bite that injects painful venom."
-            }
-        },
-        {
-            "name": "Dungeon Goblin",
-            "entity_type": "humanoid",
-            "strength": 4,
-            "dexterity": 4,
-            "constitution": 4,
-            "intelligence": 2,
-            "wisdom": 2,
-            "charisma": 2,
-            "weapon": {
-                "name": "crude club",
-                "description": "A simple and roughly-made wooden club."
-                }
-        }
-    ],
-    # Specific enemies associated with particular locations
-    "torture chamber": {
-        "name": "Tortured Spirit",
-        "entity_type": "spirit",
-        "strength": 4,
-        "dexterity": 4,
-        "constitution": 3,
-        "intelligence": 3,
-        "wisdom": 5,
-        "charisma": 1,
-        "weapon": {
-            "name": "ethereal chains",
-            "description": "Ethereal chains that bind and choke."
-        }
-    },
-    "alchemist's lab": {
-        "name": "Mutated Alchemist",
-        "entity_type": "humanoid",
-        "strength": 3,
-        "dexterity": 4,
-        "constitution": 5,
-        "intelligence": 6,
-        "wisdom": 4,
-        "charisma": 2,
-        "weapon": {
-            "name": "potion bombs",
-            "description": "Explosive concoctions with various effects."
-        }
-    },
-    "guard barracks": {
-        "name": "Undead Guard",
-        "entity_type": "undead",
-        "strength": 5,
-        "dexterity": 3,
-        "constitution": 4,
-        "intelligence": 2,
-        "wisdom": 2,
-        "charisma": 1,
-        "weapon": {
-            "name": "rusty sword",
-            "description": "A sword worn with age and neglect."
-        }
-    },
-    "crypt of forgotten souls": {
-        "name": "Restless Wraith",
-        "entity_type": "wraith",
-        "strength": 3,
-        "dexterity": 5,
-        "constitution": 3,
-        "intelligence": 4,
-        "wisdom": 5,
-        "charisma": 4,
-        "weapon": {
-            "name": "chill touch",
-            "description": "A ghostly touch that freezes the soul."
-        }
-    },
-    "underground lake": {
-        "name": "Water Horror",
-        "entity_type": "aquatic",
-        "strength": 6,
-        "dexterity": 3,
-        "constitution": 5,
-        "intelligence": 2,
-        "wisdom": 1,
-        "charisma": 1,
-        "weapon": {
-            "name": "tentacles",
-            "description": "Long, slimy tentacles that grab and constrict."
-        }
-    }
-}
+from operator import itemgetter
+
+import content_packs
+
 
-# Extracting the common enemies
-COMMON_ENEMIES = ENEMIES["common_enemies"]
+def _enemies(layer):
+    """
+    Builds the enemy dictionary: the common enemies under
+    "common_enemies", and each room's specific enemy under the room name.
+    """
+    return {"common_enemies": layer['common_enemies'],
+            **layer['specific_enemies']}
 
-# Extracting the specific enemies
-SPECIFIC_ENEMIES = {
-    "torture chamber": ENEMIES["torture chamber"],
-    "alchemist's lab": ENEMIES["alchemist's lab"],
-    "guard barracks": ENEMIES["guard barracks"],
-    "crypt of forgotten souls": ENEMIES["crypt of forgotten souls"],
-    "underground lake": ENEMIES["underground lake"]
+
+# Enemies are defined in the content packs under content/ and loaded with
+# the second layer the first time one is used.
+_ATTRIBUTES = {
+    # Enemy dictionary that will contain all enemies
+    'ENEMIES': ('second_layer', _enemies),
+    # Common enemies that can be encountered in various locations
+    'COMMON_ENEMIES': ('second_layer', itemgetter('common_enemies')),
+    # Enemies specific to a room, by room name
+    'SPECIFIC_ENEMIES': ('second_layer', itemgetter('specific_enemies')),
+    # Spawn weights used when a room's spawn table is compiled. Each common
+    # enemy and the room's specific enemy get their group's weight unless
+    # ENEMY_SPAWN_WEIGHTS overrides it by name.
+    'COMMON_ENEMY_WEIGHT': ('second_layer',
+                            itemgetter('common_enemy_weight')),
+    'SPECIFIC_ENEMY_WEIGHT': ('second_layer',
+                              itemgetter('specific_enemy_weight')),
+    'ENEMY_SPAWN_WEIGHTS': ('second_layer', itemgetter('spawn_weights')),
 }
+
+
+def __getattr__(name):
+    return content_packs.lazy_attribute(globals(), _ATTRIBUTES, name)
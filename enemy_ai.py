@@ -0,0 +1,228 @@
+from collections import OrderedDict
+
+import combat_odds
+
+# Policy every enemy uses unless its template names another
+DEFAULT_POLICY = 'random'
+
+# Plies the expectimax policy looks ahead: its own turn and the player's
+# reply each count as one
+SEARCH_DEPTH = 6
+
+# Matchups whose transposition tables are kept; the least recently used
+# is dropped first
+CACHED_MATCHUPS = 1024
+
+# Whose turn a search state belongs to
+ACTOR_TURN, OPPONENT_TURN = 0, 1
+
+
+def random_policy(actor, opponent, fight, rng):
+    """
+    Picks an action uniformly at random, as enemies always used to.
+    """
+    return rng.choice(fight.ACTIONS)
+
+
+class _Matchup:
+    """
+    The dice odds of one actor against one opponent, with the search's
+    transposition table for them.
+
+    Attacks are (action, damage, chance to hit, chance to hit a dodging
+    defender) tuples.
+    """
+    __slots__ = ('actor', 'opponent', 'actor_attacks', 'opponent_attacks',
+                 'table', 'odds')
+
+    def __init__(self, actor, opponent):
+        self.actor = actor
+        self.opponent = opponent
+        self.actor_attacks = _attacks(actor, opponent)
+        self.opponent_attacks = _attacks(opponent, actor)
+        # (actor HP, opponent HP, turn, defender dodging, plies) -> value
+        self.table = {}
+        # The exact odds of the fight played out at random from every pair
+        # of hit points up to those it was solved for
+        self.odds = None
+
+    def solve(self, actor_hp, opponent_hp):
+        """
+        Makes sure the exact odds cover fights from the given hit points
+        down, solving them again for more hit points if needed. Since the
+        matchup key leaves hit points out, they are solved for the most
+        seen on either side.
+        """
+        odds = self.odds
+        if odds is not None:
+            if (actor_hp <= odds.player.hit_points
+                    and opponent_hp <= odds.enemy.hit_points):
+                return
+            actor_hp = max(actor_hp, odds.player.hit_points)
+            opponent_hp = max(opponent_hp, odds.enemy.hit_points)
+        self.odds = combat_odds.solve_matchup(
+            self.actor._replace(hit_points=actor_hp),
+            self.opponent._replace(hit_points=opponent_hp))
+
+    def leaf_value(self, actor_hp, opponent_hp, turn, dodging):
+        """
+        Scores a state the search does not look past by the actor's exact
+        chance of winning from it, as 2 * p - 1 so that it matches the
+        values of won and lost states. Both sides are taken to act at
+        random from then on.
+        """
+        # ACTOR_TURN and OPPONENT_TURN match the solver's PLAYER_TURN and
+        # ENEMY_TURN, with the actor in the player's place
+        return 2 * self.odds.state(actor_hp, opponent_hp, turn,
+                                   dodging).win_probability - 1
+
+
+def _attacks(attacker, defender):
+    """
+    Lists an attacker's quick and heavy attacks against a defender, using
+    the same hit rules as Fight.attack.
+    """
+    attacks = []
+    for action, base_damage, modifier in (
+            ('quick', combat_odds.BASE_DAMAGE[0], attacker.dex_mod),
+            ('heavy', combat_odds.BASE_DAMAGE[1], attacker.str_mod)):
+        attacks.append((action, base_damage + modifier,
+                        combat_odds.hit_chance(modifier, defender.ac),
+                        combat_odds.hit_chance(modifier, defender.ac,
+                                               defender.dex_mod)))
+    return tuple(attacks)
+
+
+# Matchups by the combat numbers of both sides, without hit points
+_matchups = OrderedDict()
+
+
+def _matchup(actor, opponent):
+    """
+    Returns the cached _Matchup for two entities, building it on first use.
+    """
+    actor_key = (actor.dexterity_modifier, actor.strength_modifier,
+                 actor.calculate_ac())
+    opponent_key = (opponent.dexterity_modifier, opponent.strength_modifier,
+                    opponent.calculate_ac())
+    key = actor_key + opponent_key
+    matchup = _matchups.get(key)
+    if matchup is not None:
+        _matchups.move_to_end(key)
+    else:
+        matchup = _matchups[key] = _Matchup(
+            combat_odds.Combatant(*actor_key, None),
+            combat_odds.Combatant(*opponent_key, None))
+        if len(_matchups) > CACHED_MATCHUPS:
+            _matchups.popitem(last=False)
+    return matchup
+
+
+def greedy_policy(actor, opponent, fight, rng):
+    """
+    Picks the attack with the highest expected damage this turn, allowing
+    for the opponent's dodge. It never dodges.
+    """
+    dodging = fight.dodge_flags.get(opponent, False)
+    best_action, best_damage = None, None
+    for action, damage, chance, dodge_chance in _matchup(
+            actor, opponent).actor_attacks:
+        expected = (dodge_chance if dodging else chance) * damage
+        if best_damage is None or expected > best_damage:
+            best_action, best_damage = action, expected
+    return best_action
+
+
+def _search(matchup, actor_hp, opponent_hp, turn, dodging, plies):
+    """
+    Returns the expectimax value of a fight state for the actor, from -1
+    for a certain loss to 1 for a certain win.
+
+    The actor picks its best action. The opponent is modelled as picking
+    each action with equal chance, as the random player policy does. When
+    the search runs out of plies the state is scored by the actor's exact
+    chance of winning it from combat_odds.
+    """
+    if opponent_hp <= 0:
+        return 1.0
+    if actor_hp <= 0:
+        return -1.0
+    if plies == 0:
+        return matchup.leaf_value(actor_hp, opponent_hp, turn, dodging)
+    key = (actor_hp, opponent_hp, turn, dodging, plies)
+    value = matchup.table.get(key)
+    if value is not None:
+        return value
+    plies -= 1
+    if turn == ACTOR_TURN:
+        value = _search(matchup, actor_hp, opponent_hp, OPPONENT_TURN, True,
+                        plies)
+        miss = _search(matchup, actor_hp, opponent_hp, OPPONENT_TURN, False,
+                       plies)
+        for _, damage, chance, dodge_chance in matchup.actor_attacks:
+            hit = dodge_chance if dodging else chance
+            value = max(value, hit * _search(matchup, actor_hp,
+                                             opponent_hp - damage,
+                                             OPPONENT_TURN, False, plies)
+                        + (1 - hit) * miss)
+    else:
+        value = _search(matchup, actor_hp, opponent_hp, ACTOR_TURN, True,
+                        plies)
+        miss = _search(matchup, actor_hp, opponent_hp, ACTOR_TURN, False,
+                       plies)
+        for _, damage, chance, dodge_chance in matchup.opponent_attacks:
+            hit = dodge_chance if dodging else chance
+            value += (hit * _search(matchup, actor_hp - damage, opponent_hp,
+                                    ACTOR_TURN, False, plies)
+                      + (1 - hit) * miss)
+        value /= 3
+    matchup.table[key] = value
+    return value
+
+
+def expectimax_policy(actor, opponent, fight, rng, depth=None):
+    """
+    Picks the action with the best expectimax value over the next few
+    turns of the Fight dice rules.
+
+    Values are memoized in a transposition table per matchup, keyed on
+    both hit points, whose turn it is, the defender's dodge and the plies
+    left. Later turns of the same fight, and later fights against similar
+    heroes, mostly look values up instead of searching again.
+
+    Parameters
+    ----------
+    depth : int, optional
+        The plies to search. Defaults to SEARCH_DEPTH.
+    """
+    matchup = _matchup(actor, opponent)
+    dodging = fight.dodge_flags.get(opponent, False)
+    actor_hp, opponent_hp = actor.hit_points, opponent.hit_points
+    # Solved from full health, so the rest of the fight reuses the odds
+    matchup.solve(max(actor_hp, actor.max_hit_points),
+                  max(opponent_hp, opponent.max_hit_points))
+    plies = (SEARCH_DEPTH if depth is None else depth) - 1
+    best_action = 'dodge'
+    best_value = _search(matchup, actor_hp, opponent_hp, OPPONENT_TURN, True,
+                         plies)
+    miss = _search(matchup, actor_hp, opponent_hp, OPPONENT_TURN, False,
+                   plies)
+    for action, damage, chance, dodge_chance in matchup.actor_attacks:
+        hit = dodge_chance if dodging else chance
+        value = (hit * _search(matchup, actor_hp, opponent_hp - damage,
+                               OPPONENT_TURN, False, plies)
+                 + (1 - hit) * miss)
+        if value >= best_value:
+            best_action, best_value = action, value
+    return best_action
+
+
+# Policies selectable by name in an enemy template's 'policy' field. Each
+# is called as policy(actor, opponent, fight, rng) and returns one of
+# Fight.ACTIONS.
+POLICIES = {
+    'random': random_policy,
+    'greedy': greedy_policy,
+    'expectimax': expectimax_policy,
+}
+
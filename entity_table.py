@@ -0,0 +1,150 @@
+from array import array
+
+import utilities
+
+# Ability scores stored as signed byte columns
+ABILITIES = ('strength', 'dexterity', 'constitution', 'intelligence',
+             'wisdom', 'charisma')
+
+# Equipment bonuses stored as signed byte columns, None is stored as 0
+BONUSES = ('armor_bonus', 'shield_bonus', 'other_bonuses')
+
+
+class EntityTable:
+    """
+    Stores many entities as typed columns instead of one object each.
+
+    Every row holds an entity's type, name, ability scores, hit points and
+    equipment bonuses. Ability scores and bonuses use one byte each and hit
+    points two bytes, so a row costs a small fraction of an Entity object.
+    The columns are array.array instances and can be handed to NumPy
+    without copying.
+    """
+    def __init__(self):
+        """
+        Initialises an empty EntityTable.
+        """
+        self.entity_types = []
+        self.names = []
+        self.weapons = []
+        self.type_codes = array('B')
+        self.name_codes = array('H')
+        self.weapon_codes = array('H')
+        self.hit_points = array('h')
+        for column in ABILITIES + BONUSES:
+            setattr(self, column, array('b'))
+        self._type_index = {}
+        self._name_index = {}
+        self._weapon_index = {}
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    @classmethod
+    def from_entities(cls, entities):
+        """
+        Builds a table holding a copy of each entity's state.
+
+        Parameters
+        ----------
+        entities : iterable of Entity
+            The entities to copy.
+
+        Returns
+        -------
+        EntityTable
+            The filled table.
+        """
+        table = cls()
+        for entity in entities:
+            table.append(entity)
+        return table
+
+    def append(self, entity):
+        """
+        Copies an entity's state into a new row.
+
+        Parameters
+        ----------
+        entity : Entity
+            The entity to copy.
+
+        Returns
+        -------
+        int
+            The index of the new row.
+        """
+        # Types, names and weapons are shared, so rows store small codes
+        self.type_codes.append(self._intern(self.entity_types,
+                                            self._type_index,
+                                            entity.entity_type))
+        self.name_codes.append(self._intern(self.names, self._name_index,
+                                            entity.name))
+        self.weapon_codes.append(self._intern(self.weapons,
+                                              self._weapon_index,
+                                              entity.weapon))
+        self.hit_points.append(entity.hit_points)
+        for ability in ABILITIES:
+            getattr(self, ability).append(getattr(entity, ability))
+        for bonus in BONUSES:
+            getattr(self, bonus).append(getattr(entity, bonus) or 0)
+        return len(self.type_codes) - 1
+
+    @staticmethod
+    def _intern(values, index, value):
+        """
+        Returns the code for a shared value, adding it if it is new.
+        Weapons are dictionaries, so they are keyed by identity.
+        """
+        key = id(value) if isinstance(value, dict) else value
+        code = index.get(key)
+        if code is None:
+            code = index[key] = len(values)
+            values.append(value)
+        return code
+
+    def modifier(self, ability, row):
+        """
+        Returns the ability modifier for one row, as
+        Entity.calculate_modifier does.
+        """
+        return (getattr(self, ability)[row] - 5) // 2
+
+    def calculate_ac(self, row):
+        """
+        Returns the armour class of one row, as Entity.calculate_ac does.
+        """
+        entity_type = self.entity_types[self.type_codes[row]]
+        return (self.modifier('dexterity', row)
+                + utilities.AC_TYPE_MODIFIERS.get(entity_type, 0)
+                + self.armor_bonus[row] + self.shield_bonus[row]
+                + self.other_bonuses[row])
+
+    def ac_column(self):
+        """
+        Computes the armour class of every row at once.
+
+        Returns
+        -------
+        array.array
+            The armour classes, one per row.
+        """
+        type_ac = [utilities.AC_TYPE_MODIFIERS.get(entity_type, 0)
+                   for entity_type in self.entity_types]
+        return array('h', [
+            (dexterity - 5) // 2 + type_ac[code] + armor + shield + other
+            for dexterity, code, armor, shield, other in zip(
+                self.dexterity, self.type_codes, self.armor_bonus,
+                self.shield_bonus, self.other_bonuses)])
+
+    def name(self, row):
+        """
+        Returns the name of one row.
+        """
+        return self.names[self.name_codes[row]]
+
+    def weapon(self, row):
+        """
+        Returns the weapon of one row.
+        """
+        return self.weapons[self.weapon_codes[row]]
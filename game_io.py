@@ -0,0 +1,241 @@
+import asyncio
+import contextvars
+import sys
+
+# The port of the session whose code is running in the current task
+_current_port = contextvars.ContextVar('current_port', default=None)
+
+# Seconds to wait on a prompt before reminding the player of it
+DEFAULT_PROMPT_TIMEOUT = 120
+
+# Seconds without any input before a session is disconnected
+DEFAULT_IDLE_TIMEOUT = 900
+
+
+class IdleDisconnect(EOFError):
+    """
+    Raised when a player has sent nothing for longer than the idle
+    timeout. It is an EOFError, so it ends a session as a hang up does.
+    """
+
+
+class Port:
+    """
+    An asynchronous line-based connection to one player.
+
+    Subclasses provide the transport. Output is buffered by write and sent
+    by flush, which readline does before waiting, so each prompt reaches
+    the player together with the turn's output.
+    """
+    def write(self, text):
+        """
+        Buffers game output.
+
+        Returns
+        -------
+        int
+            The number of characters accepted.
+        """
+        raise NotImplementedError
+
+    async def flush(self):
+        """
+        Sends all buffered output.
+        """
+        raise NotImplementedError
+
+    async def readline(self, timeout=None):
+        """
+        Waits for the player's next line.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Seconds to wait before giving up. Defaults to None, which
+            waits for as long as it takes.
+
+        Returns
+        -------
+        str
+            The line with its newline, or an empty string once the player
+            has disconnected.
+
+        Raises
+        ------
+        TimeoutError
+            If no line arrived within the timeout. Any partly typed line
+            is kept for the next call.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Stops reading input, as exit() does by closing sys.stdin.
+        """
+
+
+class IdlePolicy:
+    """
+    How long a session waits for its player.
+
+    A prompt left unanswered for prompt_timeout seconds is sent again with
+    a reminder. Once the player has sent nothing for idle_timeout seconds
+    the session is disconnected.
+    """
+    def __init__(self, prompt_timeout=DEFAULT_PROMPT_TIMEOUT,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 reminder="\nThe shadows grow impatient...\n",
+                 farewell="\nThe dream fades as you drift away...\n"):
+        """
+        Initialises the IdlePolicy.
+
+        Parameters
+        ----------
+        prompt_timeout : float, optional
+            Seconds before a prompt is repeated, or None to never repeat
+            it. Defaults to DEFAULT_PROMPT_TIMEOUT.
+        idle_timeout : float, optional
+            Seconds without input before disconnecting, or None to wait
+            forever. Defaults to DEFAULT_IDLE_TIMEOUT.
+        reminder : str, optional
+            Sent before a repeated prompt.
+        farewell : str, optional
+            Sent to a player who is disconnected for being idle.
+        """
+        self.prompt_timeout = prompt_timeout
+        self.idle_timeout = idle_timeout
+        self.reminder = reminder
+        self.farewell = farewell
+
+
+class RoutedStreams:
+    """
+    Stands in for sys.stdin and sys.stdout, routing each call to the port
+    of the session running in the current asyncio task. Code outside any
+    session falls through to the original streams.
+
+    Every task runs in its own copy of the context, so many sessions on
+    one event loop can print at once without mixing their output.
+    """
+    def __init__(self, fallback_out, fallback_in):
+        self._fallback_out = fallback_out
+        self._fallback_in = fallback_in
+
+    @property
+    def session(self):
+        return _current_port.get()
+
+    @session.setter
+    def session(self, port):
+        _current_port.set(port)
+
+    def write(self, text):
+        port = _current_port.get()
+        if port is None:
+            return self._fallback_out.write(text)
+        return port.write(text)
+
+    def flush(self):
+        # Sessions are flushed by their port before each read
+        if _current_port.get() is None:
+            self._fallback_out.flush()
+
+    def readline(self, size=-1):
+        return self._fallback_in.readline(size)
+
+    def close(self):
+        port = _current_port.get()
+        if port is not None:
+            port.close()
+
+
+def install_routing():
+    """
+    Replaces sys.stdout and sys.stdin with RoutedStreams, once.
+
+    Returns
+    -------
+    RoutedStreams
+        The installed streams.
+    """
+    if not isinstance(sys.stdout, RoutedStreams):
+        streams = RoutedStreams(sys.stdout, sys.stdin)
+        sys.stdout = streams
+        sys.stdin = streams
+    return sys.stdout
+
+
+async def _read_line(port, prompt, policy):
+    """
+    Reads a line for a prompt, repeating the prompt whenever it times out
+    and disconnecting once the player has been idle too long.
+    """
+    loop = asyncio.get_running_loop()
+    idle_deadline = (None if policy.idle_timeout is None
+                     else loop.time() + policy.idle_timeout)
+    while True:
+        timeout = policy.prompt_timeout
+        if idle_deadline is not None:
+            remaining = max(0.0, idle_deadline - loop.time())
+            timeout = remaining if timeout is None else min(timeout,
+                                                            remaining)
+        try:
+            line = await port.readline(timeout)
+        except TimeoutError:
+            if idle_deadline is not None and loop.time() >= idle_deadline:
+                port.write(policy.farewell)
+                await port.flush()
+                raise IdleDisconnect("The player was idle for too long")
+            port.write(policy.reminder + prompt)
+            continue
+        if not line:
+            raise EOFError("The player disconnected")
+        # input() strips the newline in the same way
+        return line[:-1] if line.endswith('\n') else line
+
+
+async def play(steps, port, policy=None, record=None):
+    """
+    Plays a Game session as a coroutine, awaiting each line from a port
+    instead of blocking on input(), so many sessions can share one event
+    loop.
+
+    The game's printed output goes to the port while its code runs, as
+    long as install_routing has been called.
+
+    Parameters
+    ----------
+    steps : generator
+        The session's game loop, from Game.play or ParkingLot.play. It is
+        closed when the session ends.
+    port : Port
+        The player's connection.
+    policy : IdlePolicy, optional
+        The prompt and idle timeouts. Defaults to IdlePolicy().
+    record : callable, optional
+        Called with every line read, such as Journal.record. Defaults to
+        None.
+
+    Raises
+    ------
+    EOFError
+        When the player disconnects, including IdleDisconnect.
+    SystemExit
+        When the player exits the game.
+    """
+    if policy is None:
+        policy = IdlePolicy()
+    _current_port.set(port)
+    try:
+        prompt = next(steps)
+        while True:
+            # input() writes its prompt to sys.stdout before reading
+            port.write(prompt)
+            line = await _read_line(port, prompt, policy)
+            if record is not None:
+                record(line)
+            prompt = steps.send(line)
+    finally:
+        steps.close()
+        _current_port.set(None)
+        await port.flush()
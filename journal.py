@@ -0,0 +1,416 @@
+import argparse
+import contextlib
+import json
+import queue
+import sys
+import threading
+import time
+
+import run
+
+# Journal format version, stored in each journal's header line
+VERSION = 1
+
+# Queued in place of a line to close a journal's file
+_CLOSE = object()
+
+# Returned by next() once the recorded inputs are used up
+_END = object()
+
+
+class JournalWriter:
+    """
+    Writes journal lines on a background thread, so recording an input
+    never blocks the game loop on disk.
+
+    Lines from every journal go through one queue. The thread waits up to
+    interval seconds after the first line of a batch for more to arrive,
+    then writes each journal's lines with a single write and flush.
+    """
+    def __init__(self, interval=0.05, batch_size=256):
+        """
+        Initialises the JournalWriter.
+
+        Parameters
+        ----------
+        interval : float, optional
+            Seconds to collect lines before writing a batch. Defaults to
+            0.05.
+        batch_size : int, optional
+            Write as soon as this many lines are waiting. Defaults to 256.
+        """
+        self.interval = interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, journal, line):
+        """
+        Queues a line, or _CLOSE, for a journal and returns immediately.
+        """
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run,
+                                                    name='journal-writer',
+                                                    daemon=True)
+                    self._thread.start()
+        self._queue.put((journal, line))
+
+    def flush(self):
+        """
+        Blocks until every line queued so far has been written.
+        """
+        if self._thread is not None:
+            done = threading.Event()
+            self._queue.put((None, done))
+            done.wait()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        """
+        Writes a batch of queued items in order, grouping each journal's
+        consecutive lines into one write.
+        """
+        pending = {}
+        for journal, line in batch:
+            if journal is None:
+                # A flush marker: everything before it must be written
+                self._write_pending(pending)
+                line.set()
+            elif line is _CLOSE:
+                self._write_pending(pending)
+                journal.file.close()
+            else:
+                pending.setdefault(journal, []).append(line)
+        self._write_pending(pending)
+
+    def _write_pending(self, pending):
+        for journal, lines in pending.items():
+            journal.file.write(''.join(lines))
+            journal.file.flush()
+        pending.clear()
+
+
+# Shared writer for journals that do not bring their own
+_default_writer = JournalWriter()
+
+
+class Journal:
+    """
+    An append-only record of one session: a header line holding the
+    master seed, then one JSON string per line of input. Replaying the
+    inputs into a Game with the same seed reproduces the session exactly.
+    """
+    def __init__(self, path, seed, writer=None):
+        """
+        Opens a journal, writing its header if the file is new.
+
+        Parameters
+        ----------
+        path : str
+            The journal file. An existing journal is appended to, which is
+            how a resumed session keeps recording.
+        seed : int
+            The session's master seed.
+        writer : JournalWriter, optional
+            The writer thread to use. Defaults to a shared writer.
+        """
+        self.path = path
+        self.seed = seed
+        self.writer = _default_writer if writer is None else writer
+        self.file = open(path, 'a', encoding='utf-8')
+        if self.file.tell() == 0:
+            self.writer.submit(self, json.dumps(
+                {'version': VERSION, 'seed': seed}) + '\n')
+
+    def record(self, line):
+        """
+        Queues one line of input to be appended to the journal.
+        """
+        self.writer.submit(self, json.dumps(line) + '\n')
+
+    def recording(self, read_input):
+        """
+        Wraps an input function so every line it returns is recorded.
+
+        Parameters
+        ----------
+        read_input : callable
+            Called with a prompt and returns a line, like input().
+
+        Returns
+        -------
+        callable
+            The wrapped input function.
+        """
+        def read_and_record(prompt=''):
+            line = read_input(prompt)
+            self.record(line)
+            return line
+        return read_and_record
+
+    def close(self):
+        """
+        Closes the journal once its queued lines are written.
+        """
+        self.writer.submit(self, _CLOSE)
+
+
+def read_journal(path):
+    """
+    Reads a journal file.
+
+    Parameters
+    ----------
+    path : str
+        The journal file.
+
+    Returns
+    -------
+    tuple
+        The master seed and the list of recorded input lines.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a journal or has an unsupported version.
+    """
+    with open(path, encoding='utf-8') as file:
+        try:
+            header = json.loads(file.readline())
+            version = header['version']
+            seed = header['seed']
+        except (ValueError, KeyError, TypeError):
+            raise ValueError(f"'{path}' is not a session journal")
+        if version != VERSION:
+            raise ValueError(f"Journal version {version} is not supported")
+        # A line cut short by a crash is dropped rather than replayed
+        inputs = []
+        for text in file:
+            if not text.endswith('\n'):
+                break
+            inputs.append(json.loads(text))
+    return seed, inputs
+
+
+class _NullOutput:
+    """
+    Discards everything written to it.
+    """
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+@contextlib.contextmanager
+def muted_output():
+    """
+    Discards print output from the calling thread while active.
+
+    Under session_host, sys.stdout routes each thread to its own terminal,
+    so only this thread's route is swapped; other sessions keep printing.
+    """
+    stream = sys.stdout
+    if hasattr(stream, 'session'):
+        previous = stream.session
+        stream.session = _NullOutput()
+        try:
+            yield
+        finally:
+            stream.session = previous
+    else:
+        with contextlib.redirect_stdout(_NullOutput()):
+            yield
+
+
+class ReplayInput:
+    """
+    An input function that returns recorded lines, then hands over to live
+    input once they run out.
+
+    In fast-forward mode all output is discarded until the recorded lines
+    are used up, so replaying only costs the game logic. Otherwise the
+    prompts and recorded lines are printed as a terminal would show them.
+    """
+    def __init__(self, inputs, live=None, fast_forward=True):
+        """
+        Initialises the ReplayInput.
+
+        Parameters
+        ----------
+        inputs : iterable of str
+            The recorded lines.
+        live : callable, optional
+            Reads input after the recorded lines run out. Defaults to None,
+            which raises EOFError instead, ending the replay.
+        fast_forward : bool, optional
+            Whether to discard output during the replay. Defaults to True.
+        """
+        self._inputs = iter(inputs)
+        self.live = live
+        self.fast_forward = fast_forward
+        self.replayed = 0
+        self._muted = contextlib.ExitStack()
+        if fast_forward:
+            self._muted.enter_context(muted_output())
+
+    def __call__(self, prompt=''):
+        line = next(self._inputs, _END)
+        if line is not _END:
+            self.replayed += 1
+            if not self.fast_forward:
+                print(f"{prompt}{line}")
+            return line
+        self.finish()
+        if self.live is None:
+            raise EOFError("The journal has been replayed")
+        return self.live(prompt)
+
+    def finish(self):
+        """
+        Restores output if it was muted. Safe to call more than once.
+        """
+        self._muted.close()
+
+
+def replay(seed, inputs, live=None, fast_forward=True):
+    """
+    Rebuilds a session by running a new Game through recorded inputs.
+
+    Parameters
+    ----------
+    seed : int
+        The session's master seed.
+    inputs : iterable of str
+        The recorded lines.
+    live : callable, optional
+        Continues the session with live input once the recorded lines run
+        out. Defaults to None, which stops the replay and returns the Game.
+    fast_forward : bool, optional
+        Whether to discard output during the replay. Defaults to True.
+
+    Returns
+    -------
+    Game
+        The session as it was after the last recorded input.
+    """
+    game = run.Game(seed)
+    reader = ReplayInput(inputs, live, fast_forward)
+    game.read_input = reader
+    try:
+        game.run()
+    except EOFError:
+        if live is not None:
+            raise
+    finally:
+        reader.finish()
+    return game
+
+
+def record(path, seed=None, read_input=input):
+    """
+    Plays a new interactive session, recording it to a journal.
+
+    Parameters
+    ----------
+    path : str
+        The journal file to create.
+    seed : int, optional
+        The session's master seed. Defaults to a fresh seed.
+    read_input : callable, optional
+        Reads live input. Defaults to input.
+    """
+    game = run.Game(seed)
+    journal = Journal(path, game.rng.seed)
+    game.read_input = journal.recording(read_input)
+    try:
+        game.run()
+    finally:
+        journal.close()
+        journal.writer.flush()
+
+
+def resume(path, read_input=input):
+    """
+    Rebuilds a session from its journal, fast-forwarding through the
+    recorded inputs, then continues it interactively while appending the
+    new inputs to the same journal.
+
+    Parameters
+    ----------
+    path : str
+        The journal file.
+    read_input : callable, optional
+        Reads live input. Defaults to input.
+    """
+    seed, inputs = read_journal(path)
+    journal = Journal(path, seed)
+    try:
+        replay(seed, inputs, journal.recording(read_input))
+    finally:
+        journal.close()
+        journal.writer.flush()
+
+
+def main(argv=None):
+    """
+    Records, resumes or replays a journal from the command line. A replay
+    either shows the session as it was played or times a fast-forward
+    rebuild.
+    """
+    parser = argparse.ArgumentParser(
+        description="Record, resume or replay a game session journal.")
+    parser.add_argument('path')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--record', action='store_true',
+                      help="play a new session and record it")
+    mode.add_argument('--resume', action='store_true',
+                      help="rebuild the session and carry on playing")
+    mode.add_argument('--fast-forward', action='store_true',
+                      help="skip output and report the rebuild time")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="master seed for --record")
+    args = parser.parse_args(argv)
+
+    run.init()
+    if args.record:
+        record(args.path, args.seed)
+        return 0
+    if args.resume:
+        resume(args.path)
+        return 0
+    seed, inputs = read_journal(args.path)
+    start = time.perf_counter()
+    try:
+        game = replay(seed, inputs, fast_forward=args.fast_forward)
+    except SystemExit:
+        game = None
+    elapsed = time.perf_counter() - start
+    if args.fast_forward:
+        print(json.dumps({
+            'inputs': len(inputs),
+            'milliseconds': round(elapsed * 1000, 3),
+            'state': None if game is None else game.state,
+        }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,595 @@
+import argparse
+import base64
+import hashlib
+import ipaddress
+import json
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+# Seconds to wait for the game to answer one input
+DEFAULT_TIMEOUT = 10.0
+
+# Seconds between host CPU and memory samples
+SAMPLE_INTERVAL = 0.25
+
+# GUID every WebSocket server appends to the client's key (RFC 6455)
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+# WebSocket frame opcodes
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# Text that marks each prompt the game waits on, the prompt's name in the
+# report, and the valid inputs for it. The name prompt takes any text.
+PROMPTS = (
+    ("Type 'Enter' if you dare", 'game_start', ('enter',)),
+    ("What does it say on your arm?", 'character_creation', None),
+    ("'Pick Up' or 'Leave'", 'room_pickup', ('pick up', 'leave')),
+    ("go 'left', or go 'right'?", 'door_choice', ('left', 'right')),
+    ("'dodge' the enemies attack", 'fight', ('quick', 'heavy', 'dodge')),
+)
+
+# Percentiles reported for every latency
+PERCENTILES = (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99))
+
+
+class TcpConnection:
+    """
+    A raw terminal stream straight to a session host, the same stream the
+    web server relays for each WebSocket.
+    """
+    def __init__(self, host, port, timeout):
+        self.socket = socket.create_connection((host, port), timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, text):
+        self.socket.sendall(text.encode('utf-8'))
+
+    def receive(self):
+        """
+        Returns the next bytes of terminal output, or b'' once closed.
+        """
+        return self.socket.recv(65536)
+
+    def close(self):
+        self.socket.close()
+
+
+class WebSocketConnection(TcpConnection):
+    """
+    A minimal WebSocket client, enough to drive the terminal the web page
+    attaches to: a handshake, masked text frames out, and frames in with
+    pings answered and fragments joined.
+    """
+    def __init__(self, host, port, path, timeout):
+        super().__init__(host, port, timeout)
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        self.socket.sendall((
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n").encode('ascii'))
+        self._buffer = b''
+        while b'\r\n\r\n' not in self._buffer:
+            data = self.socket.recv(4096)
+            if not data:
+                raise ConnectionError("The server closed the handshake")
+            self._buffer += data
+        response, self._buffer = self._buffer.split(b'\r\n\r\n', 1)
+        lines = response.decode('latin-1').split('\r\n')
+        if ' 101 ' not in lines[0] + ' ':
+            raise ConnectionError(f"WebSocket upgrade refused: {lines[0]}")
+        accept = base64.b64encode(hashlib.sha1(
+            (key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+        headers = dict(line.split(': ', 1) for line in lines[1:]
+                       if ': ' in line)
+        if {k.lower(): v for k, v in headers.items()}.get(
+                'sec-websocket-accept') != accept:
+            raise ConnectionError("The server sent a bad WebSocket accept")
+
+    def send(self, text):
+        self._send_frame(OP_TEXT, text.encode('utf-8'))
+
+    def _send_frame(self, opcode, payload):
+        mask = os.urandom(4)
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('>BB', 0x80 | opcode, 0x80 | length)
+        elif length < 65536:
+            header = struct.pack('>BBH', 0x80 | opcode, 0x80 | 126, length)
+        else:
+            header = struct.pack('>BBQ', 0x80 | opcode, 0x80 | 127, length)
+        masked = bytes(byte ^ mask[index % 4]
+                       for index, byte in enumerate(payload))
+        self.socket.sendall(header + mask + masked)
+
+    def _read(self, size):
+        while len(self._buffer) < size:
+            data = self.socket.recv(65536)
+            if not data:
+                raise ConnectionError("The server closed the WebSocket")
+            self._buffer += data
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def receive(self):
+        """
+        Returns the payload of the next complete message, or b'' once the
+        server has closed the WebSocket.
+        """
+        message = []
+        while True:
+            try:
+                first, second = self._read(2)
+            except ConnectionError:
+                return b''
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack('>H', self._read(2))[0]
+            elif length == 127:
+                length = struct.unpack('>Q', self._read(8))[0]
+            if second & 0x80:
+                mask = self._read(4)
+                payload = bytes(byte ^ mask[index % 4] for index, byte
+                                in enumerate(self._read(length)))
+            else:
+                payload = self._read(length)
+            if opcode == OP_CLOSE:
+                return b''
+            if opcode == OP_PING:
+                self._send_frame(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            message.append(payload)
+            if first & 0x80:
+                return b''.join(message)
+
+
+def _require_localhost(host):
+    """
+    Refuses to load test anything but this machine.
+
+    Raises
+    ------
+    ValueError
+        If the host does not resolve to a loopback address.
+    """
+    try:
+        address = ipaddress.ip_address(socket.gethostbyname(host))
+    except (OSError, ValueError):
+        raise ValueError(f"Cannot resolve '{host}'")
+    if not address.is_loopback:
+        raise ValueError(f"'{host}' is not a loopback address; the load"
+                         " tester only runs against localhost")
+
+
+def connector(target, timeout=DEFAULT_TIMEOUT):
+    """
+    Builds a function that opens one player connection to a target.
+
+    Parameters
+    ----------
+    target : str
+        A ws:// URL served by index.js, or a tcp://host:port session host.
+    timeout : float, optional
+        Socket timeout in seconds. Defaults to DEFAULT_TIMEOUT.
+
+    Returns
+    -------
+    callable
+        Called with no arguments, returns a connected TcpConnection or
+        WebSocketConnection.
+
+    Raises
+    ------
+    ValueError
+        If the target has an unsupported scheme or is not on localhost.
+    """
+    parts = urllib.parse.urlsplit(target)
+    if parts.scheme not in ('ws', 'tcp') or not parts.port:
+        raise ValueError(f"'{target}' is not a ws:// or tcp:// address"
+                         " with a port")
+    _require_localhost(parts.hostname)
+    if parts.scheme == 'tcp':
+        return lambda: TcpConnection(parts.hostname, parts.port, timeout)
+    path = parts.path or '/'
+    return lambda: WebSocketConnection(parts.hostname, parts.port, path,
+                                       timeout)
+
+
+def find_prompt(text):
+    """
+    Finds the last prompt in a piece of terminal output.
+
+    Returns
+    -------
+    tuple or None
+        The prompt's (marker, name, inputs) entry from PROMPTS, or None if
+        the text holds no prompt.
+    """
+    found = None
+    position = -1
+    for entry in PROMPTS:
+        index = text.rfind(entry[0])
+        if index > position:
+            found, position = entry, index
+    return found
+
+
+class Player:
+    """
+    One simulated player: connects, then answers each prompt with a valid
+    input, timing how long the game takes to show the next prompt.
+    """
+    def __init__(self, number, connect, turns, policy, rng):
+        """
+        Initialises the Player.
+
+        Parameters
+        ----------
+        number : int
+            Identifies the player, and names their character.
+        connect : callable
+            Opens the player's connection, as returned by connector.
+        turns : int
+            How many inputs to send before disconnecting.
+        policy : str
+            'random' picks any valid input; 'scripted' always picks the
+            first, so every player plays the same way.
+        rng : random.Random
+            The player's random choices.
+        """
+        self.number = number
+        self.connect = connect
+        self.turns = turns
+        self.policy = policy
+        self.rng = rng
+        self.connect_ms = None
+        self.first_prompt_ms = None
+        # (prompt name, milliseconds) for every input answered
+        self.round_trips = []
+        self.error = None
+
+    def choose(self, prompt):
+        """
+        Returns the input for a prompt entry from PROMPTS.
+        """
+        inputs = prompt[2]
+        if inputs is None:
+            # Names must be letters only, so spell the number out
+            return 'player' + ''.join(chr(ord('a') + int(digit))
+                                      for digit in str(self.number))
+        if self.policy == 'scripted':
+            return inputs[0]
+        return self.rng.choice(inputs)
+
+    def play(self):
+        """
+        Plays a session, recording any failure instead of raising it.
+        """
+        connection = None
+        try:
+            start = time.perf_counter()
+            connection = self.connect()
+            self.connect_ms = (time.perf_counter() - start) * 1000
+            prompt = self._wait_for_prompt(connection)
+            self.first_prompt_ms = (time.perf_counter() - start) * 1000
+            for _ in range(self.turns):
+                sent = time.perf_counter()
+                connection.send(self.choose(prompt) + '\r')
+                name = prompt[1]
+                prompt = self._wait_for_prompt(connection)
+                self.round_trips.append(
+                    (name, (time.perf_counter() - sent) * 1000))
+        except (OSError, ConnectionError) as error:
+            self.error = f"{type(error).__name__}: {error}"
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def _wait_for_prompt(self, connection):
+        """
+        Reads output until the game shows a prompt and waits for input.
+
+        The game flushes its output only when it reads input, so the first
+        chunk holding a prompt marker ends the turn. Text is matched across
+        chunk boundaries, since a terminal may split a prompt.
+        """
+        received = ''
+        while True:
+            data = connection.receive()
+            if not data:
+                raise ConnectionError("The game closed the session")
+            received += data.decode('utf-8', 'replace')
+            prompt = find_prompt(received)
+            if prompt is not None:
+                return prompt
+
+
+def summarise(samples):
+    """
+    Summarises latency samples in milliseconds.
+
+    Returns
+    -------
+    dict
+        The number of samples and the PERCENTILES, rounded to hundredths
+        of a millisecond, with None for an empty list.
+    """
+    ordered = sorted(samples)
+    summary = {'count': len(ordered)}
+    for name, fraction in PERCENTILES:
+        summary[name] = (round(ordered[min(len(ordered) - 1,
+                                           int(len(ordered) * fraction))], 2)
+                         if ordered else None)
+    return summary
+
+
+def _process_tree(pid):
+    """
+    Returns a pid and the pids of all its descendants, so a web server's
+    per-player run.py processes are counted with it.
+    """
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as stat:
+                    fields = stat.read().rsplit(')', 1)[1].split()
+            except OSError:
+                continue
+            children.setdefault(int(fields[1]), []).append(int(entry))
+    tree = []
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, ()))
+    return tree
+
+
+def sample_processes(pids):
+    """
+    Reads the total CPU time and resident memory of processes and their
+    descendants from /proc.
+
+    Returns
+    -------
+    tuple
+        CPU seconds used so far and resident bytes, summed over every
+        process still running.
+    """
+    ticks = os.sysconf('SC_CLK_TCK')
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    cpu = 0.0
+    rss = 0
+    for root in pids:
+        for pid in _process_tree(root):
+            try:
+                with open(f'/proc/{pid}/stat') as stat:
+                    fields = stat.read().rsplit(')', 1)[1].split()
+                with open(f'/proc/{pid}/statm') as statm:
+                    resident_pages = int(statm.read().split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            # utime and stime are the 12th and 13th fields after the name
+            cpu += (int(fields[11]) + int(fields[12])) / ticks
+            rss += resident_pages * page_size
+    return cpu, rss
+
+
+class HostSampler:
+    """
+    Samples the host processes' CPU and memory on a background thread
+    while a concurrency level runs.
+    """
+    def __init__(self, pids, interval=SAMPLE_INTERVAL):
+        self.pids = pids
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._start = None
+        self.cpu_percent = None
+        self.peak_rss = 0
+
+    def __enter__(self):
+        if self.pids:
+            self._start = (time.perf_counter(),
+                           sample_processes(self.pids)[0])
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            wall = time.perf_counter() - self._start[0]
+            cpu, rss = sample_processes(self.pids)
+            self.peak_rss = max(self.peak_rss, rss)
+            self.cpu_percent = round((cpu - self._start[1]) / wall * 100, 1)
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss,
+                                sample_processes(self.pids)[1])
+
+    def report(self):
+        """
+        Returns the host's CPU use and peak memory, or None when no host
+        process is being watched.
+        """
+        if not self.pids:
+            return None
+        return {'cpu_percent': self.cpu_percent,
+                'peak_rss_bytes': self.peak_rss}
+
+
+def run_level(connect, concurrency, turns, policy, seed, pids=()):
+    """
+    Plays concurrency sessions at once and reports their latencies.
+
+    Parameters
+    ----------
+    connect : callable
+        Opens one player connection, as returned by connector.
+    concurrency : int
+        How many players connect together.
+    turns : int
+        Inputs sent by each player.
+    policy : str
+        'random' or 'scripted', see Player.
+    seed : int
+        Seeds the players' random choices.
+    pids : iterable of int, optional
+        Host processes to sample CPU and memory for, with their
+        descendants. Defaults to none.
+
+    Returns
+    -------
+    dict
+        Connect, first prompt and round trip latencies, round trips per
+        prompt, throughput, errors and the host's resource use.
+    """
+    players = [Player(number, connect, turns, policy,
+                      random.Random(seed * 1000003 + number))
+               for number in range(concurrency)]
+    threads = [threading.Thread(target=player.play, daemon=True)
+               for player in players]
+    with HostSampler(list(pids)) as sampler:
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    round_trips = [sample for player in players
+                   for sample in player.round_trips]
+    by_prompt = {}
+    for name, milliseconds in round_trips:
+        by_prompt.setdefault(name, []).append(milliseconds)
+    errors = [player.error for player in players if player.error]
+    return {
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'inputs_per_second': round(len(round_trips) / elapsed, 1),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'connect': summarise([player.connect_ms for player in players
+                              if player.connect_ms is not None]),
+        'first_prompt': summarise([player.first_prompt_ms
+                                   for player in players
+                                   if player.first_prompt_ms is not None]),
+        'round_trip': summarise([ms for _, ms in round_trips]),
+        'round_trip_by_prompt': {name: summarise(samples)
+                                 for name, samples in by_prompt.items()},
+        'host': sampler.report(),
+    }
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+# Session host scripts --spawn-host can start, by name
+HOSTS = {'threads': 'session_host.py', 'asyncio': 'async_host.py'}
+
+
+def _start_session_host(script='session_host.py'):
+    """
+    Starts a session host script on a free loopback port and waits for it
+    to accept connections.
+
+    Returns
+    -------
+    tuple
+        The host's Popen and its tcp:// target.
+    """
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(
+            os.path.abspath(__file__)), script),
+         '--host', '127.0.0.1', '--port', str(port)],
+        stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.1).close()
+            return process, f"tcp://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("The session host did not start")
+
+
+def main(argv=None):
+    """
+    Runs the load test at each concurrency level and prints the results as
+    JSON.
+    """
+    parser = argparse.ArgumentParser(
+        description="Play many concurrent sessions against a local server"
+                    " and report latency and host resource use.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url',
+                        help="ws://127.0.0.1:PORT/ served by index.js, or"
+                             " tcp://127.0.0.1:PORT for a session host")
+    target.add_argument('--spawn-host', nargs='?', const='threads',
+                        choices=sorted(HOSTS),
+                        help="start a session host to test and watch, with"
+                             " a thread per session or on one asyncio"
+                             " event loop")
+    parser.add_argument('--concurrency', type=int, nargs='+',
+                        default=[1, 10, 50])
+    parser.add_argument('--turns', type=int, default=20,
+                        help="inputs sent by each player")
+    parser.add_argument('--policy', choices=('random', 'scripted'),
+                        default='random')
+    parser.add_argument('--pid', type=int, action='append', default=[],
+                        help="host process to sample, with its children;"
+                             " may be repeated")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    process = None
+    url = args.url
+    if args.spawn_host:
+        process, url = _start_session_host(HOSTS[args.spawn_host])
+        args.pid.append(process.pid)
+    try:
+        try:
+            connect = connector(url, args.timeout)
+        except ValueError as error:
+            parser.error(str(error))
+        results = [run_level(connect, concurrency, args.turns, args.policy,
+                             args.seed, args.pid)
+                   for concurrency in args.concurrency]
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(json.dumps({'target': url, 'turns': args.turns,
+                      'policy': args.policy, 'levels': results}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
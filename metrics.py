@@ -0,0 +1,388 @@
+import argparse
+import bisect
+import contextlib
+import http.server
+import os
+import sys
+import threading
+import time
+
+import game_states
+import run
+
+# Upper bounds, in seconds, for handler latencies
+HANDLER_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25)
+
+# Upper bounds, in seconds, for time spent waiting on the player
+WAIT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Upper bounds for the number of turns a fight lasts
+TURN_BUCKETS = (2, 4, 6, 8, 10, 15, 20, 30, 50)
+
+# Upper bounds, in seconds, for how long a session stays open
+SESSION_BUCKETS = (10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# The state whose handler runs a whole battle
+FIGHT_STATE = game_states.SECOND_LAYER_STATES['FIGHT_SECOND_LAYER']
+
+
+def _format_value(value):
+    """
+    Formats a sample value the way Prometheus expects.
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    """
+    Formats (name, value) pairs as a Prometheus label set.
+    """
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels:
+        value = (str(value).replace('\\', '\\\\').replace('"', '\\"')
+                 .replace('\n', '\\n'))
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Histogram:
+    """
+    A Prometheus histogram, optionally split by one label.
+
+    Observations are not locked here; the owning Metrics holds a lock
+    around every update and render.
+    """
+    def __init__(self, name, help_text, buckets, label=None):
+        """
+        Initialises the Histogram.
+
+        Parameters
+        ----------
+        name : str
+            The metric name.
+        help_text : str
+            The description shown in the HELP line.
+        buckets : tuple of float
+            The sorted upper bounds of the buckets, without +Inf.
+        label : str, optional
+            The label observations are split by. Defaults to None.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        # Per label value: a count per bucket, with +Inf last, and the sum
+        self._series = {}
+
+    def observe(self, value, label_value=None):
+        """
+        Records one observation.
+        """
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = [
+                [0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        """
+        Returns the histogram in the text exposition format, as lines.
+        """
+        lines = [f"# HELP {self.name} {self.help_text}",
+                 f"# TYPE {self.name} histogram"]
+        for label_value in sorted(self._series, key=str):
+            counts, total = self._series[label_value]
+            labels = (() if self.label is None
+                      else ((self.label, label_value),))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                bucket = labels + (('le', _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(bucket)}"
+                             f" {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)}"
+                         f" {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)}"
+                         f" {cumulative}")
+        return lines
+
+
+class Metrics:
+    """
+    Collects latency metrics from instrumented Game sessions and exports
+    them in the Prometheus text format.
+
+    Instrumenting a game wraps its game loop generator and, through an
+    instance copy of Game.STATES, each state's handler. An uninstrumented
+    Game runs exactly the code it always did, so disabled metrics cost
+    nothing.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.handler_seconds = Histogram(
+            'game_handler_seconds',
+            "Time spent in each state's input handler, excluding time"
+            " waiting on the player.", HANDLER_BUCKETS, label='state')
+        self.input_wait_seconds = Histogram(
+            'game_input_wait_seconds',
+            "Time spent waiting for the player's input in each state.",
+            WAIT_BUCKETS, label='state')
+        self.fight_turns = Histogram(
+            'game_fight_turns', "Turns taken by each fight.", TURN_BUCKETS)
+        self.fight_seconds = Histogram(
+            'game_fight_seconds', "Wall time of each fight, including the"
+            " player's decisions.", WAIT_BUCKETS)
+        self.session_seconds = Histogram(
+            'game_session_seconds', "Lifetime of each finished session.",
+            SESSION_BUCKETS)
+        self.restore_seconds = Histogram(
+            'game_session_restore_seconds', "Time taken to restore a parked"
+            " session from disk.", HANDLER_BUCKETS)
+        self.active_sessions = 0
+        # Kept up to date by a parking.ParkingLot, and None without one
+        self.resident_sessions = None
+        self.parked_sessions = 0
+        self.resident_bytes = 0
+        self.parks = 0
+
+    def observe(self, histogram, value, label_value=None):
+        """
+        Records one observation in one of this registry's histograms.
+        """
+        with self._lock:
+            histogram.observe(value, label_value)
+
+    def instrument(self, game):
+        """
+        Starts recording a game's handler latencies, input waits and
+        fights.
+
+        The game loop is a generator that is suspended while it waits for
+        input, so waits are timed from each prompt it yields to the line
+        sent back, however the session is driven.
+
+        Parameters
+        ----------
+        game : Game
+            The session to instrument.
+        """
+        clock = time.perf_counter
+        play = game.play
+
+        def timed_play():
+            steps = play()
+            prompt = next(steps)
+            while True:
+                state = game.state
+                start = clock()
+                line = yield prompt
+                self.observe(self.input_wait_seconds, clock() - start, state)
+                prompt = steps.send(line)
+
+        def timed_steps(game, spec, steps, start):
+            # Only the time between resuming the handler and its next
+            # prompt is work; the rest is spent waiting on the player
+            working = 0.0
+            resumed = start
+            try:
+                prompt = next(steps)
+                while True:
+                    working += clock() - resumed
+                    line = yield prompt
+                    resumed = clock()
+                    prompt = steps.send(line)
+            except StopIteration:
+                working += clock() - resumed
+            finished(game, spec, working, clock() - start)
+
+        def finished(game, spec, working, elapsed):
+            self.observe(self.handler_seconds, working, spec.state)
+            if spec.state == FIGHT_STATE:
+                self.observe(self.fight_seconds, elapsed)
+                self.observe(self.fight_turns, game.fight_turns)
+
+        def timed(spec):
+            handler = spec.handler
+
+            def timed_handler(game, user_input):
+                start = clock()
+                steps = handler(game, user_input)
+                if steps is not None:
+                    return timed_steps(game, spec, steps, start)
+                elapsed = clock() - start
+                finished(game, spec, elapsed, elapsed)
+            return spec._replace(handler=timed_handler)
+
+        game.play = timed_play
+        game.STATES = {state: spec if spec.handler is None else timed(spec)
+                       for state, spec in game.STATES.items()}
+
+    def record_parking(self, resident, parked, resident_bytes):
+        """
+        Updates the counts of resident and parked sessions, and the bytes
+        the resident ones hold.
+        """
+        with self._lock:
+            self.resident_sessions = resident
+            self.parked_sessions = parked
+            self.resident_bytes = resident_bytes
+
+    def record_park(self):
+        """
+        Counts one session parked to disk.
+        """
+        with self._lock:
+            self.parks += 1
+
+    @contextlib.contextmanager
+    def session(self, game=None):
+        """
+        Instruments a game and records the session's lifetime when the
+        block exits, however it exits.
+
+        Parameters
+        ----------
+        game : Game, optional
+            The session to instrument. Defaults to None, which only records
+            the lifetime, for callers that instrument their games
+            themselves.
+        """
+        if game is not None:
+            self.instrument(game)
+        with self._lock:
+            self.active_sessions += 1
+        start = time.perf_counter()
+        try:
+            yield game
+        finally:
+            with self._lock:
+                self.active_sessions -= 1
+                self.session_seconds.observe(time.perf_counter() - start)
+
+    def render(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = []
+            for histogram in (self.handler_seconds, self.input_wait_seconds,
+                              self.fight_turns, self.fight_seconds,
+                              self.session_seconds, self.restore_seconds):
+                lines.extend(histogram.render())
+            lines.extend([
+                "# HELP game_active_sessions Sessions currently open.",
+                "# TYPE game_active_sessions gauge",
+                f"game_active_sessions {self.active_sessions}",
+            ])
+            if self.resident_sessions is not None:
+                lines.extend(self._parking_lines())
+        return '\n'.join(lines) + '\n'
+
+    def _parking_lines(self):
+        """
+        Returns the exposition lines for a ParkingLot's gauges and counter.
+        The caller holds the lock.
+        """
+        return [
+            "# HELP game_resident_sessions Sessions with their game in"
+            " memory.",
+            "# TYPE game_resident_sessions gauge",
+            f"game_resident_sessions {self.resident_sessions}",
+            "# HELP game_parked_sessions Sessions parked to disk.",
+            "# TYPE game_parked_sessions gauge",
+            f"game_parked_sessions {self.parked_sessions}",
+            "# HELP game_resident_session_bytes Estimated heap held by"
+            " resident sessions.",
+            "# TYPE game_resident_session_bytes gauge",
+            f"game_resident_session_bytes {self.resident_bytes}",
+            "# HELP game_session_parks_total Sessions parked to disk.",
+            "# TYPE game_session_parks_total counter",
+            f"game_session_parks_total {self.parks}",
+        ]
+
+    def write_textfile(self, path):
+        """
+        Writes the metrics to a file for a textfile collector, replacing
+        any older file atomically so a scrape never reads half of one.
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as file:
+            file.write(self.render())
+        os.replace(temporary, path)
+
+    def serve(self, host='127.0.0.1', port=9464):
+        """
+        Serves the metrics over HTTP at /metrics on a background thread.
+
+        Parameters
+        ----------
+        host : str, optional
+            The address to listen on. Defaults to localhost only.
+        port : int, optional
+            The port to listen on. Defaults to 9464.
+
+        Returns
+        -------
+        http.server.ThreadingHTTPServer
+            The running server; call its shutdown method to stop it.
+        """
+        registry = self
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port),
+                                                 MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics',
+                         daemon=True).start()
+        return server
+
+
+def main(argv=None):
+    """
+    Plays an instrumented session on the terminal and writes its metrics
+    when it ends.
+    """
+    parser = argparse.ArgumentParser(
+        description="Play a session with latency metrics recorded.")
+    parser.add_argument('path', help="Prometheus text file to write")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    run.init()
+    registry = Metrics()
+    game = run.Game(args.seed)
+    try:
+        with registry.session(game):
+            game.run()
+    except (SystemExit, EOFError):
+        pass
+    finally:
+        registry.write_textfile(args.path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
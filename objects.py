@@ -1,25 +1,18 @@
-# Objects without Skill Check
-OBJECTS_FIRST_LAYER = [
-    {
-        "name": "Broomstick",
-        "description": "A rickety old broomstick, surprisingly balanced.",
-        "stat_changes": {"Strength": - 1, "Dexterity": + 2}
-    },
-    {
-        "name": "Rusty Spoon",
-        "description": "An ancient spoon, tinged with the wisdom of countless"
-                       " meals.",
-        "stat_changes": {"Strength": 0, "Wisdom": + 1}
-    },
-    {
-        "name": "Broken Bottle",
-        "description": "A jagged glass shard, crude but sharp.",
-        "stat_changes": {"Strength": + 1, "Dexterity": - 1}
-    }
-]
-# Objects that require a skill Check
-OBJECTS_SC_FIRST_LAYER = [
-]
+from operator import itemgetter
 
-OBJECTS_SECOND_LAYER = [
-]
+import content_packs
+
+# Objects are defined in the content packs under content/. Each list is
+# loaded with its layer the first time it is used.
+_ATTRIBUTES = {
+    # Objects without Skill Check
+    'OBJECTS_FIRST_LAYER': ('first_layer', itemgetter('objects')),
+    # Objects that require a skill Check
+    'OBJECTS_SC_FIRST_LAYER': ('first_layer',
+                               itemgetter('skill_check_objects')),
+    'OBJECTS_SECOND_LAYER': ('second_layer', itemgetter('objects')),
+}
+
+
+def __getattr__(name):
+    return content_packs.lazy_attribute(globals(), _ATTRIBUTES, name)
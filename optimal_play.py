@@ -0,0 +1,433 @@
+import argparse
+import functools
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+import combat_odds
+import content_packs
+import enemy_ai
+import run
+import simulator
+import vectorized_combat
+
+# Leading bytes of every table file, followed by the format version
+MAGIC = b'OP'
+VERSION = 1
+
+# Where the game looks for the tables, next to the compiled content they
+# are solved from
+TABLES_PATH = os.path.join(content_packs.CACHE_DIR, 'optimal_play.bin')
+
+# Ability scores the tables cover: any 4d6 roll, moved up to two points
+# either way by an object
+SCORES = range(1, 21)
+
+
+def _most_hero_hit_points():
+    """
+    Returns the hit points of a hero with the best constitution in SCORES.
+    """
+    hero = run.Character('hero')
+    hero.constitution = max(SCORES)
+    return hero.max_hit_points
+
+
+# Highest hit points a hero can have, which the tables cover up to
+HERO_HIT_POINTS = _most_hero_hit_points()
+
+# Weight of a win one turn later. Just under 1, so that of two moves with
+# the same chance of winning, the one that wins sooner is preferred
+DISCOUNT = 1 - 1e-6
+
+# Value iteration stops once no win probability moves by more than this
+TOLERANCE = 1e-10
+
+# Value iteration gives up after this many sweeps
+MAX_SWEEPS = 100000
+
+# Indices of the four values held for each pair of hit points: whose turn
+# it is and whether the combatant not on turn is dodging
+PLAYER_TURN, PLAYER_TURN_DODGED, ENEMY_TURN, ENEMY_TURN_DODGED = range(4)
+
+_HEADER = struct.Struct('>2sB16sBB')
+_ENEMY = struct.Struct('>B')
+_PROFILE_COUNT = struct.Struct('>H')
+# Dexterity modifier, strength modifier, armour class
+_PROFILE = struct.Struct('>bbb')
+
+
+def profile_hero(dexterity, strength):
+    """
+    Creates a hero with the given dexterity and strength. The other
+    abilities do not affect a fight's odds, only the hit points it starts
+    with.
+    """
+    hero = run.Character('hero')
+    hero.dexterity = dexterity
+    hero.strength = strength
+    return hero
+
+
+def profiles():
+    """
+    Returns one (dexterity, strength) pair for each distinct set of hero
+    combat numbers the scores in SCORES give, by those numbers.
+    """
+    found = {}
+    for dexterity in SCORES:
+        for strength in SCORES:
+            key = _profile_key(profile_hero(dexterity, strength))
+            found.setdefault(key, (dexterity, strength))
+    return found
+
+
+def _profile_key(hero):
+    return (hero.dexterity_modifier, hero.strength_modifier,
+            hero.calculate_ac())
+
+
+def _attacks(attacker, defender):
+    """
+    Lists an attacker's quick and heavy attacks as (damage, chance to hit,
+    chance to hit a dodging defender) tuples.
+    """
+    return [(base_damage + modifier,
+             combat_odds.hit_chance(modifier, defender.ac),
+             combat_odds.hit_chance(modifier, defender.ac, defender.dex_mod))
+            for base_damage, modifier in zip(combat_odds.BASE_DAMAGE,
+                                             (attacker.dex_mod,
+                                              attacker.str_mod))]
+
+
+def _enemy_weights(hero, enemy):
+    """
+    Returns the chance of the enemy choosing each action in every state,
+    indexed by whether the hero is dodging, the action, then the hero's
+    and the enemy's hit points.
+
+    Random enemies choose evenly everywhere. Any other policy is asked for
+    its move in each state, on private copies of the combatants.
+    """
+    policy = enemy_ai.POLICIES[enemy.policy]
+    if policy is enemy_ai.random_policy:
+        return np.full((2, 3, 1, 1), 1 / 3)
+    hero = profile_hero(hero.dexterity, hero.strength)
+    enemy = simulator.create_enemy(simulator.find_enemy_template(enemy.name))
+    fight = run.Fight(verbose=False)
+    weights = np.zeros((2, 3, HERO_HIT_POINTS + 1, enemy.max_hit_points + 1))
+    for dodging in (0, 1):
+        fight.dodge_flags = {hero: bool(dodging), enemy: False}
+        for hero_hp in range(1, HERO_HIT_POINTS + 1):
+            for enemy_hp in range(1, enemy.max_hit_points + 1):
+                hero.hit_points, enemy.hit_points = hero_hp, enemy_hp
+                action = policy(enemy, hero, fight, fight.rng)
+                weights[dodging, run.Fight.ACTIONS.index(action), hero_hp,
+                        enemy_hp] = 1.0
+    return weights
+
+
+def solve(hero, enemy):
+    """
+    Finds the hero's best action in every state of a fight by value
+    iteration over the Fight dice rules.
+
+    A state is the hero's and the enemy's hit points, whose turn it is and
+    whether the combatant not on turn is dodging. Its value is the hero's
+    chance of winning with best play from there, discounted by DISCOUNT
+    per turn. The hero takes the action with the highest expected value on
+    their turns, and the enemy acts as its AI policy does on its turns.
+
+    Parameters
+    ----------
+    hero : Character
+        A hero with the combat numbers to solve for. Every hit point total
+        up to HERO_HIT_POINTS is covered.
+    enemy : Enemy
+        The enemy, from its template.
+
+    Returns
+    -------
+    numpy.ndarray
+        One uint8 per pair of hit points, indexed by the hero's then the
+        enemy's hit points. The low two bits are the best action's index in
+        Fight.ACTIONS when the enemy is not dodging, and the next two bits
+        the best action when it is.
+
+    Raises
+    ------
+    ValueError
+        If value iteration does not converge.
+    """
+    player = combat_odds.combatant(hero)
+    foe = combat_odds.combatant(enemy)
+    hero_attacks = _attacks(player, foe)
+    enemy_attacks = _attacks(foe, player)
+    weights = _enemy_weights(hero, enemy)
+    hero_after = [np.maximum(np.arange(HERO_HIT_POINTS + 1) - damage, 0)
+                  for damage, _, _ in enemy_attacks]
+    enemy_after = [np.maximum(np.arange(enemy.max_hit_points + 1) - damage,
+                              0) for damage, _, _ in hero_attacks]
+
+    win = np.zeros((4, HERO_HIT_POINTS + 1, enemy.max_hit_points + 1))
+    values = np.empty((3,) + win.shape[1:])
+    best = np.empty((2,) + win.shape[1:], dtype=np.uint8)
+    for _ in range(MAX_SWEEPS):
+        new = np.empty_like(win)
+        for dodging in (0, 1):
+            # The hero's turn: each attack hits or misses, or they dodge
+            after = win[ENEMY_TURN]
+            for action, (_, chance, dodge_chance) in enumerate(hero_attacks):
+                hit = dodge_chance if dodging else chance
+                values[action] = (hit * after[:, enemy_after[action]]
+                                  + (1 - hit) * after)
+            values[2] = win[ENEMY_TURN_DODGED]
+            new[PLAYER_TURN + dodging] = DISCOUNT * values.max(axis=0)
+            best[dodging] = values.argmax(axis=0)
+            # The enemy's turn, weighted by its policy
+            after = win[PLAYER_TURN]
+            value = weights[dodging, 2] * win[PLAYER_TURN_DODGED]
+            for action, (_, chance, dodge_chance) in enumerate(enemy_attacks):
+                hit = dodge_chance if dodging else chance
+                value = value + weights[dodging, action] * (
+                    hit * after[hero_after[action]] + (1 - hit) * after)
+            new[ENEMY_TURN + dodging] = DISCOUNT * value
+        # A fallen enemy is a win and a fallen hero a loss
+        new[:, :, 0] = 1.0
+        new[:, 0, :] = 0.0
+        change = np.abs(new - win).max()
+        win = new
+        if change < TOLERANCE:
+            return best[0] | (best[1] << 2)
+    raise ValueError(f"Value iteration did not converge for"
+                     f" {enemy.name}")
+
+
+def _solve_task(task):
+    """
+    Solves one table for a process pool worker.
+    """
+    name, dexterity, strength = task
+    enemy = simulator.create_enemy(simulator.find_enemy_template(name))
+    return solve(profile_hero(dexterity, strength), enemy).tobytes()
+
+
+def _enemies():
+    return [simulator.create_enemy(template)
+            for template in vectorized_combat.enemy_templates()]
+
+
+def fingerprint():
+    """
+    Digests everything the tables are solved from, so tables built for
+    other content or rules are not used.
+    """
+    parts = [VERSION, tuple(SCORES), HERO_HIT_POINTS, combat_odds.BASE_DAMAGE,
+             enemy_ai.SEARCH_DEPTH]
+    for enemy in _enemies():
+        parts.append((enemy.name, tuple(combat_odds.combatant(enemy)),
+                      enemy.max_hit_points, enemy.policy))
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).digest()
+
+
+def build(path=TABLES_PATH, processes=None):
+    """
+    Solves every hero profile against every enemy template and writes the
+    tables, replacing any older file atomically.
+
+    Parameters
+    ----------
+    path : str, optional
+        The table file. Defaults to TABLES_PATH.
+    processes : int, optional
+        Worker processes. Defaults to one per core.
+
+    Returns
+    -------
+    int
+        The number of tables written.
+    """
+    hero_profiles = profiles()
+    foes = _enemies()
+    parts = [_HEADER.pack(MAGIC, VERSION, fingerprint(), HERO_HIT_POINTS,
+                          len(foes))]
+    for enemy in foes:
+        encoded = enemy.name.encode('utf-8')
+        parts.append(_ENEMY.pack(len(encoded)) + encoded
+                     + _ENEMY.pack(enemy.max_hit_points))
+    parts.append(_PROFILE_COUNT.pack(len(hero_profiles)))
+    parts.extend(_PROFILE.pack(*key) for key in hero_profiles)
+    tasks = [(enemy.name, dexterity, strength) for enemy in foes
+             for dexterity, strength in hero_profiles.values()]
+    with multiprocessing.Pool(processes) as pool:
+        parts.extend(pool.imap(_solve_task, tasks, chunksize=8))
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as file:
+        file.write(b''.join(parts))
+    os.replace(temporary, path)
+    return len(tasks)
+
+
+class PlayTables:
+    """
+    Best actions for every state of every solved matchup, read from a
+    memory-mapped table file.
+
+    Each lookup is a dictionary lookup for the matchup and one byte read,
+    and processes that open the same file share its pages.
+    """
+    def __init__(self, path):
+        """
+        Maps a table file and reads its index.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a table file or was solved from other
+            content or rules.
+        """
+        with open(path, 'rb') as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, digest, hero_hit_points, count = \
+                _HEADER.unpack_from(self._buffer)
+        except struct.error:
+            raise ValueError(f"'{path}' is not an optimal play table file")
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{path}' is not an optimal play table file")
+        if digest != fingerprint():
+            raise ValueError(f"'{path}' was solved for other content")
+        self.hero_hit_points = hero_hit_points
+        offset = _HEADER.size
+        foes = []
+        for _ in range(count):
+            length = self._buffer[offset]
+            name = self._buffer[offset + 1:offset + 1 + length].decode()
+            offset += 1 + length
+            foes.append((name, self._buffer[offset]))
+            offset += 1
+        count = _PROFILE_COUNT.unpack_from(self._buffer, offset)[0]
+        offset += _PROFILE_COUNT.size
+        keys = [_PROFILE.unpack_from(self._buffer, offset + index
+                                     * _PROFILE.size)
+                for index in range(count)]
+        offset += count * _PROFILE.size
+        # (enemy name, hero profile) -> (table offset, enemy hit points)
+        self._tables = {}
+        for name, enemy_hit_points in foes:
+            for key in keys:
+                self._tables[(name,) + key] = (offset, enemy_hit_points)
+                offset += (hero_hit_points + 1) * (enemy_hit_points + 1)
+
+    def __len__(self):
+        return len(self._tables)
+
+    def best_action(self, hero, enemy, enemy_dodging=False):
+        """
+        Looks up the hero's best action.
+
+        Parameters
+        ----------
+        hero : Character
+            The hero, on their turn.
+        enemy : Enemy
+            The enemy being fought.
+        enemy_dodging : bool, optional
+            Whether the enemy dodged on its last turn.
+
+        Returns
+        -------
+        str or None
+            The action from Fight.ACTIONS, or None if the tables do not
+            cover this matchup or these hit points.
+        """
+        table = self._tables.get((enemy.name,) + _profile_key(hero))
+        if table is None:
+            return None
+        offset, enemy_hit_points = table
+        if not (0 < hero.hit_points <= self.hero_hit_points
+                and 0 < enemy.hit_points <= enemy_hit_points):
+            return None
+        code = self._buffer[offset + hero.hit_points * (enemy_hit_points + 1)
+                            + enemy.hit_points]
+        return run.Fight.ACTIONS[(code >> 2 if enemy_dodging else code) & 3]
+
+
+@functools.lru_cache(maxsize=None)
+def default_tables():
+    """
+    Opens the tables at TABLES_PATH once, returning None if they have not
+    been built or are out of date.
+    """
+    try:
+        return PlayTables(TABLES_PATH)
+    except (OSError, ValueError):
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _solved(name, dexterity, strength):
+    enemy = simulator.create_enemy(simulator.find_enemy_template(name))
+    return solve(profile_hero(dexterity, strength), enemy)
+
+
+def best_action(hero, enemy, enemy_dodging=False):
+    """
+    Returns the hero's best action, from the built tables when they cover
+    the matchup and otherwise by solving it once in memory.
+
+    Returns
+    -------
+    str or None
+        The action from Fight.ACTIONS, or None if the hero's hit points are
+        beyond any table.
+    """
+    tables = default_tables()
+    if tables is not None:
+        action = tables.best_action(hero, enemy, enemy_dodging)
+        if action is not None:
+            return action
+    if not (0 < hero.hit_points <= HERO_HIT_POINTS
+            and 0 < enemy.hit_points <= enemy.max_hit_points):
+        return None
+    code = int(_solved(enemy.name, hero.dexterity, hero.strength)
+               [hero.hit_points, enemy.hit_points])
+    return run.Fight.ACTIONS[(code >> 2 if enemy_dodging else code) & 3]
+
+
+def main(argv=None):
+    """
+    Builds the optimal play tables from the command line and prints a JSON
+    summary.
+    """
+    parser = argparse.ArgumentParser(
+        description="Solve the best move in every fight state for every"
+                    " hero profile and enemy.")
+    parser.add_argument('--path', default=TABLES_PATH,
+                        help="table file to write")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="worker processes, one per core by default")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    tables = build(args.path, args.processes)
+    print(json.dumps({
+        'path': args.path,
+        'tables': tables,
+        'bytes': os.path.getsize(args.path),
+        'seconds': round(time.perf_counter() - start, 3),
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
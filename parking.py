@@ -0,0 +1,260 @@
+import os
+import time
+from collections import OrderedDict
+
+import journal
+import session_host
+import snapshot
+
+# Default bytes of game state kept in memory across all resident sessions
+DEFAULT_BUDGET = 64 * 1024 * 1024
+
+# Inputs between fresh measurements of a resident session's heap, since a
+# measurement walks the whole Game and costs more than most turns. Most of
+# a session's growth comes from its random streams filling new buffers, so
+# it is also measured whenever its number of buffers changes.
+MEASURE_INTERVAL = 32
+
+
+class _Session:
+    """
+    One session in a ParkingLot: resident, with its Game and game loop in
+    memory, or parked, with only the path of its snapshot.
+    """
+    __slots__ = ('key', 'game', 'steps', 'size', 'inputs', 'buffers',
+                 'path')
+
+    def __init__(self, key, game, path):
+        self.key = key
+        self.game = game
+        self.steps = None
+        # Estimated heap bytes while resident, kept while parked since a
+        # restored session is the same size
+        self.size = 0
+        # Inputs handled, and random buffers held, when last measured
+        self.inputs = 0
+        self.buffers = 0
+        self.path = path
+
+
+def _buffers(game):
+    """
+    Counts the random buffers a game's streams hold.
+    """
+    return sum(map(len, game.rng.state().values()))
+
+
+class ParkingLot:
+    """
+    Keeps the Game instances of many sessions within a memory budget by
+    parking the least recently used ones to disk.
+
+    A parked session is written out as a snapshot and its Game and game
+    loop are dropped. It is restored when its player's next line
+    arrives, and the player sees no difference: the restored game loop is
+    run up to the prompt the player is already looking at, with its output
+    discarded, and is then sent the line.
+
+    Sessions are only parked while waiting for input, which on one event
+    loop is every session but the one handling a line.
+    """
+    def __init__(self, directory, budget=DEFAULT_BUDGET, instrument=None,
+                 metrics_registry=None):
+        """
+        Initialises the ParkingLot.
+
+        Parameters
+        ----------
+        directory : str
+            Where parked sessions are written. It is created if missing.
+        budget : int, optional
+            Bytes of game state to keep resident across all sessions.
+            Defaults to DEFAULT_BUDGET.
+        instrument : callable, optional
+            Called with each restored Game before its game loop starts,
+            such as Metrics.instrument. Defaults to None.
+        metrics_registry : metrics.Metrics, optional
+            Receives the resident and parked session counts, parks and
+            restore times. Defaults to None.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.budget = budget
+        self.instrument = instrument
+        self.metrics = metrics_registry
+        # Resident sessions by key, least recently used first
+        self.resident = OrderedDict()
+        self.resident_bytes = 0
+        self.parked = 0
+        self.parks = 0
+        self.failed_parks = 0
+        self.restores = 0
+        self.restore_seconds = 0.0
+        self.shared_ids = session_host._shared_object_ids()
+        self._next_key = 1
+
+    def play(self, game):
+        """
+        Runs a session's game loop under the lot, with the same protocol as
+        Game.play, so it can be driven by game_io.play.
+
+        The caller must not keep its own reference to the game, or parking
+        it would free nothing.
+
+        Parameters
+        ----------
+        game : Game
+            The session to play.
+
+        Yields
+        ------
+        str
+            The prompt for the next line of input.
+        """
+        key = self._next_key
+        self._next_key += 1
+        session = _Session(key, game, os.path.join(
+            self.directory, f"session-{os.getpid()}-{key}.snap"))
+        # From here on the game is only reachable through the session
+        del game
+        try:
+            session.steps = session.game.play()
+            prompt = next(session.steps)
+            self.resident[key] = session
+            self._measure(session)
+            self._evict(session)
+            while True:
+                line = yield prompt
+                if session.game is None:
+                    self._restore(session)
+                else:
+                    self.resident.move_to_end(key)
+                prompt = session.steps.send(line)
+                session.inputs += 1
+                if (session.inputs >= MEASURE_INTERVAL
+                        or _buffers(session.game) != session.buffers):
+                    self._measure(session)
+                self._evict(session)
+        finally:
+            self._discard(session)
+
+    def _measure(self, session):
+        """
+        Refreshes the estimated heap of a resident session.
+        """
+        size = session_host.deep_sizeof(session.game, self.shared_ids)
+        self.resident_bytes += size - session.size
+        session.size = size
+        session.inputs = 0
+        session.buffers = _buffers(session.game)
+        self._report()
+
+    def _evict(self, current):
+        """
+        Parks the least recently used sessions, other than the one being
+        played, until the resident sessions fit the budget.
+        """
+        if self.resident_bytes <= self.budget:
+            return
+        for session in list(self.resident.values()):
+            if self.resident_bytes <= self.budget:
+                break
+            if session is not current:
+                self._park(session)
+
+    def _park(self, session):
+        """
+        Writes a resident session to disk and drops its Game. A session
+        that cannot be written, such as one holding game data a snapshot
+        cannot refer to, stays resident.
+        """
+        try:
+            # Parked sessions end with the process, so unlike snapshot.save
+            # this skips writing a temporary file and renaming it
+            data = snapshot.snapshot(session.game)
+            with open(session.path, 'wb') as file:
+                file.write(data)
+        except (ValueError, OSError):
+            self.failed_parks += 1
+            return
+        session.steps.close()
+        session.game = session.steps = None
+        del self.resident[session.key]
+        self.resident_bytes -= session.size
+        self.parked += 1
+        self.parks += 1
+        if self.metrics is not None:
+            self.metrics.record_park()
+        self._report()
+
+    def _restore(self, session):
+        """
+        Loads a parked session back into memory, with its game loop waiting
+        at the prompt the player was last shown.
+        """
+        start = time.perf_counter()
+        game = snapshot.load(session.path)
+        os.remove(session.path)
+        if self.instrument is not None:
+            self.instrument(game)
+        steps = game.play()
+        # The player has already seen this output and prompt
+        with journal.muted_output():
+            next(steps)
+        session.game, session.steps = game, steps
+        self.parked -= 1
+        self.resident[session.key] = session
+        self.resident_bytes += session.size
+        elapsed = time.perf_counter() - start
+        self.restores += 1
+        self.restore_seconds += elapsed
+        if self.metrics is not None:
+            self.metrics.observe(self.metrics.restore_seconds, elapsed)
+        self._report()
+
+    def _discard(self, session):
+        """
+        Forgets a finished session, resident or parked.
+        """
+        if session.game is None:
+            if os.path.exists(session.path):
+                os.remove(session.path)
+                self.parked -= 1
+        elif self.resident.pop(session.key, None) is not None:
+            self.resident_bytes -= session.size
+        self._report()
+
+    def _report(self):
+        if self.metrics is not None:
+            self.metrics.record_parking(len(self.resident), self.parked,
+                                        self.resident_bytes)
+
+    def resident_games(self):
+        """
+        Returns the Game of every resident session.
+        """
+        return [session.game for session in self.resident.values()]
+
+    def stats(self):
+        """
+        Reports the lot's sessions and activity.
+
+        Returns
+        -------
+        dict
+            The resident and parked session counts, the resident bytes and
+            budget, and the parks, failed parks, restores and mean restore
+            time so far.
+        """
+        return {
+            'resident_sessions': len(self.resident),
+            'parked_sessions': self.parked,
+            'resident_bytes': self.resident_bytes,
+            'budget_bytes': self.budget,
+            'parks': self.parks,
+            'failed_parks': self.failed_parks,
+            'restores': self.restores,
+            'mean_restore_ms': round(self.restore_seconds * 1000
+                                     / self.restores, 3)
+                               if self.restores else 0,
+        }
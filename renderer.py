@@ -0,0 +1,74 @@
+import contextlib
+import sys
+
+
+class Renderer:
+    """
+    Collects everything printed during a turn and passes it on in a single
+    write.
+
+    A Renderer stands in for sys.stdout. Nothing reaches the terminal until
+    flush is called, which input() does before reading, so the output of a
+    whole turn and the next prompt arrive as one write instead of one per
+    print() call. Over node-pty and the WebSocket that means one frame per
+    turn.
+    """
+    def __init__(self, stream):
+        """
+        Initialises the Renderer.
+
+        Parameters
+        ----------
+        stream : file-like
+            Where flushed output is written, usually the original
+            sys.stdout.
+        """
+        self.stream = stream
+        self._parts = []
+
+    def write(self, text):
+        """
+        Buffers text until the next flush.
+        """
+        self._parts.append(text)
+        return len(text)
+
+    def flush(self):
+        """
+        Writes the buffered text to the stream in one write.
+        """
+        if self._parts:
+            text = ''.join(self._parts)
+            self._parts.clear()
+            self.stream.write(text)
+        self.stream.flush()
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    @property
+    def encoding(self):
+        return getattr(self.stream, 'encoding', 'utf-8')
+
+
+@contextlib.contextmanager
+def buffered_output():
+    """
+    Routes sys.stdout through a Renderer while active, flushing whatever is
+    left when the block exits, even on exit() or an error.
+
+    Only for a process that runs one game; session_host already buffers
+    each session's output until it reads input.
+
+    Yields
+    ------
+    Renderer
+        The installed renderer.
+    """
+    renderer = Renderer(sys.stdout)
+    sys.stdout = renderer
+    try:
+        yield renderer
+    finally:
+        sys.stdout = renderer.stream
+        renderer.flush()
@@ -0,0 +1,234 @@
+import hashlib
+import random
+
+# Subsystems that draw random numbers, each from its own stream
+SUBSYSTEMS = ('combat', 'stats', 'spawn', 'rooms', 'objects', 'enemy_ai')
+
+# Number of values generated per buffer refill
+BUFFER_SIZE = 512
+
+# Buffer key for uniform floats in [0, 1)
+UNIT = 0
+
+
+def derive_seed(*parts):
+    """
+    Derives a 64-bit seed from a master seed and stream labels.
+
+    Parameters
+    ----------
+    *parts : object
+        The master seed followed by labels such as the subsystem name.
+
+    Returns
+    -------
+    int
+        A seed that is stable across runs and platforms.
+    """
+    material = ':'.join(str(part) for part in parts).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(material, digest_size=8).digest(),
+                          'big')
+
+
+class RngStream:
+    """
+    An independent, seeded stream of random numbers for one subsystem.
+
+    Dice rolls and uniform floats are generated in bulk into buffers and
+    handed out one at a time. Refill number n of a buffer always comes from
+    the same derived seed, so a stream's position is fully described by
+    how many refills each buffer has had and how many values are left in
+    it. That keeps the state small and lets it be restored without
+    replaying earlier draws. A restored buffer is only regenerated when it
+    is next drawn from, so restoring costs nothing for unused dice.
+    """
+    __slots__ = ('seed', '_buffers', '_refills', '_pending')
+
+    def __init__(self, seed):
+        """
+        Initialises the RngStream.
+
+        Parameters
+        ----------
+        seed : int
+            The stream's seed, usually from derive_seed.
+        """
+        self.seed = seed
+        self._buffers = {}
+        self._refills = {}
+        # Values left in restored buffers that have not been regenerated
+        self._pending = {}
+
+    def _refill(self, kind):
+        """
+        Generates the next buffer of values for a die size or UNIT, or
+        regenerates the rest of a restored one.
+
+        Parameters
+        ----------
+        kind : int
+            The number of sides, or UNIT for floats.
+
+        Returns
+        -------
+        list
+            The buffer, with values consumed from its end.
+        """
+        remaining = self._pending.pop(kind, 0)
+        refills = self._refills.get(kind, 0) + (0 if remaining else 1)
+        self._refills[kind] = refills
+        generator = random.Random(derive_seed(self.seed, kind, refills))
+        if kind == UNIT:
+            values = [generator.random() for _ in range(BUFFER_SIZE)]
+        else:
+            values = generator.choices(range(1, kind + 1), k=BUFFER_SIZE)
+        if remaining:
+            del values[remaining:]
+        self._buffers[kind] = values
+        return values
+
+    def roll(self, sides=20):
+        """
+        Rolls a die with a given number of sides.
+
+        Parameters
+        ----------
+        sides : int, optional
+            The number of sides on the die. Defaults to 20.
+
+        Returns
+        -------
+        int
+            The result of the die roll.
+        """
+        values = self._buffers.get(sides)
+        if not values:
+            values = self._refill(sides)
+        return values.pop()
+
+    def random(self):
+        """
+        Returns a uniform float in [0, 1).
+        """
+        values = self._buffers.get(UNIT)
+        if not values:
+            values = self._refill(UNIT)
+        return values.pop()
+
+    def randint(self, low, high):
+        """
+        Returns an integer between low and high inclusive.
+        """
+        return low - 1 + self.roll(high - low + 1)
+
+    def choice(self, sequence):
+        """
+        Picks an element of a non-empty sequence uniformly.
+        """
+        return sequence[int(self.random() * len(sequence))]
+
+    def state(self):
+        """
+        Describes the stream's position.
+
+        Returns
+        -------
+        dict
+            Maps each buffer kind to (refills, values remaining).
+        """
+        return {kind: (refills, self._pending.get(kind) or
+                       len(self._buffers.get(kind, ())))
+                for kind, refills in self._refills.items()}
+
+    def restore(self, state):
+        """
+        Moves the stream to a position returned by state.
+
+        Parameters
+        ----------
+        state : dict
+            Maps each buffer kind to (refills, values remaining).
+        """
+        self._buffers = {}
+        self._refills = {}
+        self._pending = {}
+        for kind, (refills, remaining) in state.items():
+            self._refills[kind] = refills
+            if remaining:
+                self._pending[kind] = remaining
+
+
+class RngService:
+    """
+    Hands out one independent RngStream per subsystem, all derived from a
+    single master seed. Two services with the same seed produce the same
+    draws in every subsystem, whatever order the subsystems are used in.
+    """
+    def __init__(self, seed=None):
+        """
+        Initialises the RngService.
+
+        Parameters
+        ----------
+        seed : int, optional
+            The master seed. Defaults to a fresh seed from the operating
+            system.
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
+        self._streams = {}
+
+    def stream(self, name):
+        """
+        Returns the stream for a subsystem, creating it on first use.
+
+        Parameters
+        ----------
+        name : str
+            The subsystem name, normally one of SUBSYSTEMS.
+
+        Returns
+        -------
+        RngStream
+            The subsystem's stream.
+        """
+        stream = self._streams.get(name)
+        if stream is None:
+            stream = self._streams[name] = RngStream(
+                derive_seed(self.seed, name))
+        return stream
+
+    def state(self):
+        """
+        Describes the position of every stream used so far.
+
+        Returns
+        -------
+        dict
+            Maps subsystem names to RngStream.state results.
+        """
+        return {name: stream.state()
+                for name, stream in self._streams.items()}
+
+    def restore(self, state):
+        """
+        Moves every stream to the positions returned by state.
+        """
+        self._streams = {}
+        for name, stream_state in state.items():
+            self.stream(name).restore(stream_state)
+
+
+# Shared service for callers that do not inject their own
+_default_service = None
+
+
+def default_service():
+    """
+    Returns the process-wide RngService, creating it unseeded on first use.
+    """
+    global _default_service
+    if _default_service is None:
+        _default_service = RngService()
+    return _default_service
@@ -1,12 +1,76 @@
+from collections import namedtuple
+
 import game_states
+import commands
+import dungeon
 import dungeon_areas
 import enemies
+import enemy_ai
 import objects
+import renderer
+import rng_service
+import spawn_tables
+import state_registry
 import utilities
-import random
 from colorama import Fore, Back, Style, init
-# init colorama
-init()
+from state_registry import StateSpec
+
+
+# Placeholder for slots that have not been assigned yet
+_UNSET = object()
+
+# The stats an entity derives from its abilities, type and equipment
+DerivedStats = namedtuple('DerivedStats', [
+    'strength_modifier',  # Modifier for heavy attacks
+    'dexterity_modifier',  # Modifier for quick attacks and dodges
+    'ac',  # Armour class
+    'max_hit_points',  # Hit points at full health
+])
+
+# One DerivedStats per distinct set of values, shared by every entity that
+# has them, so each entity pays for a single slot
+_SHARED_DERIVED_STATS = {}
+
+# Distinct DerivedStats kept for sharing before the store starts over
+MAX_SHARED_DERIVED_STATS = 4096
+
+# What the shadows whisper when the player asks for a hint in a fight
+HINTS = {
+    'quick': "Strike quickly.",
+    'heavy': "Put your weight behind a heavy blow.",
+    'dodge': "Dodge, and wait for an opening.",
+}
+
+
+def _derived_stat_input(name):
+    """
+    Creates a property for an attribute that derived stats depend on.
+
+    Setting the attribute to a different value clears the entity's cached
+    DerivedStats, so they are recomputed the next time they are needed.
+
+    Parameters
+    ----------
+    name : str
+        The public attribute name. The value is stored in the slot of the
+        same name with a leading underscore.
+
+    Returns
+    -------
+    property
+        The property to place on the class.
+    """
+    slot = '_' + name
+
+    def get(self):
+        return getattr(self, slot)
+
+    def set(self, value):
+        if getattr(self, slot, _UNSET) != value:
+            setattr(self, slot, value)
+            self._derived_stats = None
+
+    return property(get, set, doc=f"The entity's {name.replace('_', ' ')}.")
 
 
 class Entity:
@@ -14,6 +78,21 @@ class Entity:
     Represents a generic entity in a game, including attributes such as
     strength, dexterity, and hit points.
     """
+    # Fixed attribute layout, so entities carry no per-instance __dict__
+    __slots__ = ('_entity_type', 'name', '_strength', '_dexterity',
+                 '_constitution', 'intelligence', 'wisdom', 'charisma',
+                 'hit_points', 'weapon', '_armor_bonus', '_shield_bonus',
+                 '_other_bonuses', '_derived_stats')
+
+    # Inputs to the cached derived stats
+    entity_type = _derived_stat_input('entity_type')
+    strength = _derived_stat_input('strength')
+    dexterity = _derived_stat_input('dexterity')
+    constitution = _derived_stat_input('constitution')
+    armor_bonus = _derived_stat_input('armor_bonus')
+    shield_bonus = _derived_stat_input('shield_bonus')
+    other_bonuses = _derived_stat_input('other_bonuses')
+
     def __init__(self, entity_type, name, strength, dexterity, constitution,
                  intelligence, wisdom, charisma):
         """
@@ -38,6 +117,10 @@ class Entity:
         charisma : int
             The entity's charisma attribute.
         """
+        self._derived_stats = None
+        self.armor_bonus = None
+        self.shield_bonus = None
+        self.other_bonuses = None
         self.entity_type = entity_type
         self.name = name
         self.strength = strength
@@ -48,9 +131,6 @@ class Entity:
         self.charisma = charisma
         self.calculate_hit_points()
         self.weapon = None
-        self.armor_bonus = None
-        self.shield_bonus = None
-        self.other_bonuses = None
 
     def calculate_modifier(self, ability_score):
         """
@@ -68,49 +148,100 @@ class Entity:
         """
         return (ability_score - 5) // 2
 
+    def derive_stats(self):
+        """
+        Computes and caches the stats derived from abilities, entity type
+        and equipment: the strength and dexterity modifiers, armour class
+        and maximum hit points.
+
+        Returns
+        -------
+        DerivedStats
+            The stats, shared with every other entity that has the same.
+        """
+        dexterity_modifier = self.calculate_modifier(self._dexterity)
+
+        # Base hit points, constitution modifier and type-based hit points
+        max_hit_points = (
+            10 + self.calculate_modifier(self._constitution)
+            + utilities.HP_TYPE_MODIFIERS.get(self._entity_type, 0))
+
+        # Dexterity modifier and entity type-based AC
+        ac = (dexterity_modifier
+              + utilities.AC_TYPE_MODIFIERS.get(self._entity_type, 0))
+        # Add Armor, Shield and Other Bonuses if available
+        if self._armor_bonus is not None:
+            ac += self._armor_bonus
+        if self._shield_bonus is not None:
+            ac += self._shield_bonus
+        if self._other_bonuses is not None:
+            ac += self._other_bonuses
+
+        # A plain tuple equals and hashes like the DerivedStats it stands
+        # for, and is cheaper to build for the lookup
+        values = (self.calculate_modifier(self._strength),
+                  dexterity_modifier, ac, max_hit_points)
+        stats = _SHARED_DERIVED_STATS.get(values)
+        if stats is None:
+            if len(_SHARED_DERIVED_STATS) >= MAX_SHARED_DERIVED_STATS:
+                _SHARED_DERIVED_STATS.clear()
+            stats = DerivedStats._make(values)
+            _SHARED_DERIVED_STATS[stats] = stats
+        self._derived_stats = stats
+        return stats
+
+    @property
+    def strength_modifier(self):
+        """
+        The cached strength modifier.
+        """
+        stats = self._derived_stats
+        if stats is None:
+            stats = self.derive_stats()
+        return stats.strength_modifier
+
+    @property
+    def dexterity_modifier(self):
+        """
+        The cached dexterity modifier.
+        """
+        stats = self._derived_stats
+        if stats is None:
+            stats = self.derive_stats()
+        return stats.dexterity_modifier
+
+    @property
+    def max_hit_points(self):
+        """
+        The cached hit points for the entity's constitution and type.
+        """
+        stats = self._derived_stats
+        if stats is None:
+            stats = self.derive_stats()
+        return stats.max_hit_points
+
     def calculate_hit_points(self):
         """
         Calculates the total hit points of the entity based on base hit
         points, constitution modifier, and entity type.
         """
-        # Base hit points
-        base_hit_points = 10
-        constitution_modifier = self.calculate_modifier(self.constitution)
-
-        # Additional hit points based on type
-        type_modifier = utilities.HP_TYPE_MODIFIERS.get(self.entity_type, 0)
-
-        # Total hit points
-        self.hit_points = (base_hit_points + constitution_modifier
-                           + type_modifier)
+        self.hit_points = self.max_hit_points
 
     def calculate_ac(self):
         """
         Calculates the armor class (AC) of the entity based on dexterity,
-        entity type, and bonuses from equipped items.
+        entity type, and bonuses from equipped items. The value is cached
+        until one of those inputs changes.
 
         Returns
         -------
         int
             The calculated armor class.
         """
-        # Base AC
-        ac = 0
-        # Add Dexterity modifier
-        ac += self.calculate_modifier(self.dexterity)
-        # Entity type-based AC
-        type_modifier = utilities.AC_TYPE_MODIFIERS.get(self.entity_type, 0)
-        ac += type_modifier
-        # Add Armor Bonus if available
-        if self.armor_bonus is not None:
-            ac += self.armor_bonus
-        # Add Shield Bonus if available
-        if self.shield_bonus is not None:
-            ac += self.shield_bonus
-        # Add Other Bonuses if available
-        if self.other_bonuses is not None:
-            ac += self.other_bonuses
-        return ac
+        stats = self._derived_stats
+        if stats is None:
+            stats = self.derive_stats()
+        return stats.ac
 
 
 class Character(Entity):
@@ -119,6 +250,7 @@ class Character(Entity):
     with additional properties related to the character's stats, weapon, and
     behavior.
     """
+    __slots__ = ('stat_changes', 'object_picked_FL')
 
     def __init__(self, name=None):
         """
@@ -213,7 +345,7 @@ class Character(Entity):
             return f"{sign} {abs(change)}"
         return ""
 
-    def roll_stats(self):
+    def roll_stats(self, rng=None):
         """
         Rolls stats for a new character using the 4d6 drop lowest method.
 
@@ -222,15 +354,23 @@ class Character(Entity):
         lowest roll, and sums the remaining three to generate the value for
         that attribute.
 
+        Parameters
+        ----------
+        rng : rng_service.RngStream, optional
+            The stream to roll the dice from. Defaults to the shared
+            service's 'stats' stream.
+
         Returns
         -------
         dict
             A dictionary containing the rolled values for each attribute.
         """
+        if rng is None:
+            rng = rng_service.default_service().stream('stats')
         attributes = ['Strength', 'Dexterity', 'Constitution', 'Intelligence',
                       'Wisdom', 'Charisma']
         for attribute in attributes:
-            rolls = [random.randint(1, 6) for _ in range(4)]
+            rolls = [rng.roll(6) for _ in range(4)]
             rolls.remove(min(rolls))
             setattr(self, attribute.lower(), sum(rolls))
 
@@ -238,10 +378,14 @@ class Character(Entity):
 class Enemy(Entity):
     """
     Represents an enemy character in the game, extending the Entity class
-    with specific properties related to the enemy's weapon.
+    with specific properties related to the enemy's weapon and how it
+    fights.
     """
+    __slots__ = ('policy',)
+
     def __init__(self, entity_type, name, strength, dexterity, constitution,
-                 intelligence, wisdom, charisma, weapon):
+                 intelligence, wisdom, charisma, weapon,
+                 policy=enemy_ai.DEFAULT_POLICY):
         """
         Initialises an Enemy object with specific attributes and a given
         weapon.
@@ -266,13 +410,37 @@ class Enemy(Entity):
             The charisma of the enemy.
         weapon : dict
             The weapon of the enemy.
+        policy : str, optional
+            The name of the enemy's AI policy in enemy_ai.POLICIES.
+            Defaults to enemy_ai.DEFAULT_POLICY.
         """
         super().__init__(entity_type, name, strength, dexterity, constitution,
                          intelligence, wisdom, charisma)
         self.weapon = weapon
+        self.policy = policy
+
+    @classmethod
+    def from_template(cls, template):
+        """
+        Creates an Enemy from a validated template.
+
+        Parameters
+        ----------
+        template : spawn_tables.EnemyTemplate
+            The template to create the enemy from.
+
+        Returns
+        -------
+        Enemy
+            A new enemy with the template's stats, weapon and policy.
+        """
+        return cls(template.entity_type, template.name, template.strength,
+                   template.dexterity, template.constitution,
+                   template.intelligence, template.wisdom,
+                   template.charisma, template.weapon, template.policy)
 
     @staticmethod
-    def generate_enemy(current_room):
+    def generate_enemy(current_room, rng=None):
         """
         Generates a random enemy based on the current room and available enemy
         templates.
@@ -281,33 +449,21 @@ class Enemy(Entity):
         ----------
         current_room : str
             The identifier of the current room within the dungeon.
+        rng : rng_service.RngStream, optional
+            The stream to sample from. Defaults to the shared service's
+            'spawn' stream.
 
         Returns
         -------
         Enemy
             An instance of the Enemy class representing the generated enemy.
         """
-        # Select random enemy
-        possible_enemies = (dungeon_areas.ROOMS['second_layer']
-                            ['common_enemies'])
-        specific_enemy = (dungeon_areas.ROOMS['second_layer']
-                          ['specific_enemies'].get(current_room))
-        if specific_enemy:
-            possible_enemies.append(specific_enemy)
-
-        enemy_dict = random.choice(possible_enemies)
+        if rng is None:
+            rng = rng_service.default_service().stream('spawn')
+        # Select random enemy from the room's precompiled spawn table
+        template = spawn_tables.spawn_table(current_room).sample(rng)
         # Create Enemy instance
-        return Enemy(
-            enemy_dict['entity_type'],
-            enemy_dict['name'],
-            enemy_dict['strength'],
-            enemy_dict['dexterity'],
-            enemy_dict['constitution'],
-            enemy_dict['intelligence'],
-            enemy_dict['wisdom'],
-            enemy_dict['charisma'],
-            enemy_dict['weapon']
-        )
+        return Enemy.from_template(template)
 
 
 class Fight:
@@ -315,11 +471,29 @@ class Fight:
     Represents a fight between characters in the game, managing the mechanics
     of combat such as initiative, dodging, attacking, and checking for death.
     """
-    def __init__(self):
+    # Actions a combatant can take on their turn
+    ACTIONS = ('quick', 'heavy', 'dodge')
+
+    def __init__(self, verbose=True, rng=None):
         """
         Initialises a Fight object with flags for dodging.
+
+        Parameters
+        ----------
+        verbose : bool, optional
+            Whether the fight prints its narration. Defaults to True.
+            Simulations pass False to skip building the messages at all.
+        rng : rng_service.RngStream, optional
+            The stream dice are rolled from. Defaults to the shared
+            service's 'combat' stream.
         """
         self.dodge_flags = {}
+        # Turns taken so far in the current fight
+        self.turns_taken = 0
+        self.verbose = verbose
+        if rng is None:
+            rng = rng_service.default_service().stream('combat')
+        self.rng = rng
 
     def roll_die(self, sides=20):
         """
@@ -335,7 +509,7 @@ class Fight:
         int
             The result of the die roll.
         """
-        return random.randint(1, sides)
+        return self.rng.roll(sides)
 
     def initiative(self, player, enemy):
         """
@@ -354,16 +528,16 @@ class Fight:
         Entity
             The entity that has the initiative and will go first.
         """
-        player_initiative = (self.roll_die() +
-                             player.calculate_modifier(player.dexterity))
-        enemy_initiative = (self.roll_die() +
-                            enemy.calculate_modifier(enemy.dexterity))
+        player_initiative = self.roll_die() + player.dexterity_modifier
+        enemy_initiative = self.roll_die() + enemy.dexterity_modifier
         if player_initiative >= enemy_initiative:
-            print(f"Time to fight! {player.name.capitalize()} has the"
-                  " initiative.")
+            if self.verbose:
+                print(f"Time to fight! {player.name.capitalize()} has the"
+                      " initiative.")
             return player
         else:
-            print(f"Time to fight! {enemy.name} has the initiative.")
+            if self.verbose:
+                print(f"Time to fight! {enemy.name} has the initiative.")
             return enemy
 
     def dodge(self, entity):
@@ -381,8 +555,7 @@ class Fight:
             The dodge bonus value.
         """
         # Define how the dodge bonus is calculated
-        dodge_bonus = (self.roll_die(sides=6) +
-                       entity.calculate_modifier(entity.dexterity))
+        dodge_bonus = self.roll_die(sides=6) + entity.dexterity_modifier
         return dodge_bonus
 
     def check_death(self, entity):
@@ -429,12 +602,10 @@ class Fight:
             return
         try:
             if attack_type == "quick":
-                modifier = (attacker.calculate_modifier
-                            (attacker.dexterity))
+                modifier = attacker.dexterity_modifier
                 base_damage = 5
             elif attack_type == "heavy":
-                modifier = (attacker.calculate_modifier
-                            (attacker.strength))
+                modifier = attacker.strength_modifier
                 base_damage = 10
             else:
                 raise ValueError(f"You must use a 'quick' or 'heavy' attack")
@@ -444,22 +615,150 @@ class Fight:
             dodge_bonus = 0
             if defender_dodging:
                 dodge_bonus = self.dodge(defender)
-                print(f"{defender.name} attempts to dodge!")
+                if self.verbose:
+                    print(f"{defender.name} attempts to dodge!")
             if attack_roll >= (defender.calculate_ac() + dodge_bonus):
                 damage = base_damage + modifier
                 defender.hit_points -= damage
-                print(f"{attacker.name.capitalize()} attacks"
-                      f" {defender.name.capitalize()} with a {attack_type}"
-                      f" attack, dealing {damage} damage!")
+                if self.verbose:
+                    print(f"{attacker.name.capitalize()} attacks"
+                          f" {defender.name.capitalize()} with a"
+                          f" {attack_type} attack, dealing {damage}"
+                          " damage!")
                 # Check if defender is dead after the attack
                 if self.check_death(defender):
                     return
-            else:
+            elif self.verbose:
                 print(f"{attacker.name} swings at"
                       f" {defender.name}, but misses!")
         except ValueError as e:
             print(e)
 
+    def take_turn(self, attacker, defender, action):
+        """
+        Resolves a single turn for the attacker and counts it in
+        turns_taken. Both run and turns take every turn through here.
+
+        A dodge lasts until the dodger's next turn, so it protects against
+        exactly one incoming attack.
+
+        Parameters
+        ----------
+        attacker : Entity
+            The entity whose turn it is.
+        defender : Entity
+            The entity on the receiving end of the turn.
+        action : str
+            The attacker's action: "quick", "heavy" or "dodge".
+
+        Returns
+        -------
+        bool
+            Whether both combatants are still standing.
+        """
+        # The attacker's previous dodge ends as their own turn begins
+        self.dodge_flags[attacker] = False
+        if action == 'dodge':
+            self.dodge_flags[attacker] = True
+        else:
+            self.attack(attacker, defender, attack_type=action,
+                        defender_dodging=self.dodge_flags[defender])
+        self.turns_taken += 1
+        return attacker.hit_points > 0 and defender.hit_points > 0
+
+    def begin(self, player, enemy):
+        """
+        Starts a fight: clears both dodge flags and the turn count, and
+        rolls initiative.
+
+        Returns
+        -------
+        tuple of Entity
+            The combatant who takes the first turn, then the other one.
+        """
+        self.dodge_flags[player] = False
+        self.dodge_flags[enemy] = False
+        self.turns_taken = 0
+        attacker = self.initiative(player, enemy)
+        return attacker, (enemy if attacker is player else player)
+
+    def run(self, player, enemy, player_policy, enemy_policy):
+        """
+        Runs the turn loop of a fight until one combatant is defeated.
+
+        Parameters
+        ----------
+        player : Entity
+            The player's character.
+        enemy : Entity
+            The enemy character.
+        player_policy : callable
+            Called as player_policy(player, enemy, fight) on the player's
+            turns and returns one of Fight.ACTIONS.
+        enemy_policy : callable
+            Called as enemy_policy(enemy, player, fight) on the enemy's
+            turns and returns one of Fight.ACTIONS.
+
+        Returns
+        -------
+        int
+            The number of turns taken, as also left in turns_taken.
+        """
+        attacker, defender = self.begin(player, enemy)
+        policy, next_policy = ((player_policy, enemy_policy)
+                               if attacker is player
+                               else (enemy_policy, player_policy))
+
+        # Continue the fight until one of the characters is defeated
+        fighting = player.hit_points > 0 and enemy.hit_points > 0
+        while fighting:
+            fighting = self.take_turn(attacker, defender,
+                                      policy(attacker, defender, self))
+            attacker, defender = defender, attacker
+            policy, next_policy = next_policy, policy
+        return self.turns_taken
+
+    def turns(self, player, enemy, resume=False):
+        """
+        Runs the same turn loop as run, as a generator, for callers that
+        cannot block while an action is chosen. Both loops start with begin
+        and take each turn with take_turn. The simulator keeps using run, which
+        avoids resuming a generator every turn.
+
+        Parameters
+        ----------
+        player : Entity
+            The player's character.
+        enemy : Entity
+            The enemy character.
+        resume : bool, optional
+            Carries on a fight restored part way through, at the player's
+            turn and with the dodge flags and turns_taken already set,
+            instead of rolling initiative. Defaults to False.
+
+        Yields
+        ------
+        Entity
+            The combatant whose turn it is. The generator must be sent their
+            action, one of Fight.ACTIONS.
+
+        Returns
+        -------
+        int
+            The number of turns taken, once one combatant is defeated.
+        """
+        if resume:
+            attacker, defender = player, enemy
+        else:
+            attacker, defender = self.begin(player, enemy)
+
+        # Continue the fight until one of the characters is defeated
+        fighting = player.hit_points > 0 and enemy.hit_points > 0
+        while fighting:
+            fighting = self.take_turn(attacker, defender, (yield attacker))
+            attacker, defender = defender, attacker
+        return self.turns_taken
+
 
 class Game:
     """
@@ -469,16 +768,30 @@ class Game:
     of the game, including interactions with characters, navigation through
     rooms, and combat with enemies.
     """
-    def __init__(self):
+    def __init__(self, seed=None):
         """
         Initializes a new instance of the Game class. This method calls the
         reset_game method to set all game-related attributes to their initial
-        values, ensuring a fresh start. It then calls the handle_initialise
-        method to display the game's title, introduction, and prepare the
-        player to enter the game world.
+        values, ensuring a fresh start. Nothing is printed until the run
+        method starts the session, so a Game can be created without side
+        effects.
+
+        Parameters
+        ----------
+        seed : int, optional
+            Seeds every random stream of the session, so the same inputs
+            replay the same game. Defaults to a fresh random seed.
         """
+        self.rng = rng_service.RngService(seed)
+        # The dungeon's layout is fixed for the session by its seed
+        self.dungeon = dungeon.Dungeon(
+            rng_service.derive_seed(self.rng.seed, 'dungeon'))
+        # Reads a line of input; replaced to record or replay a session
+        self.read_input = input
+        # Turns taken by the last fight, for metrics
+        self.fight_turns = 0
         self.reset_game()
-        self.handle_initialise()
+        self.state = game_states.FIRST_LAYER_STATES['INITIALISE']
 
     def reset_game(self):
         """
@@ -500,6 +813,12 @@ class Game:
             Resets to None for starting the game fresh.
         enemy_instance : None
             Resets to None for starting the game fresh.
+        fight : None
+            Resets to None, as no battle is in progress.
+        depth : int
+            Resets to 0, the starting room.
+        room_index : int
+            Resets to 0, the starting room's position in its depth.
         """
         self.previous_state = None
         self.character = Character()
@@ -507,13 +826,60 @@ class Game:
         self.object_choice = None
         self.room_choice_name = None
         self.enemy_instance = None
+        self.fight = None
+        self.depth = 0
+        self.room_index = 0
 
     def run(self):
         """
-        Executes the main game loop, constantly reading user input and
-        responding accordingly. The method handles transitions between
-        different game states, including navigation, combat, dialogue, and
-        more.
+        Plays the session with blocking input, answering every prompt the
+        game loop in play yields with a line from read_input.
+        """
+        self.drive(self.play())
+
+    def drive(self, steps):
+        """
+        Runs a generator of game steps, such as play or a fight handler, to
+        the end, answering each prompt it yields with read_input.
+
+        Parameters
+        ----------
+        steps : generator
+            Yields prompts and is sent the lines read in reply.
+
+        Returns
+        -------
+        object
+            The generator's return value.
+        """
+        try:
+            prompt = next(steps)
+            while True:
+                prompt = steps.send(self.read_input(prompt))
+        except StopIteration as stop:
+            return stop.value
+
+    def play(self):
+        """
+        Executes the main game loop as a generator, constantly asking for
+        user input and responding accordingly. The method handles
+        transitions between different game states, including navigation,
+        combat, dialogue, and more.
+
+        The loop never blocks on input itself. It yields the prompt for
+        each line it needs and is sent the line in reply, so run can drive
+        it from the terminal and an event loop can drive many sessions at
+        once.
+
+        Each turn looks the current state up once in STATES, which gives the
+        prompt builder, whether to read input, the input handler and the
+        states the handler may move to. Handlers that need more input, such
+        as the fight's, are generators too and are run with yield from.
+
+        Yields
+        ------
+        str
+            The prompt for the next line of input.
 
         Attributes
         ----------
@@ -523,12 +889,22 @@ class Game:
             The user's input, or None if no input is required.
         new_state : str or None
             The new game state if a state transition occurs.
+
+        Raises
+        ------
+        RuntimeError
+            If a handler moves to a state its spec does not allow.
         """
+        # Display the intro once the session actually starts
+        if self.state == game_states.FIRST_LAYER_STATES['INITIALISE']:
+            self.handle_initialise()
         while True:
-            prompt = self.get_prompt()
+            spec = self.STATES[self.state]
+            prompt = spec.prompt(self)
             # Only prompt for user input if the current state requires it
-            if self.state not in game_states.SECOND_LAYER_STATES.values():
-                user_input = input(f"{prompt}\n").lower()
+            if spec.reads_input:
+                user_input = commands.resolve(
+                    spec.command_table, (yield f"{prompt}\n").lower())
                 print("\n" + utilities.return_divider())
                 new_state = self.handle_universal_commands(user_input,
                                                            self.state,
@@ -540,64 +916,34 @@ class Game:
             else:
                 user_input = None
                 print(prompt)
-            self.handle_input(user_input)
+            if spec.handler is not None:
+                steps = spec.handler(self, user_input)
+                if steps is not None:
+                    yield from steps
+                if self.state not in spec.transitions:
+                    raise RuntimeError(f"'{spec.state}' cannot move to"
+                                       f" '{self.state}'")
 
     def print_help(self, previous_state):
         """
-        Prints a help message describing the available commands based on the
-        current state and previous state of the game.
+        Returns the help message describing the available commands in the
+        state the player asked for help from.
 
-        This function provides contextual guidance to the player, offering
-        different commands and information depending on the current state of
-        the game. The help message may include basic commands like 'Return'
-        and 'Exit', and specific guidance based on the player's current
-        location or situation within the game.
+        The messages are rendered once, when STATES is compiled, from each
+        state's help lines.
 
         Parameters
         ----------
         previous_state : str
             The previous state of the game, used to provide context-specific
-             elp.
+            help.
 
         Returns
         -------
         str
             The help text to be displayed to the player.
         """
-        help_text = "\nYou whispered for help... The shadows respond:"
-        help_text += "\n'Return'  : Resume your previous action."
-        if previous_state not in [
-            game_states.FIRST_LAYER_STATES['GAME_START'],
-            game_states.FIRST_LAYER_STATES['CHARACTER_CREATION']
-        ]:
-            help_text += "\n'Stats'   : Understand what you're made of and"
-            "equipped with."
-
-        if previous_state == (game_states.GENERAL_GAME_STATES
-                              ['CHARACTER_STATS']):
-            help_text += "\nIf you've finished looking at yourself then"
-            " 'return'."
-        elif previous_state == (game_states.FIRST_LAYER_STATES
-                                ['CHARACTER_CREATION']):
-            help_text += "\n'Name'    : Type what you see on your arm to"
-            "continue."
-        elif previous_state == (game_states.FIRST_LAYER_STATES
-                                ['ROOM_PICKUP_FIRST_LAYER']):
-            help_text += "\n'Pick Up' : Pick the object up."
-            help_text += "\n'Leave'   : Leave the object."
-        elif previous_state == (game_states.FIRST_LAYER_STATES
-                                ['ROOM_DOOR_CHOICE_FIRST_LAYER']):
-            help_text += "\n'Left'    : Choose the left door."
-            help_text += "\n'Right'   : Choose the right door."
-        elif previous_state == (game_states.SECOND_LAYER_STATES
-                                ['FIGHT_SECOND_LAYER']):
-            help_text += "\n'Quick'   : Deftly strike with a quick attack."
-            help_text += "\n'Heavy'   : Unleash a powerful heavy attack."
-            help_text += "\n'Dodge'   : Focus on avoiding the next attack."
-        help_text += "\n'Exit'    : Wake from the dream and return to"
-        "reality."
-
-        return help_text
+        return self.STATES[previous_state].help_text
 
     def handle_universal_commands(self, user_input, current_state,
                                   previous_state, character):
@@ -665,7 +1011,7 @@ class Game:
             return previous_state
         return None
 
-    def handle_initialise(self):
+    def handle_initialise(self, user_input=None):
         """
         Initiates the text-based adventure game 'Subterranean Script'.
 
@@ -673,6 +1019,11 @@ class Game:
         welcome message to guide players into the mysterious and
         all-encompassing darkness of the game world.
 
+        Parameters
+        ----------
+        user_input : None, optional
+            Unused; accepted so this can be the INITIALISE state's handler.
+
         Notes
         -----
         Whisper 'help' anytime in the game to view a list of commands.
@@ -684,9 +1035,8 @@ class Game:
         """
         Returns a prompt text based on the current state of the game.
 
-        Depending on the game's current state, the method returns a string
-        containing the appropriate prompt for the player. This can include
-        various scenarios such as:
+        The prompt is built by the current state's prompt builder in STATES.
+        Depending on the state, it can include various scenarios such as:
             - Prompting for help and displaying character stats.
             - Introducing the game and creating the character.
             - Choosing objects to pick up or leave.
@@ -695,87 +1045,20 @@ class Game:
 
         Returns
         -------
-        str
-            A string containing the prompt text for the current game state.
-            The text may include:
-            - A help message if the state is 'HELP'.
-            - A return or help option if the state is 'CHARACTER_STATS'.
-            - An introductory challenge if the state is 'GAME_START'.
-            - A character creation prompt if the state is
-              'CHARACTER_CREATION'.
-            - A decision-making scenario for objects if the state is
-              'ROOM_PICKUP_FIRST_LAYER'.
-            - A navigation decision between doors if the state is
-              'ROOM_DOOR_CHOICE_FIRST_LAYER'.
-            - A fight initiation prompt if the state is 'FIGHT_SECOND_LAYER'.
-        """
-        # PROMPT - GAME STATE = GENERAL - HELP
-        if self.state == game_states.GENERAL_GAME_STATES['HELP']:
-            return self.print_help(self.previous_state)
-        # PROMPT - GAME STATE = GENERAL - CHARACTER STATS
-        elif self.state == game_states.GENERAL_GAME_STATES['CHARACTER_STATS']:
-            return ("\nIf you've finished looking at yourself then 'Return'"
-                    " or ask for 'Help'")
-        # PROMPT - GAME STATE = FIRST LAYER - GAME START
-        elif self.state == game_states.FIRST_LAYER_STATES['GAME_START']:
-            return (f"\nReady to step into the unknown?"
-                    " Type 'Enter' if you dare.")
-        # PROMPT - GAME STATE = FIRST LAYER - CHARACTER CREATION
-        elif self.state == (game_states.FIRST_LAYER_STATES
-                            ['CHARACTER_CREATION']):
-            flavor_text_intro = self.current_room['flavor_text_intro']
-            prompt_text = (
-                flavor_text_intro +
-                "\nWhat does it say on your arm?"
-            )
-            return prompt_text
-        # PROMPT - GAME STATE = FIRST LAYER - ROOM PICKUP
-        elif (self.state ==
-              game_states.FIRST_LAYER_STATES['ROOM_PICKUP_FIRST_LAYER']):
-            if self.object_choice is None:
-                self.object_choice = (
-                    random.choice(objects.OBJECTS_FIRST_LAYER))
-            prompt_text = (
-                "\nA strange chill fills the room, and your eyes are drawn to"
-                " a faint glow.\n"
-                f"\nUpon closer inspection, it's a"
-                f" {self.object_choice['name']} lying at your feet."
-                f"\n{self.object_choice['description']}\n"
-                "\nDo you 'Pick Up' or 'Leave' the weapon?"
-            )
-            return prompt_text
-        # PROMPT - GAME STATE = FIRST LAYER - ROOM DOOR CHOICE
-        elif (self.state ==
-              game_states.FIRST_LAYER_STATES['ROOM_DOOR_CHOICE_FIRST_LAYER']):
-            prompt_text = (
-                "\nTwo doors, faintly illuminated by candlelight, beckon from"
-                " the darkness."
-                "\nA mysterious force urges you to make a choice.\n"
-                "\nDo you go 'left', or go 'right'?"
-            )
-            return prompt_text
-        # PROMPT - GAME STATE = SECOND LAYER - FIGHT
-        elif (self.state ==
-              game_states.SECOND_LAYER_STATES['FIGHT_SECOND_LAYER']):
-            if self.enemy_instance is None:
-                self.enemy_instance = Enemy.generate_enemy(self.
-                                                           room_choice_name)
-            prompt_text = (
-                "\nA sinister growl echoes through the room, and your eyes"
-                f" lock with a {self.enemy_instance.entity_type}.\n"
-                f"It's a {self.enemy_instance.name},"
-                " I should be wary of its"
-                f" {self.enemy_instance.weapon['name']}.\n"
-            )
-            return prompt_text
+        str or None
+            A string containing the prompt text for the current game state,
+            or None if the state has no prompt.
+        """
+        return self.STATES[self.state].prompt(self)
 
     def handle_input(self, user_input):
         """
         Processes user input based on the current game state.
 
-        This method receives the user's input and takes the appropriate action
-        based on the current game state. It calls specific handling methods
-        that correspond to the current state of the game.
+        This method passes the user's input to the current state's handler
+        in STATES. States without a handler, such as the help screen, ignore
+        input that is not a universal command. A handler that needs more
+        input, such as the fight's, reads it with read_input.
 
         Parameters
         ----------
@@ -783,25 +1066,88 @@ class Game:
             The input provided by the user. Depending on the game state,
             different strings will be expected to perform various actions.
         """
-        if self.state == game_states.FIRST_LAYER_STATES['INITIALISE']:
-            self.handle_initialise()
-        elif self.state == game_states.FIRST_LAYER_STATES['GAME_START']:
-            self.handle_start_state(user_input)
-        elif self.state == (game_states.FIRST_LAYER_STATES
-                            ['CHARACTER_CREATION']):
-            self.handle_character_state(user_input)
-        elif (self.state ==
-              game_states.FIRST_LAYER_STATES['ROOM_PICKUP_FIRST_LAYER']):
-            self.handle_room_pickup(user_input)
-        elif (self.state ==
-              game_states.FIRST_LAYER_STATES['ROOM_DOOR_CHOICE_FIRST_LAYER']):
-            self.handle_room_door_choice(user_input)
-        elif (self.state ==
-              game_states.SECOND_LAYER_STATES['FIGHT_SECOND_LAYER']):
-            if self.enemy_instance is None:
-                self.enemy_instance = Enemy.generate_enemy(self.
-                                                           room_choice_name)
-            self.handle_battle(self.character, self.enemy_instance)
+        handler = self.STATES[self.state].handler
+        if handler is not None:
+            steps = handler(self, user_input)
+            if steps is not None:
+                self.drive(steps)
+
+    def prompt_none(self):
+        """
+        Returns no prompt, for states that print their own text.
+        """
+        return None
+
+    def prompt_help(self):
+        """
+        Returns the help message for the state help was asked for in.
+        """
+        return self.print_help(self.previous_state)
+
+    def prompt_character_stats(self):
+        """
+        Returns the prompt shown under the character's stats.
+        """
+        return ("\nIf you've finished looking at yourself then 'Return'"
+                " or ask for 'Help'")
+
+    def prompt_game_start(self):
+        """
+        Returns the prompt that asks the player to enter the dungeon.
+        """
+        return ("\nReady to step into the unknown?"
+                " Type 'Enter' if you dare.")
+
+    def prompt_character_creation(self):
+        """
+        Returns the starting room's introduction and asks for a name.
+        """
+        return (self.current_room['flavor_text_intro'] +
+                "\nWhat does it say on your arm?")
+
+    def prompt_room_pickup(self):
+        """
+        Returns the description of the object found in the first room,
+        choosing the object on first use.
+        """
+        if self.object_choice is None:
+            self.object_choice = (self.rng.stream('objects')
+                                  .choice(objects.OBJECTS_FIRST_LAYER))
+        return (
+            "\nA strange chill fills the room, and your eyes are drawn to"
+            " a faint glow.\n"
+            f"\nUpon closer inspection, it's a"
+            f" {self.object_choice['name']} lying at your feet."
+            f"\n{self.object_choice['description']}\n"
+            "\nDo you 'Pick Up' or 'Leave' the weapon?"
+        )
+
+    def prompt_room_door_choice(self):
+        """
+        Returns the prompt that asks the player to choose a door.
+        """
+        return (
+            "\nTwo doors, faintly illuminated by candlelight, beckon from"
+            " the darkness."
+            "\nA mysterious force urges you to make a choice.\n"
+            "\nDo you go 'left', or go 'right'?"
+        )
+
+    def prompt_fight(self):
+        """
+        Returns the introduction to a fight, generating the enemy on first
+        use.
+        """
+        if self.enemy_instance is None:
+            self.enemy_instance = Enemy.generate_enemy(
+                self.room_choice_name, self.rng.stream('spawn'))
+        return (
+            "\nA sinister growl echoes through the room, and your eyes"
+            f" lock with a {self.enemy_instance.entity_type}.\n"
+            f"It's a {self.enemy_instance.name},"
+            " I should be wary of its"
+            f" {self.enemy_instance.weapon['name']}.\n"
+        )
 
     def handle_start_state(self, user_input):
         """
@@ -882,7 +1228,7 @@ class Game:
             print("I suppose that's as good a start as any.")
 
             # Roll the stats here
-            self.character.roll_stats()
+            self.character.roll_stats(self.rng.stream('stats'))
             # Print the stats here
             self.character.print_stats()
 
@@ -968,9 +1314,10 @@ class Game:
 
         This method processes the user's input when faced with a choice of
         doors to enter, either 'left' or 'right'. Upon making a valid choice,
-        the player discovers a room, and the game transitions to the fight
-        state. If the user's input is neither 'left' nor 'right', a ValueError
-        is raised.
+        the player follows the door one depth further into the dungeon,
+        discovers the room and the enemy placed there, and the game
+        transitions to the fight state. If the user's input is neither
+        'left' nor 'right', a ValueError is raised.
 
         Parameters
         ----------
@@ -986,10 +1333,13 @@ class Game:
             player.
         """
         try:
-            if user_input in ['left', 'right']:
-                room_choice_dict = random.choice(dungeon_areas.
-                                                 ROOMS_SECOND_LAYER)
+            if user_input in dungeon.DOORS:
+                self.depth, self.room_index = self.dungeon.follow(
+                    self.depth, self.room_index, user_input)
+                room = self.dungeon.room(self.depth, self.room_index)
+                room_choice_dict = room.template
                 self.room_choice_name = room_choice_dict['name']
+                self.enemy_instance = Enemy.from_template(room.enemy)
                 print(f"\nYou chose the {user_input} door and discover a"
                       f" {self.room_choice_name}...")
                 print(room_choice_dict['description'])
@@ -1004,6 +1354,26 @@ class Game:
             # Print the error message that was raised
             print(e)
 
+    def handle_fight(self, user_input=None):
+        """
+        Runs the fight state's battle against the room's enemy, generating
+        the enemy first if the prompt has not already done so.
+
+        Parameters
+        ----------
+        user_input : None, optional
+            Unused; the battle asks for the player's actions itself.
+
+        Yields
+        ------
+        str
+            The prompt for each of the player's actions.
+        """
+        if self.enemy_instance is None:
+            self.enemy_instance = Enemy.generate_enemy(
+                self.room_choice_name, self.rng.stream('spawn'))
+        yield from self.handle_battle(self.character, self.enemy_instance)
+
     def handle_battle(self, player, enemy):
         """
         Handles the battle sequence between the player and an enemy.
@@ -1028,106 +1398,257 @@ class Game:
         The battle is conducted in turns, and the initiative is determined at
         the start. Both characters have hit points, and the battle continues
         until one of them reaches 0. The user's choices dictate the player's
-        actions, while the enemy's actions are randomly chosen from the same
-        set of actions. If the player's hit points reach 0, a defeat message
-        is printed and the game resets. If the enemy's hit points reach 0, a
-        victory message is printed.
-        """
-        # Create a Fight object
-        fight = Fight()
-        fight.dodge_flags[player] = False
-        fight.dodge_flags[enemy] = False
+        actions, while the enemy's actions are chosen by its AI policy from
+        the same set of actions. If the player's hit points reach 0, a defeat
+        message is printed and the game resets. If the enemy's hit points
+        reach 0, a victory message is printed and two more doors lead deeper
+        into the dungeon.
 
-        # Determine who goes first based on initiative
-        current_attacker = fight.initiative(player, enemy)
+        The fight is kept in the fight attribute while it runs. A battle
+        is only ever suspended at the player's turn, so a session restored
+        with a fight already in place carries on from that turn.
 
-        # Continue the fight until one of the characters is defeated
-        while player.hit_points > 0 and enemy.hit_points > 0:
-            # Get the user's choice if the player is the attacker
-            if current_attacker == player:
-                # Print player and enemy HP once at the start of the turn
-                print(f"{player.name.capitalize()} HP: {player.hit_points},"
-                      f" {enemy.name} HP: {enemy.hit_points}")
-                # Reset user_input at the beginning of the users turn
-                user_input = None
-                # Keep asking until a valid input is entered
-                while True:
-                    user_input = input("Choose to 'quick' attack, 'heavy'"
-                                       " attack, or 'dodge' the enemies"
-                                       " attack: \n").lower()
-                    print("\n" + utilities.return_divider())
-                    if user_input in ['dodge', 'quick', 'heavy']:
-                        break
-                    else:
-                        print()
-
-                if user_input == 'dodge':
-                    fight.dodge_flags[player] = True
-                    print(f"\n{player.name.capitalize()} prepares to dodge the"
-                          " next attack!")
-                else:
-                    fight.attack(
-                        attacker=current_attacker,
-                        defender=(player if current_attacker ==
-                                  enemy else enemy),
-                        attack_type=user_input,
-                        defender_dodging=fight.dodge_flags[enemy]
-                    )
-                    fight.dodge_flags[player] = False
-            else:
-                # Enemy's turn
-                enemy_action = random.choice(['quick', 'heavy', 'dodge'])
-                if enemy_action == 'dodge':
-                    fight.dodge_flags[enemy] = True
-                    print(f"{enemy.name} prepares to dodge the next attack!")
+        Yields
+        ------
+        str
+            The prompt for each of the player's actions.
+        """
+        # Create a Fight object and run it until someone falls
+        fight = self.fight
+        if fight is None:
+            fight = self.fight = Fight(rng=self.rng.stream('combat'))
+            turns = fight.turns(player, enemy)
+        else:
+            turns = fight.turns(player, enemy, resume=True)
+        try:
+            attacker = next(turns)
+            while True:
+                if attacker is player:
+                    action = yield from self.choose_player_action(
+                        player, enemy, fight)
                 else:
-                    fight.attack(
-                        attacker=current_attacker,
-                        defender=(player if current_attacker ==
-                                  enemy else enemy),
-                        attack_type=enemy_action,
-                        defender_dodging=fight.dodge_flags[player]
-                    )
-                    fight.dodge_flags[enemy] = False
-
-            # Switch attacker and defender for the next turn
-            current_attacker = player if current_attacker == enemy else enemy
-            # Reset dodge flags at the end of the turn
-            fight.dodge_flags[player] = False
-            fight.dodge_flags[enemy] = False
-            # Check if the fight has ended
-            prompt_text = ""
-
-            if enemy.hit_points <= 0:
-                prompt_text = (
-                    "\nExhausted and panting after the intense battle,"
-                    " you take a moment to catch your\n"
-                    "breath.\n"
-                    "The room falls silent except for the distant echoes of"
-                    " the dungeon, and your\n"
-                    "mind begins to wander.\n"
-                    "Slowly, your eyes close, and you feel a strange pull"
-                    " towards the beginning,\nas if the very fabric "
-                    "of this place is beckoning you to start anew."
-                )
-            elif player.hit_points <= 0:
-                prompt_text = (
-                    "Struggling to maintain your stance, you see"
-                    f"the {enemy.name} preparing for\n"
-                    "one last attack.\n"
-                    "Before you can react, a fatal blow lands,"
-                    " darkens around you.\n"
-                    "The last thing you hear is the triumphant cackle of your"
-                    " foe as you slip away,\ndefeated and broken."
-                )
-            self.reset_game()
-            print(prompt_text)
+                    action = self.choose_enemy_action(enemy, player, fight)
+                attacker = turns.send(action)
+        except StopIteration as stop:
+            self.fight_turns = stop.value
+        self.fight = None
+
+        # The fight has ended
+        if enemy.hit_points <= 0:
+            print(
+                "\nExhausted and panting after the intense battle,"
+                " you take a moment to catch your\n"
+                "breath.\n"
+                "The room falls silent except for the distant echoes of"
+                " the dungeon, until a\n"
+                "grinding of stone reveals two more doors, leading deeper"
+                " still."
+            )
+            # Carry on from the door choice, one depth further down
+            self.enemy_instance = None
             self.state = (game_states.FIRST_LAYER_STATES
-                          ['CHARACTER_CREATION']
-                          if fight.check_death(enemy) else
-                          game_states.FIRST_LAYER_STATES
-                          ['CHARACTER_CREATION'])
+                          ['ROOM_DOOR_CHOICE_FIRST_LAYER'])
+            return
+        else:
+            prompt_text = (
+                "Struggling to maintain your stance, you see"
+                f"the {enemy.name} preparing for\n"
+                "one last attack.\n"
+                "Before you can react, a fatal blow lands,"
+                " darkens around you.\n"
+                "The last thing you hear is the triumphant cackle of your"
+                " foe as you slip away,\ndefeated and broken."
+            )
+        self.reset_game()
+        print(prompt_text)
+        self.state = (game_states.FIRST_LAYER_STATES
+                      ['CHARACTER_CREATION'])
+
+    def choose_player_action(self, player, enemy, fight):
+        """
+        Asks the player for their action on their turn of a fight.
+
+        Parameters
+        ----------
+        player : Character
+            The player's character.
+        enemy : Enemy
+            The enemy being fought.
+        fight : Fight
+            The fight in progress.
+
+        Yields
+        ------
+        str
+            The prompt, until the player's line is a valid action.
+
+        Returns
+        -------
+        str
+            The chosen action: 'quick', 'heavy' or 'dodge'.
+        """
+        # Print player and enemy HP once at the start of the turn
+        print(f"{player.name.capitalize()} HP: {player.hit_points},"
+              f" {enemy.name} HP: {enemy.hit_points}")
+        table = self.STATES[game_states.SECOND_LAYER_STATES
+                            ['FIGHT_SECOND_LAYER']].command_table
+        # Keep asking until a valid input is entered
+        while True:
+            user_input = commands.resolve(
+                table, (yield "Choose to 'quick' attack, 'heavy' attack,"
+                              " or 'dodge' the enemies attack: \n").lower())
+            print("\n" + utilities.return_divider())
+            if user_input in Fight.ACTIONS:
+                break
+            elif user_input == 'hint':
+                print(self.hint(player, enemy, fight))
+            else:
+                print()
+
+        if user_input == 'dodge':
+            print(f"\n{player.name.capitalize()} prepares to dodge the"
+                  " next attack!")
+        return user_input
+
+    def hint(self, player, enemy, fight):
+        """
+        Suggests the player's best action from the optimal play tables.
+
+        Parameters
+        ----------
+        player : Character
+            The player's character.
+        enemy : Enemy
+            The enemy being fought.
+        fight : Fight
+            The fight in progress.
+
+        Returns
+        -------
+        str
+            The hint to show the player.
+        """
+        # Imported on first use, as the solver behind it loads numpy
+        import optimal_play
+        action = optimal_play.best_action(
+            player, enemy, fight.dodge_flags.get(enemy, False))
+        if action is None:
+            return "\nThe shadows are silent.\n"
+        return ("\nThe shadows whisper:"
+                f" '{HINTS[action]}'\n")
+
+    def choose_enemy_action(self, enemy, player, fight):
+        """
+        Picks the enemy's action on its turn of a fight, using the policy
+        its template names.
+
+        Parameters
+        ----------
+        enemy : Enemy
+            The enemy taking its turn.
+        player : Character
+            The player's character.
+        fight : Fight
+            The fight in progress.
+
+        Returns
+        -------
+        str
+            The chosen action: 'quick', 'heavy' or 'dodge'.
+        """
+        enemy_action = enemy_ai.POLICIES[enemy.policy](
+            enemy, player, fight, self.rng.stream('enemy_ai'))
+        if enemy_action == 'dodge':
+            print(f"{enemy.name} prepares to dodge the next attack!")
+        return enemy_action
+
+    # Compiled once when the class is created, so each turn's dispatch is
+    # a single lookup however many states the layers add
+    STATES = state_registry.compile_states((
+        StateSpec(game_states.GENERAL_GAME_STATES['HELP'],
+                  prompt=prompt_help,
+                  commands=('return',)),
+        StateSpec(game_states.GENERAL_GAME_STATES['CHARACTER_STATS'],
+                  prompt=prompt_character_stats,
+                  help_lines=("If you've finished looking at yourself then"
+                              " 'return'.",),
+                  commands=('return',)),
+        StateSpec(game_states.FIRST_LAYER_STATES['INITIALISE'],
+                  prompt=prompt_none,
+                  handler=handle_initialise,
+                  transitions=(game_states.FIRST_LAYER_STATES['GAME_START'],),
+                  reads_input=False),
+        StateSpec(game_states.FIRST_LAYER_STATES['GAME_START'],
+                  prompt=prompt_game_start,
+                  handler=handle_start_state,
+                  transitions=(game_states.FIRST_LAYER_STATES
+                               ['CHARACTER_CREATION'],),
+                  stats_help=False,
+                  commands=('enter',)),
+        StateSpec(game_states.FIRST_LAYER_STATES['CHARACTER_CREATION'],
+                  prompt=prompt_character_creation,
+                  handler=handle_character_state,
+                  transitions=(game_states.FIRST_LAYER_STATES
+                               ['ROOM_PICKUP_FIRST_LAYER'],),
+                  help_lines=("'Name'    : Type what you see on your arm to"
+                              " continue.",),
+                  stats_help=False,
+                  free_text=True),
+        StateSpec(game_states.FIRST_LAYER_STATES['ROOM_PICKUP_FIRST_LAYER'],
+                  prompt=prompt_room_pickup,
+                  handler=handle_room_pickup,
+                  transitions=(game_states.FIRST_LAYER_STATES
+                               ['ROOM_DOOR_CHOICE_FIRST_LAYER'],),
+                  help_lines=("'Pick Up' : Pick the object up.",
+                              "'Leave'   : Leave the object."),
+                  commands=('pick up', 'leave')),
+        StateSpec(game_states.FIRST_LAYER_STATES
+                  ['ROOM_DOOR_CHOICE_FIRST_LAYER'],
+                  prompt=prompt_room_door_choice,
+                  handler=handle_room_door_choice,
+                  transitions=(game_states.SECOND_LAYER_STATES
+                               ['FIGHT_SECOND_LAYER'],),
+                  help_lines=("'Left'    : Choose the left door.",
+                              "'Right'   : Choose the right door."),
+                  commands=dungeon.DOORS),
+        StateSpec(game_states.SECOND_LAYER_STATES['FIGHT_SECOND_LAYER'],
+                  prompt=prompt_fight,
+                  handler=handle_fight,
+                  transitions=(game_states.FIRST_LAYER_STATES
+                               ['CHARACTER_CREATION'],
+                               game_states.FIRST_LAYER_STATES
+                               ['ROOM_DOOR_CHOICE_FIRST_LAYER']),
+                  reads_input=False,
+                  help_lines=("'Quick'   : Deftly strike with a quick"
+                              " attack.",
+                              "'Heavy'   : Unleash a powerful heavy attack.",
+                              "'Dodge'   : Focus on avoiding the next"
+                              " attack.",
+                              "'Hint'    : Ask the shadows for your best"
+                              " move."),
+                  commands=Fight.ACTIONS + ('hint',)),
+    ))
+
+
+def main(seed=None):
+    """
+    Starts an interactive game session on the terminal.
+
+    Colorama is initialised here rather than on import, so importing this
+    module never touches the terminal or starts a game.
+
+    Parameters
+    ----------
+    seed : int, optional
+        Seeds the session's random streams. Defaults to a fresh seed.
+    """
+    # init colorama
+    init()
+    game = Game(seed)
+    # Write each turn's output to the terminal at once
+    with renderer.buffered_output():
+        game.run()
 
 
-game = Game()
-game.run()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,597 @@
+import argparse
+import codecs
+import gc
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import types
+
+import journal
+import metrics
+import run
+
+# Default address the session host listens on
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Stack size for session threads, a Game never recurses deeply
+DEFAULT_STACK_SIZE = 256 * 1024
+
+# Control characters sent by xterm.js over the WebSocket
+CTRL_C = '\x03'
+CTRL_D = '\x04'
+BACKSPACES = ('\x7f', '\b')
+ESCAPE = '\x1b'
+
+
+class LineDiscipline:
+    """
+    The line editing node-pty's terminal used to provide for a dedicated
+    run.py process, without any I/O of its own.
+
+    Typed characters are echoed, backspace edits the current line, and a
+    carriage return completes it. Ctrl-C, or Ctrl-D on an empty line,
+    hangs up, and escape sequences such as cursor keys are ignored.
+    """
+    def __init__(self):
+        self.hung_up = False
+        self._pending = ''
+        self._line = []
+        self._decoder = codecs.getincrementaldecoder('utf-8')(
+            errors='replace')
+
+    def feed(self, data):
+        """
+        Adds bytes received from the client.
+        """
+        self._pending += self._decoder.decode(data)
+
+    def take_line(self):
+        """
+        Consumes pending input characters until a line is complete.
+
+        Returns
+        -------
+        tuple
+            The completed line including its trailing newline, or None if
+            more input is needed, and the text to echo back to the client.
+        """
+        echo = []
+        line = None
+        index = 0
+        pending = self._pending
+        while index < len(pending):
+            char = pending[index]
+            index += 1
+            if char in ('\r', '\n'):
+                # Treat a CRLF pair as a single line ending
+                if (char == '\r' and pending[index:index + 1] == '\n'):
+                    index += 1
+                echo.append('\r\n')
+                line = ''.join(self._line) + '\n'
+                self._line.clear()
+                break
+            elif char in BACKSPACES:
+                if self._line:
+                    self._line.pop()
+                    echo.append('\b \b')
+            elif char == CTRL_C:
+                self.hung_up = True
+                break
+            elif char == CTRL_D:
+                if not self._line:
+                    self.hung_up = True
+                    break
+            elif char == ESCAPE:
+                # Skip cursor keys and other escape sequences entirely
+                end = index
+                if pending[index:index + 1] == '[':
+                    end += 1
+                    while end < len(pending) and not pending[end].isalpha():
+                        end += 1
+                    end += 1
+                if end > len(pending):
+                    # Wait for the rest of the escape sequence
+                    index -= 1
+                    break
+                index = end
+            elif char.isprintable():
+                self._line.append(char)
+                echo.append(char)
+        self._pending = pending[index:]
+        return line, ''.join(echo)
+
+
+def terminal_output(text):
+    """
+    Translates game output newlines for a raw terminal.
+    """
+    return text.replace('\n', '\r\n')
+
+
+class TerminalSession:
+    """
+    Represents one connected player, emulating the line discipline that
+    node-pty's terminal used to provide for a dedicated run.py process.
+
+    Input is edited by a LineDiscipline. Output newlines are translated to
+    carriage return plus newline, and output is buffered until the game
+    asks for input so each prompt reaches the WebSocket as one frame.
+    """
+    def __init__(self, connection, session_id):
+        """
+        Initialises the TerminalSession for an accepted connection.
+
+        Parameters
+        ----------
+        connection : socket.socket
+            The connected socket carrying the raw terminal stream.
+        session_id : int
+            A number identifying the session in host reports.
+        """
+        self.connection = connection
+        self.session_id = session_id
+        self.started = time.monotonic()
+        self.game = None
+        self.closed = False
+        self._discipline = LineDiscipline()
+        self._output = []
+
+    def write(self, text):
+        """
+        Queues game output for the client, translating newlines.
+
+        Parameters
+        ----------
+        text : str
+            The text written by print() or input().
+
+        Returns
+        -------
+        int
+            The number of characters accepted.
+        """
+        self._output.append(terminal_output(text))
+        return len(text)
+
+    def flush(self):
+        """
+        Sends all queued output to the client in a single write.
+        """
+        if not self._output or self.closed:
+            self._output.clear()
+            return
+        data = ''.join(self._output).encode('utf-8')
+        self._output.clear()
+        try:
+            self.connection.sendall(data)
+        except OSError:
+            self.closed = True
+
+    def readline(self):
+        """
+        Reads one line typed by the player, echoing it as a terminal would.
+
+        Returns
+        -------
+        str
+            The completed line including its trailing newline, or an empty
+            string once the client has disconnected.
+        """
+        self.flush()
+        while not self.closed:
+            line = self._take_line()
+            if line is not None:
+                return line
+            try:
+                data = self.connection.recv(4096)
+            except OSError:
+                data = b''
+            if not data:
+                self.closed = True
+                break
+            self._discipline.feed(data)
+        return ''
+
+    def close(self):
+        """
+        Marks the session input as closed, as exit() does for sys.stdin.
+        """
+        self.closed = True
+
+    def _take_line(self):
+        """
+        Takes the next complete line from the line discipline, sending its
+        echo to the client.
+
+        Returns
+        -------
+        str or None
+            The completed line, or None if more input is needed.
+        """
+        line, echo = self._discipline.take_line()
+        if self._discipline.hung_up:
+            self.closed = True
+        if echo and not self.closed:
+            try:
+                self.connection.sendall(echo.encode('utf-8'))
+            except OSError:
+                self.closed = True
+        return line
+
+
+class _SessionStreams:
+    """
+    Stands in for sys.stdin and sys.stdout, routing each call to the
+    TerminalSession owned by the calling thread. Threads without a session,
+    such as the main thread, fall through to the original streams.
+    """
+    def __init__(self, fallback):
+        self._local = threading.local()
+        self._fallback = fallback
+
+    @property
+    def session(self):
+        return getattr(self._local, 'session', None)
+
+    @session.setter
+    def session(self, session):
+        self._local.session = session
+
+    def write(self, text):
+        session = self.session
+        if session is None:
+            return self._fallback.write(text)
+        return session.write(text)
+
+    def flush(self):
+        session = self.session
+        if session is None:
+            return self._fallback.flush()
+        return session.flush()
+
+    def readline(self, size=-1):
+        session = self.session
+        if session is None:
+            return sys.__stdin__.readline(size)
+        return session.readline()
+
+    def close(self):
+        session = self.session
+        if session is not None:
+            session.close()
+
+
+def _shared_object_ids():
+    """
+    Collects the ids of objects every session shares through the game
+    modules, so they are not counted against any single session.
+
+    Returns
+    -------
+    set
+        The ids of module-level objects reachable from the game modules.
+    """
+    shared = set()
+    pending = [run, run.dungeon_areas, run.enemies, run.objects,
+               run.utilities, run.game_states]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in shared:
+            continue
+        shared.add(id(obj))
+        if isinstance(obj, types.ModuleType):
+            pending.extend(vars(obj).values())
+        elif isinstance(obj, (dict, list, tuple, set, frozenset)):
+            pending.extend(gc.get_referents(obj))
+    return shared
+
+
+def deep_sizeof(root, shared_ids):
+    """
+    Estimates the heap memory retained by an object graph.
+
+    Parameters
+    ----------
+    root : object
+        The object to measure, typically a Game instance.
+    shared_ids : set
+        Ids of objects that are shared between sessions and must be
+        skipped.
+
+    Returns
+    -------
+    int
+        The total size in bytes of all objects reachable from root that are
+        not shared, classes, modules or functions.
+    """
+    skip_types = (type, types.ModuleType, types.FunctionType,
+                  types.BuiltinFunctionType, types.MethodType)
+    # Shared ids are checked rather than copied into seen, which would
+    # cost more than walking a whole session
+    seen = set()
+    pending = [root]
+    total = 0
+    while pending:
+        obj = pending.pop()
+        if (id(obj) in seen or id(obj) in shared_ids
+                or isinstance(obj, skip_types)):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return total
+
+
+def process_rss():
+    """
+    Returns the resident set size of the host process.
+
+    Returns
+    -------
+    int
+        The resident memory in bytes, read from /proc when available and
+        otherwise from the peak reported by getrusage.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class SessionHost(socketserver.ThreadingTCPServer):
+    """
+    Hosts many Game sessions in one Python process, one per connection.
+
+    Each accepted connection gets its own thread and Game instance. The
+    game code is unchanged: print() and input() are routed to the calling
+    thread's TerminalSession, so every session still speaks the same
+    terminal protocol a node-pty process did.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    # socketserver's default backlog of 5 drops connections when many
+    # players arrive at once
+    request_queue_size = 128
+
+    def __init__(self, address, report_interval=0, journal_dir=None,
+                 metrics_registry=None):
+        """
+        Initialises the SessionHost and binds it to the given address.
+
+        Parameters
+        ----------
+        address : tuple
+            The (host, port) pair to listen on.
+        report_interval : float, optional
+            Seconds between memory reports on stderr. Defaults to 0, which
+            only logs session counts when sessions open or close.
+        journal_dir : str, optional
+            Records each session's inputs to a journal in this directory.
+            Defaults to None, which records nothing.
+        metrics_registry : metrics.Metrics, optional
+            Records every session's latencies here. Defaults to None, which
+            leaves sessions uninstrumented.
+        """
+        super().__init__(address, _SessionHandler)
+        self.report_interval = report_interval
+        self.journal_dir = journal_dir
+        self.metrics = metrics_registry
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+        self.next_session_id = 1
+        self.total_sessions = 0
+        self.shared_ids = _shared_object_ids()
+        self.streams = _SessionStreams(sys.stdout)
+        sys.stdout = self.streams
+        sys.stdin = self.streams
+
+    def open_session(self, connection):
+        """
+        Registers a new TerminalSession for an accepted connection.
+
+        Parameters
+        ----------
+        connection : socket.socket
+            The accepted client connection.
+
+        Returns
+        -------
+        TerminalSession
+            The registered session.
+        """
+        with self.sessions_lock:
+            session = TerminalSession(connection, self.next_session_id)
+            self.next_session_id += 1
+            self.total_sessions += 1
+            self.sessions[session.session_id] = session
+        return session
+
+    def close_session(self, session):
+        """
+        Removes a finished TerminalSession from the host.
+
+        Parameters
+        ----------
+        session : TerminalSession
+            The session to remove.
+        """
+        with self.sessions_lock:
+            self.sessions.pop(session.session_id, None)
+
+    def stats(self):
+        """
+        Reports memory use for the host process and each live session.
+
+        Walking every session's Game is slow, and other threads change the
+        Games while they are walked, so this is only run by the interval
+        reporter. A session that changes too much to walk is left out of
+        that report.
+
+        Returns
+        -------
+        dict
+            The process RSS, the number of live and total sessions, the
+            per-session heap estimates and their mean.
+        """
+        with self.sessions_lock:
+            sessions = list(self.sessions.values())
+        per_session = {}
+        for session in sessions:
+            if session.game is not None:
+                try:
+                    per_session[session.session_id] = deep_sizeof(
+                        session.game, self.shared_ids)
+                except RuntimeError:
+                    # Its dicts or sets changed size while being walked
+                    continue
+        mean = (sum(per_session.values()) // len(per_session)
+                if per_session else 0)
+        return {
+            'pid': os.getpid(),
+            'process_rss_bytes': process_rss(),
+            'live_sessions': len(sessions),
+            'total_sessions': self.total_sessions,
+            'threads': threading.active_count(),
+            'session_heap_bytes': per_session,
+            'mean_session_heap_bytes': mean,
+        }
+
+    def report(self, event):
+        """
+        Writes a JSON memory report line to stderr.
+
+        Parameters
+        ----------
+        event : str
+            What triggered the report, such as 'interval'.
+        """
+        stats = self.stats()
+        stats['event'] = event
+        sys.__stderr__.write(json.dumps(stats) + '\n')
+        sys.__stderr__.flush()
+
+    def log_event(self, event, session):
+        """
+        Writes a JSON line to stderr when a session opens or closes, with
+        the session counts and process RSS only, so it costs the same
+        however many sessions are live.
+
+        Parameters
+        ----------
+        event : str
+            'open' or 'close'.
+        session : TerminalSession
+            The session that opened or closed.
+        """
+        with self.sessions_lock:
+            live_sessions = len(self.sessions)
+            total_sessions = self.total_sessions
+        sys.__stderr__.write(json.dumps({
+            'pid': os.getpid(),
+            'process_rss_bytes': process_rss(),
+            'live_sessions': live_sessions,
+            'total_sessions': total_sessions,
+            'session_id': session.session_id,
+            'event': event,
+        }) + '\n')
+        sys.__stderr__.flush()
+
+    def serve_forever(self, poll_interval=0.5):
+        """
+        Serves connections until shutdown, reporting memory periodically
+        when a report interval is configured.
+        """
+        if self.report_interval:
+            reporter = threading.Thread(target=self._report_loop,
+                                        daemon=True)
+            reporter.start()
+        super().serve_forever(poll_interval)
+
+    def _report_loop(self):
+        while True:
+            time.sleep(self.report_interval)
+            self.report('interval')
+
+
+class _SessionHandler(socketserver.BaseRequestHandler):
+    """
+    Runs one Game for the lifetime of a client connection.
+    """
+    def handle(self):
+        host = self.server
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        session = host.open_session(self.request)
+        host.streams.session = session
+        session_journal = None
+        try:
+            session.game = run.Game()
+            if host.journal_dir is not None:
+                session_journal = journal.Journal(
+                    os.path.join(host.journal_dir,
+                                 f"session-{session.session_id}.jsonl"),
+                    session.game.rng.seed)
+                session.game.read_input = session_journal.recording(
+                    session.game.read_input)
+            host.log_event('open', session)
+            if host.metrics is None:
+                session.game.run()
+            else:
+                with host.metrics.session(session.game):
+                    session.game.run()
+        except (SystemExit, EOFError, KeyboardInterrupt):
+            pass
+        finally:
+            if session_journal is not None:
+                session_journal.close()
+            session.flush()
+            host.streams.session = None
+            host.close_session(session)
+            host.log_event('close', session)
+
+
+def main(argv=None):
+    """
+    Parses command line options and serves game sessions until interrupted.
+    """
+    parser = argparse.ArgumentParser(
+        description="Host many Subterranean Script sessions in one process.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--report-interval', type=float, default=0,
+                        help="seconds between memory reports on stderr")
+    parser.add_argument('--stack-size', type=int,
+                        default=DEFAULT_STACK_SIZE,
+                        help="stack size in bytes for session threads")
+    parser.add_argument('--journal-dir', default=None,
+                        help="record each session's inputs in this directory")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="serve Prometheus metrics on this local port")
+    args = parser.parse_args(argv)
+
+    threading.stack_size(args.stack_size)
+    registry = None
+    if args.metrics_port is not None:
+        registry = metrics.Metrics()
+        registry.serve('127.0.0.1', args.metrics_port)
+    host = SessionHost((args.host, args.port), args.report_interval,
+                       args.journal_dir, registry)
+    sys.__stderr__.write(f"Session host listening on {args.host}:"
+                         f"{args.port}\n")
+    try:
+        host.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        host.server_close()
+
+
+if __name__ == '__main__':
+    main()
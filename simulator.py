@@ -0,0 +1,258 @@
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+
+import enemies
+import enemy_ai
+import rng_service
+import run
+
+# Outcome of a single simulated fight
+FightResult = namedtuple('FightResult', [
+    'winner',             # 'player' or 'enemy'
+    'turns',              # number of turns taken
+    'damage_dealt',       # damage the player dealt to the enemy
+    'damage_taken',       # damage the enemy dealt to the player
+    'player_hit_points',  # player HP left at the end, at least 0
+    'enemy_hit_points',   # enemy HP left at the end, at least 0
+])
+
+
+def random_policy(actor, opponent, fight):
+    """
+    Picks an action uniformly at random, as enemies do in the game.
+    """
+    return fight.rng.choice(run.Fight.ACTIONS)
+
+
+def quick_policy(actor, opponent, fight):
+    """
+    Always makes a quick attack.
+    """
+    return 'quick'
+
+
+def heavy_policy(actor, opponent, fight):
+    """
+    Always makes a heavy attack.
+    """
+    return 'heavy'
+
+
+def optimal_policy(actor, opponent, fight):
+    """
+    Plays the move with the best chance of winning, from the optimal play
+    tables.
+    """
+    # Imported on first use, since optimal_play itself imports this module
+    import optimal_play
+    return optimal_play.best_action(actor, opponent,
+                                    fight.dodge_flags.get(opponent, False))
+
+
+# Policies selectable by name from the command line
+POLICIES = {
+    'random': random_policy,
+    'quick': quick_policy,
+    'heavy': heavy_policy,
+    'optimal': optimal_policy,
+}
+
+
+def simulate_fights(player, enemy, fights, player_policy=random_policy,
+                    enemy_policy=random_policy, rng=None):
+    """
+    Runs many fights between the same two combatants without any output.
+
+    Each fight uses the same Fight turn loop as Game.handle_battle, with
+    the player's actions supplied by a policy instead of input(). Hit
+    points are restored before every fight, so the combatants can be
+    reused.
+
+    Parameters
+    ----------
+    player : Character
+        The player's character.
+    enemy : Enemy
+        The enemy character.
+    fights : int
+        The number of fights to run.
+    player_policy : callable, optional
+        Chooses the player's action, called as policy(player, enemy,
+        fight). Defaults to random_policy.
+    enemy_policy : callable, optional
+        Chooses the enemy's action, called as policy(enemy, player, fight).
+        Defaults to random_policy, whatever policy the enemy's template
+        names. Use enemy_policy to play that one instead.
+    rng : rng_service.RngStream, optional
+        The stream all dice and random policies draw from, for repeatable
+        runs. Defaults to the shared service's 'combat' stream.
+
+    Yields
+    ------
+    FightResult
+        The outcome of each fight.
+    """
+    player_start = player.hit_points
+    enemy_start = enemy.hit_points
+    fight = run.Fight(verbose=False, rng=rng)
+    try:
+        for _ in range(fights):
+            player.hit_points = player_start
+            enemy.hit_points = enemy_start
+            turns = fight.run(player, enemy, player_policy, enemy_policy)
+            yield FightResult(
+                'player' if enemy.hit_points <= 0 else 'enemy',
+                turns,
+                enemy_start - enemy.hit_points,
+                player_start - player.hit_points,
+                # The killing blow can take hit points below zero, but
+                # none are left
+                max(player.hit_points, 0),
+                max(enemy.hit_points, 0),
+            )
+    finally:
+        player.hit_points = player_start
+        enemy.hit_points = enemy_start
+
+
+def summarise(results):
+    """
+    Aggregates fight results into averages.
+
+    Parameters
+    ----------
+    results : iterable of FightResult
+        The results to aggregate.
+
+    Returns
+    -------
+    dict
+        The number of fights, the player's win rate, and the mean turns,
+        damage dealt, damage taken and HP left.
+    """
+    count = wins = turns = dealt = taken = player_left = enemy_left = 0
+    for result in results:
+        count += 1
+        wins += result.winner == 'player'
+        turns += result.turns
+        dealt += result.damage_dealt
+        taken += result.damage_taken
+        player_left += result.player_hit_points
+        enemy_left += result.enemy_hit_points
+    if count == 0:
+        return {'fights': 0}
+    return {
+        'fights': count,
+        'win_rate': wins / count,
+        'mean_turns': turns / count,
+        'mean_damage_dealt': dealt / count,
+        'mean_damage_taken': taken / count,
+        'mean_player_hit_points': player_left / count,
+        'mean_enemy_hit_points': enemy_left / count,
+    }
+
+
+def find_enemy_template(name):
+    """
+    Looks up an enemy template by its display name.
+
+    Parameters
+    ----------
+    name : str
+        The enemy's name, such as "Dungeon Rat".
+
+    Returns
+    -------
+    dict
+        The enemy template.
+
+    Raises
+    ------
+    ValueError
+        If no enemy has that name.
+    """
+    templates = (enemies.COMMON_ENEMIES
+                 + list(enemies.SPECIFIC_ENEMIES.values()))
+    for template in templates:
+        if template['name'].lower() == name.lower():
+            return template
+    raise ValueError(f"There is no enemy called '{name}'")
+
+
+def create_enemy(template):
+    """
+    Creates an Enemy from a template dictionary.
+    """
+    return run.Enemy(template['entity_type'], template['name'],
+                     template['strength'], template['dexterity'],
+                     template['constitution'], template['intelligence'],
+                     template['wisdom'], template['charisma'],
+                     template['weapon'],
+                     template.get('policy', enemy_ai.DEFAULT_POLICY))
+
+
+def enemy_policy(name):
+    """
+    Adapts a policy from enemy_ai.POLICIES to simulate_fights, drawing any
+    randomness from the fight's stream.
+    """
+    policy = enemy_ai.POLICIES[name]
+    return lambda actor, opponent, fight: policy(actor, opponent, fight,
+                                                 fight.rng)
+
+
+def create_hero(name='hero', seed=None):
+    """
+    Creates a Character with freshly rolled stats.
+
+    Parameters
+    ----------
+    name : str, optional
+        The character's name. Defaults to 'hero'.
+    seed : int, optional
+        Seeds the stat rolls so they are reproducible.
+    """
+    rng = (rng_service.RngService(seed).stream('stats')
+           if seed is not None else None)
+    hero = run.Character(name)
+    hero.roll_stats(rng)
+    return hero
+
+
+def main(argv=None):
+    """
+    Simulates fights from the command line and prints a JSON summary.
+    """
+    parser = argparse.ArgumentParser(
+        description="Simulate fights headlessly with the game's rules.")
+    parser.add_argument('--enemy', default='Dungeon Goblin')
+    parser.add_argument('--fights', type=int, default=100000)
+    parser.add_argument('--policy', choices=sorted(POLICIES),
+                        default='random')
+    parser.add_argument('--enemy-policy', choices=sorted(enemy_ai.POLICIES),
+                        default=None,
+                        help="the enemy's AI, random by default")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    hero = create_hero(seed=args.seed)
+    enemy = create_enemy(find_enemy_template(args.enemy))
+    rng = rng_service.RngService(args.seed).stream('combat')
+    start = time.perf_counter()
+    summary = summarise(simulate_fights(
+        hero, enemy, args.fights, POLICIES[args.policy],
+        random_policy if args.enemy_policy is None
+        else enemy_policy(args.enemy_policy), rng=rng))
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    summary['enemy'] = enemy.name
+    summary['policy'] = args.policy
+    summary['enemy_policy'] = args.enemy_policy or 'random'
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,317 @@
+import functools
+import os
+import struct
+
+import dungeon_areas
+import objects
+import run
+import spawn_tables
+
+# Leading bytes of every snapshot, followed by the format version
+MAGIC = b'SS'
+VERSION = 4
+
+_HEADER = struct.Struct('>2sB')
+_STRING_LENGTH = struct.Struct('>B')
+_COUNT = struct.Struct('>B')
+_SEED = struct.Struct('>Q')
+# Dungeon depth, room within the depth
+_POSITION = struct.Struct('>IH')
+# Six ability scores, hit points, object picked flag
+_CHARACTER = struct.Struct('>7h?')
+_HIT_POINTS = struct.Struct('>h')
+_STAT_CHANGE = struct.Struct('>h')
+# Fight in progress flag, player dodging, enemy dodging, turns taken
+_FIGHT = struct.Struct('>???H')
+# Die size or rng_service.UNIT, refills so far, values left in the buffer
+_BUFFER = struct.Struct('>BIH')
+
+
+# Object lists searched by name, in the order their layers are reached
+OBJECT_LISTS = ('OBJECTS_FIRST_LAYER', 'OBJECTS_SC_FIRST_LAYER',
+                'OBJECTS_SECOND_LAYER')
+
+
+@functools.lru_cache(maxsize=None)
+def _enemy_templates():
+    """
+    Returns enemy templates by name, for rebuilding the enemy being fought.
+    """
+    templates = {}
+    for table in (spawn_tables.COMMON_SPAWN_TABLE,
+                  *spawn_tables.SPAWN_TABLES.values()):
+        for template in table.templates:
+            templates[template.name] = template
+    return templates
+
+
+def _pack_string(parts, value):
+    """
+    Appends a length-prefixed UTF-8 string, with None stored as empty.
+    """
+    encoded = b'' if value is None else value.encode('utf-8')
+    if len(encoded) > 255:
+        raise ValueError(f"'{value[:20]}...' is too long to snapshot")
+    parts.append(_STRING_LENGTH.pack(len(encoded)))
+    parts.append(encoded)
+
+
+def _unpack_string(data, offset):
+    """
+    Reads a string written by _pack_string.
+
+    Returns
+    -------
+    tuple
+        The string, or None if it was empty, and the next offset.
+    """
+    length = data[offset]
+    offset += 1
+    value = data[offset:offset + length].decode('utf-8')
+    return value or None, offset + length
+
+
+def _find_object(name):
+    """
+    Finds an object by name, only loading a later layer when the object is
+    not in an earlier one.
+
+    Raises
+    ------
+    ValueError
+        If no layer has an object with that name.
+    """
+    for attribute in OBJECT_LISTS:
+        for obj in getattr(objects, attribute):
+            if obj['name'] == name:
+                return obj
+    raise ValueError(f"Snapshot refers to unknown object '{name}'")
+
+
+def _room_key(room):
+    """
+    Finds the layer and key under which a room is stored in
+    dungeon_areas.ROOMS.
+    """
+    for layer, rooms in dungeon_areas.ROOMS.items():
+        for key, value in rooms.items():
+            if value is room:
+                return layer, key
+    raise ValueError("The current room is not in dungeon_areas.ROOMS")
+
+
+def snapshot(game):
+    """
+    Serialises a game session into a compact, versioned binary snapshot.
+
+    Rooms, objects, weapons and enemies are stored as references to the
+    game data rather than copied, so the snapshot holds only what changes
+    during play. The dungeon itself is rebuilt from the master seed, so
+    only the player's position in it is stored. Snapshots are taken between
+    inputs. A battle in progress is captured at the player's turn, with
+    both dodges and the turns taken, so it carries on where it stopped.
+
+    Parameters
+    ----------
+    game : Game
+        The session to capture.
+
+    Returns
+    -------
+    bytes
+        The snapshot.
+
+    Raises
+    ------
+    ValueError
+        If the session refers to game data that cannot be referenced.
+    """
+    character = game.character
+    parts = [_HEADER.pack(MAGIC, VERSION)]
+    _pack_string(parts, game.state)
+    _pack_string(parts, game.previous_state)
+    for key in _room_key(game.current_room):
+        _pack_string(parts, key)
+    _pack_string(parts, game.room_choice_name)
+    parts.append(_POSITION.pack(game.depth, game.room_index))
+
+    # Character, with objects stored by name
+    _pack_string(parts, None if game.object_choice is None
+                 else game.object_choice['name'])
+    _pack_string(parts, character.name)
+    parts.append(_CHARACTER.pack(
+        character.strength, character.dexterity, character.constitution,
+        character.intelligence, character.wisdom, character.charisma,
+        character.hit_points, character.object_picked_FL))
+    _pack_string(parts, character.weapon['name']
+                 if character.object_picked_FL else None)
+    parts.append(_COUNT.pack(len(character.stat_changes)))
+    for stat, change in character.stat_changes.items():
+        _pack_string(parts, stat)
+        parts.append(_STAT_CHANGE.pack(change))
+
+    # Enemy, as its template name and remaining hit points
+    enemy = game.enemy_instance
+    if enemy is None:
+        _pack_string(parts, None)
+    else:
+        if enemy.name not in _enemy_templates():
+            raise ValueError(f"Enemy '{enemy.name}' has no template")
+        _pack_string(parts, enemy.name)
+        parts.append(_HIT_POINTS.pack(enemy.hit_points))
+    fight = game.fight
+    if fight is None:
+        parts.append(_FIGHT.pack(False, False, False, 0))
+    else:
+        parts.append(_FIGHT.pack(
+            True, fight.dodge_flags.get(character, False),
+            fight.dodge_flags.get(enemy, False), fight.turns_taken))
+
+    # Random streams, as the master seed and each buffer's position
+    rng_state = game.rng.state()
+    parts.append(_SEED.pack(game.rng.seed))
+    parts.append(_COUNT.pack(len(rng_state)))
+    for name, buffers in rng_state.items():
+        _pack_string(parts, name)
+        parts.append(_COUNT.pack(len(buffers)))
+        for kind, (refills, remaining) in buffers.items():
+            parts.append(_BUFFER.pack(kind, refills, remaining))
+    return b''.join(parts)
+
+
+def restore(data):
+    """
+    Rebuilds a game session from a snapshot.
+
+    Parameters
+    ----------
+    data : bytes
+        A snapshot returned by snapshot.
+
+    Returns
+    -------
+    Game
+        A session that continues exactly where the snapshot was taken.
+
+    Raises
+    ------
+    ValueError
+        If the data is not a snapshot, has an unsupported version, or refers
+        to game data that no longer exists.
+    """
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("The data is not a game snapshot")
+    if version != VERSION:
+        raise ValueError(f"Snapshot version {version} is not supported")
+    offset = _HEADER.size
+    state, offset = _unpack_string(data, offset)
+    previous_state, offset = _unpack_string(data, offset)
+    layer, offset = _unpack_string(data, offset)
+    room_key, offset = _unpack_string(data, offset)
+    room_choice_name, offset = _unpack_string(data, offset)
+    depth, room_index = _POSITION.unpack_from(data, offset)
+    offset += _POSITION.size
+
+    # Character
+    object_choice, offset = _unpack_string(data, offset)
+    name, offset = _unpack_string(data, offset)
+    (strength, dexterity, constitution, intelligence, wisdom, charisma,
+     hit_points, object_picked) = _CHARACTER.unpack_from(data, offset)
+    offset += _CHARACTER.size
+    weapon, offset = _unpack_string(data, offset)
+    stat_changes = {}
+    count = data[offset]
+    offset += 1
+    for _ in range(count):
+        stat, offset = _unpack_string(data, offset)
+        stat_changes[stat] = _STAT_CHANGE.unpack_from(data, offset)[0]
+        offset += _STAT_CHANGE.size
+
+    # Enemy
+    enemy_name, offset = _unpack_string(data, offset)
+    enemy = None
+    if enemy_name is not None:
+        template = _enemy_templates().get(enemy_name)
+        if template is None:
+            raise ValueError(f"Enemy '{enemy_name}' has no template")
+        enemy = run.Enemy.from_template(template)
+        enemy.hit_points = _HIT_POINTS.unpack_from(data, offset)[0]
+        offset += _HIT_POINTS.size
+    (in_fight, player_dodging, enemy_dodging,
+     turns_taken) = _FIGHT.unpack_from(data, offset)
+    offset += _FIGHT.size
+    if in_fight and enemy is None:
+        raise ValueError("Snapshot has a fight without an enemy")
+
+    # Random streams
+    seed = _SEED.unpack_from(data, offset)[0]
+    offset += _SEED.size
+    rng_state = {}
+    count = data[offset]
+    offset += 1
+    for _ in range(count):
+        stream, offset = _unpack_string(data, offset)
+        buffers = rng_state[stream] = {}
+        kinds = data[offset]
+        offset += 1
+        for _ in range(kinds):
+            kind, refills, remaining = _BUFFER.unpack_from(data, offset)
+            offset += _BUFFER.size
+            buffers[kind] = (refills, remaining)
+
+    try:
+        current_room = dungeon_areas.ROOMS[layer][room_key]
+    except KeyError as error:
+        raise ValueError(f"Snapshot refers to missing room {error}")
+    weapon = None if weapon is None else _find_object(weapon)
+    object_choice = (None if object_choice is None
+                     else _find_object(object_choice))
+
+    game = run.Game(seed)
+    game.rng.restore(rng_state)
+    game.state = state
+    game.previous_state = previous_state
+    game.current_room = current_room
+    game.room_choice_name = room_choice_name
+    game.depth = depth
+    game.room_index = room_index
+    game.object_choice = object_choice
+    game.enemy_instance = enemy
+    character = game.character
+    character.name = name
+    character.strength = strength
+    character.dexterity = dexterity
+    character.constitution = constitution
+    character.intelligence = intelligence
+    character.wisdom = wisdom
+    character.charisma = charisma
+    character.hit_points = hit_points
+    character.object_picked_FL = object_picked
+    character.stat_changes = stat_changes
+    if weapon is not None:
+        character.weapon = weapon
+    if in_fight:
+        fight = game.fight = run.Fight(rng=game.rng.stream('combat'))
+        fight.dodge_flags = {character: player_dodging, enemy: enemy_dodging}
+        fight.turns_taken = turns_taken
+    return game
+
+
+def save(game, path):
+    """
+    Writes a snapshot of a session to a file, replacing any older one
+    atomically so a crash never leaves half a snapshot behind.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as file:
+        file.write(snapshot(game))
+    os.replace(temporary, path)
+
+
+def load(path):
+    """
+    Restores a session from a file written by save.
+    """
+    with open(path, 'rb') as file:
+        return restore(file.read())
@@ -0,0 +1,206 @@
+import random
+from collections import namedtuple
+from types import MappingProxyType
+
+import dungeon_areas
+import enemies
+import enemy_ai
+
+# Ability scores every enemy template must define
+ABILITIES = ('strength', 'dexterity', 'constitution', 'intelligence',
+             'wisdom', 'charisma')
+
+# A validated, immutable enemy template
+EnemyTemplate = namedtuple('EnemyTemplate',
+                           ('name', 'entity_type') + ABILITIES
+                           + ('weapon', 'policy'))
+
+
+def validate_template(template):
+    """
+    Checks an enemy template dictionary and converts it to an
+    EnemyTemplate. The optional 'policy' field names the enemy's AI from
+    enemy_ai.POLICIES and defaults to enemy_ai.DEFAULT_POLICY.
+
+    Parameters
+    ----------
+    template : dict
+        An entry from enemies.COMMON_ENEMIES or enemies.SPECIFIC_ENEMIES.
+
+    Returns
+    -------
+    EnemyTemplate
+        The validated template.
+
+    Raises
+    ------
+    ValueError
+        If a field is missing or has the wrong type.
+    """
+    name = template.get('name')
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Enemy template {template!r} has no name")
+    if not isinstance(template.get('entity_type'), str):
+        raise ValueError(f"Enemy '{name}' has no entity_type")
+    for ability in ABILITIES:
+        if not isinstance(template.get(ability), int):
+            raise ValueError(f"Enemy '{name}' needs an integer {ability}")
+    weapon = template.get('weapon')
+    if (not isinstance(weapon, dict) or 'name' not in weapon
+            or 'description' not in weapon):
+        raise ValueError(f"Enemy '{name}' needs a weapon with a name and"
+                         " description")
+    policy = template.get('policy', enemy_ai.DEFAULT_POLICY)
+    if policy not in enemy_ai.POLICIES:
+        raise ValueError(f"Enemy '{name}' has an unknown policy {policy!r}")
+    return EnemyTemplate(name, template['entity_type'],
+                         *(template[ability] for ability in ABILITIES),
+                         weapon, policy)
+
+
+class SpawnTable:
+    """
+    An immutable weighted table of enemy templates that samples in
+    constant time using Vose's alias method.
+    """
+    __slots__ = ('templates', '_probabilities', '_aliases')
+
+    def __init__(self, weighted_templates):
+        """
+        Builds the alias table.
+
+        Parameters
+        ----------
+        weighted_templates : list of tuple
+            (EnemyTemplate, weight) pairs. Weights must be positive.
+
+        Raises
+        ------
+        ValueError
+            If the table is empty or a weight is not positive.
+        """
+        if not weighted_templates:
+            raise ValueError("A spawn table needs at least one enemy")
+        templates = tuple(template for template, _ in weighted_templates)
+        weights = [weight for _, weight in weighted_templates]
+        if min(weights) <= 0:
+            raise ValueError("Spawn weights must be positive")
+
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+        probabilities = [1.0] * count
+        aliases = list(range(count))
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+
+        self.templates = templates
+        self._probabilities = tuple(probabilities)
+        self._aliases = tuple(aliases)
+
+    def sample(self, rng=random):
+        """
+        Picks a template with probability proportional to its weight.
+
+        Parameters
+        ----------
+        rng : random.Random, optional
+            The source of randomness. Defaults to the random module.
+
+        Returns
+        -------
+        EnemyTemplate
+            The chosen template.
+        """
+        position = rng.random() * len(self.templates)
+        index = int(position)
+        if position - index >= self._probabilities[index]:
+            index = self._aliases[index]
+        return self.templates[index]
+
+    def probabilities(self):
+        """
+        Returns the chance of sampling each template, by name.
+        """
+        count = len(self.templates)
+        chances = dict.fromkeys((t.name for t in self.templates), 0.0)
+        for index, template in enumerate(self.templates):
+            chances[template.name] += self._probabilities[index] / count
+            alias = self.templates[self._aliases[index]]
+            chances[alias.name] += (1.0 - self._probabilities[index]) / count
+        return chances
+
+
+def _weight(template, default):
+    return enemies.ENEMY_SPAWN_WEIGHTS.get(template.name, default)
+
+
+def build_spawn_tables():
+    """
+    Compiles a spawn table for every room in the second layer.
+
+    Each table holds the common enemies plus the room's specific enemy,
+    weighted by the spawn weights in the enemies module.
+
+    Returns
+    -------
+    tuple
+        A read-only mapping of room name to SpawnTable, and the table of
+        common enemies used for rooms without one.
+    """
+    common = [validate_template(template)
+              for template in enemies.COMMON_ENEMIES]
+    common_weighted = [(template,
+                        _weight(template, enemies.COMMON_ENEMY_WEIGHT))
+                       for template in common]
+    tables = {}
+    for room in dungeon_areas.ROOMS_SECOND_LAYER:
+        weighted = list(common_weighted)
+        specific = enemies.SPECIFIC_ENEMIES.get(room['name'])
+        if specific is not None:
+            template = validate_template(specific)
+            weighted.append(
+                (template, _weight(template, enemies.SPECIFIC_ENEMY_WEIGHT)))
+        tables[room['name']] = SpawnTable(weighted)
+    return MappingProxyType(tables), SpawnTable(common_weighted)
+
+
+# Built once, when the first enemy is spawned, so the second layer's
+# content is only loaded by sessions that reach it
+_compiled_tables = None
+
+
+def compiled_tables():
+    """
+    Returns the room tables and the common table, building them on first
+    use.
+    """
+    global _compiled_tables
+    if _compiled_tables is None:
+        _compiled_tables = build_spawn_tables()
+    return _compiled_tables
+
+
+def spawn_table(room_name):
+    """
+    Returns the spawn table for a room, falling back to the common enemies
+    for rooms without a table of their own.
+    """
+    tables, common = compiled_tables()
+    return tables.get(room_name, common)
+
+
+def __getattr__(name):
+    # SPAWN_TABLES and COMMON_SPAWN_TABLE are built on first access
+    if name == 'SPAWN_TABLES':
+        return compiled_tables()[0]
+    if name == 'COMMON_SPAWN_TABLE':
+        return compiled_tables()[1]
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
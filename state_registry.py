@@ -0,0 +1,134 @@
+from collections import namedtuple
+
+import commands
+import game_states
+
+# Everything the game loop needs to know about one state
+StateSpec = namedtuple('StateSpec', [
+    'state',        # the state value from game_states
+    'prompt',       # called as prompt(game), returns the prompt text
+    'handler',      # called as handler(game, user_input), or None
+    'transitions',  # states the handler may move to
+    'reads_input',  # whether the loop reads a line before the handler
+    'help_lines',   # command lines shown when help is asked for here
+    'stats_help',   # whether help mentions 'Stats' here
+    'help_text',    # the full help message, filled in by compile_states
+    'commands',     # commands the state accepts besides the universal ones
+    'free_text',    # whether input is free text, such as a name
+    'command_table',  # input to command lookup, filled in by compile_states
+], defaults=(None, None, (), True, (), True, None, (), False, None))
+
+# Help lines shown in every state
+HELP_HEADER = ("\nYou whispered for help... The shadows respond:"
+               "\n'Return'  : Resume your previous action.")
+HELP_STATS = "\n'Stats'   : Understand what you're made of and equipped with."
+HELP_FOOTER = "\n'Exit'    : Wake from the dream and return to reality."
+HELP_SHORTCUTS = ("\nCommands can be shortened while they stay clear, like"
+                  " 'L' for 'Left'.")
+
+
+def known_states():
+    """
+    Returns every state value defined in game_states.
+    """
+    states = set()
+    for layer in (game_states.GENERAL_GAME_STATES,
+                  game_states.FIRST_LAYER_STATES,
+                  game_states.SECOND_LAYER_STATES,
+                  game_states.END_STATES):
+        states.update(layer.values())
+    return states
+
+
+def render_help(spec):
+    """
+    Builds the help message for a state from its help lines.
+
+    Parameters
+    ----------
+    spec : StateSpec
+        The state the player asked for help in.
+
+    Returns
+    -------
+    str
+        The help text to be displayed to the player.
+    """
+    parts = [HELP_HEADER]
+    if spec.stats_help:
+        parts.append(HELP_STATS)
+    parts.extend("\n" + line for line in spec.help_lines)
+    parts.append(HELP_FOOTER)
+    if not spec.free_text:
+        parts.append(HELP_SHORTCUTS)
+    return ''.join(parts)
+
+
+def command_table(spec):
+    """
+    Compiles the table that turns a player's input in a state into the
+    command it stands for.
+
+    States that read a line at the prompt accept the universal commands as
+    well as their own. The rest, such as the fight, read their own
+    commands inside the handler.
+
+    Parameters
+    ----------
+    spec : StateSpec
+        The state to compile the table for.
+
+    Returns
+    -------
+    dict
+        Maps each accepted input to its command.
+    """
+    accepted = tuple(spec.commands)
+    if spec.reads_input:
+        accepted = commands.UNIVERSAL_COMMANDS + accepted
+    return commands.CommandTrie(accepted).compile(
+        complete=not spec.free_text)
+
+
+def compile_states(specs):
+    """
+    Compiles state specs into a lookup table for the game loop.
+
+    Every spec gets its help text rendered and its command table compiled
+    once, and its transitions frozen into a set that always includes the
+    state itself, since invalid input leaves the game where it is.
+
+    Parameters
+    ----------
+    specs : iterable of StateSpec
+        One spec per state.
+
+    Returns
+    -------
+    dict
+        Maps each state value to its compiled StateSpec.
+
+    Raises
+    ------
+    ValueError
+        If a state is registered twice, is not defined in game_states, or
+        lists a transition to a state without a spec.
+    """
+    known = known_states()
+    table = {}
+    for spec in specs:
+        if spec.state not in known:
+            raise ValueError(f"'{spec.state}' is not a game state")
+        if spec.state in table:
+            raise ValueError(f"'{spec.state}' is registered twice")
+        table[spec.state] = spec._replace(
+            transitions=frozenset(spec.transitions) | {spec.state},
+            help_lines=tuple(spec.help_lines),
+            help_text=render_help(spec),
+            command_table=command_table(spec))
+    for spec in table.values():
+        unknown = spec.transitions - table.keys()
+        if unknown:
+            raise ValueError(f"'{spec.state}' moves to unregistered states"
+                             f" {sorted(unknown)}")
+    return table
@@ -0,0 +1,28 @@
+import unittest
+
+import vectorized_combat
+
+
+class ParityTest(unittest.TestCase):
+    """
+    Checks that the vectorized engine gives the same outcome distributions
+    as the scalar Fight class against every enemy template.
+    """
+    def assert_parity(self, seed, policy):
+        for row in vectorized_combat.parity_report(seed=seed, policy=policy):
+            with self.subTest(enemy=row['enemy']):
+                self.assertTrue(row['agrees'], row)
+
+    def test_random_player(self):
+        for seed in (0, 1):
+            with self.subTest(seed=seed):
+                self.assert_parity(seed, 'random')
+
+    def test_fixed_attack_players(self):
+        for policy in ('quick', 'heavy'):
+            with self.subTest(policy=policy):
+                self.assert_parity(0, policy)
+
+
+if __name__ == '__main__':
+    unittest.main()
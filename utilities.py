@@ -1,5 +1,4 @@
-from colorama import Fore, Back, Style, init
-init()
+from colorama import Fore, Back, Style
 
 # Ascii and intro
 lines = [
@@ -37,20 +36,34 @@ def display_intro(lines):
         lines (List[str]): A list of strings representing the introductory
         text.
     """
+    print(render_intro(lines))
+
+
+def render_intro(lines):
+    """
+    Builds the introductory text as one string, so it can be written to
+    the terminal at once.
+
+    Args:
+        lines (List[str]): A list of strings representing the introductory
+        text.
+
+    Returns:
+        str: The lines, padded to the same length and colored red.
+    """
     # Find the maximum length of the lines
     max_length = max(len(line) for line in lines)
 
-    # Print each line with a background color
-    for line in lines:
-        # Fill the line with spaces to the maximum length
-        filled_line = line.ljust(max_length)
-        # Print with the desired foreground and background colors
-        print(Fore.RED + filled_line)
+    # Fill each line with spaces to the maximum length, in red
+    return '\n'.join(Fore.RED + line.ljust(max_length) for line in lines)
+
+
+# Divider, with its colours resolved once
+DIVIDER = Back.RED + Fore.RED + "-" * 80 + Style.RESET_ALL
 
 
-# Divider
 def return_divider():
-    return Back.RED + Fore.RED + "-" * 80 + Style.RESET_ALL
+    return DIVIDER
 
 
 # HP TYPE MODIFIERS
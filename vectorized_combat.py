@@ -0,0 +1,424 @@
+import argparse
+import itertools
+import json
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+import enemies
+import rng_service
+import run
+import simulator
+
+# Action codes used in the arrays, in the order of Fight.ACTIONS
+QUICK, HEAVY, DODGE = range(3)
+
+# Base damage for quick and heavy attacks, as in Fight.attack
+BASE_DAMAGE = {QUICK: 5, HEAVY: 10}
+
+# Probability of each action under the named policies
+POLICY_WEIGHTS = {
+    'random': (1 / 3, 1 / 3, 1 / 3),
+    'quick': (1.0, 0.0, 0.0),
+    'heavy': (0.0, 1.0, 0.0),
+}
+
+# Fights resolved together per chunk when sweeping, to bound memory
+SWEEP_CHUNK = 1_000_000
+
+
+def four_d6_drop_lowest():
+    """
+    Computes the exact distribution of a 4d6 drop lowest ability score,
+    the method used by Character.roll_stats.
+
+    Returns
+    -------
+    dict
+        Maps each score from 3 to 18 to its probability.
+    """
+    counts = Counter(sum(rolls) - min(rolls)
+                     for rolls in itertools.product(range(1, 7), repeat=4))
+    total = sum(counts.values())
+    return {score: count / total for score, count in sorted(counts.items())}
+
+
+def combatant_arrays(entities):
+    """
+    Extracts the combat columns for a list of entities.
+
+    Modifiers, armour class and hit points come from the entities' own
+    calculate_modifier and calculate_ac methods, so the arrays follow the
+    same rules as the scalar Fight class.
+
+    Parameters
+    ----------
+    entities : list of Entity
+        The combatants, one per fight.
+
+    Returns
+    -------
+    dict
+        The 'dex_mod', 'str_mod', 'ac' and 'hit_points' columns as int32
+        arrays.
+    """
+    return {
+        'dex_mod': np.array([e.calculate_modifier(e.dexterity)
+                             for e in entities], dtype=np.int32),
+        'str_mod': np.array([e.calculate_modifier(e.strength)
+                             for e in entities], dtype=np.int32),
+        'ac': np.array([e.calculate_ac() for e in entities],
+                       dtype=np.int32),
+        'hit_points': np.array([e.hit_points for e in entities],
+                               dtype=np.int32),
+    }
+
+
+def table_arrays(table):
+    """
+    Extracts the combat columns from an EntityTable without going through
+    Entity objects. Ability columns are viewed in place.
+
+    Parameters
+    ----------
+    table : entity_table.EntityTable
+        The combatants, one per row.
+
+    Returns
+    -------
+    dict
+        The same columns as combatant_arrays.
+    """
+    dexterity = np.frombuffer(table.dexterity, dtype=np.int8)
+    strength = np.frombuffer(table.strength, dtype=np.int8)
+    return {
+        'dex_mod': (dexterity.astype(np.int32) - 5) // 2,
+        'str_mod': (strength.astype(np.int32) - 5) // 2,
+        'ac': np.frombuffer(table.ac_column(), dtype=np.int16)
+                .astype(np.int32),
+        'hit_points': np.frombuffer(table.hit_points, dtype=np.int16)
+                        .astype(np.int32),
+    }
+
+
+def repeat_combatant(entity, count):
+    """
+    Builds combat columns for the same entity fighting count times.
+    """
+    columns = combatant_arrays([entity])
+    return {name: np.repeat(column, count)
+            for name, column in columns.items()}
+
+
+def _choose_actions(policy, count, rng):
+    """
+    Draws an action code for each of count fights under a policy.
+    """
+    weights = POLICY_WEIGHTS[policy] if isinstance(policy, str) else policy
+    if weights[0] == 1.0:
+        return np.full(count, QUICK, dtype=np.int8)
+    if weights[1] == 1.0:
+        return np.full(count, HEAVY, dtype=np.int8)
+    return rng.choice(3, size=count, p=weights).astype(np.int8)
+
+
+def simulate(player, enemy, player_policy='random', enemy_policy='random',
+             rng=None):
+    """
+    Resolves many independent fights in lockstep.
+
+    Every fight follows Fight.run: initiative on d20 plus dexterity
+    modifier with ties going to the player, then alternating turns where
+    the actor either dodges or attacks. An attack hits when d20 plus the
+    attack modifier reaches the defender's AC, plus d6 and the defender's
+    dexterity modifier if they are dodging. A dodge lasts until the
+    dodger's next turn.
+
+    Parameters
+    ----------
+    player : dict
+        Combat columns for the player side, as from combatant_arrays.
+    enemy : dict
+        Combat columns for the enemy side, the same length as player.
+    player_policy : str or tuple, optional
+        'random', 'quick', 'heavy' or the probabilities of quick, heavy
+        and dodge. Defaults to 'random'.
+    enemy_policy : str or tuple, optional
+        As player_policy, for the enemy. Defaults to 'random', the default
+        enemy_ai policy. Policies that look at the fight, such as greedy
+        or expectimax, cannot be simulated here.
+    rng : numpy.random.Generator, optional
+        The random generator to draw dice from.
+
+    Returns
+    -------
+    dict
+        Per-fight arrays: 'player_won', 'turns', 'damage_dealt',
+        'damage_taken', 'player_hit_points' and 'enemy_hit_points'. Hit
+        points left are never below 0, as in simulator.FightResult.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    count = len(player['hit_points'])
+    # Row 0 is the player side and row 1 the enemy side
+    hit_points = np.stack([player['hit_points'],
+                           enemy['hit_points']]).astype(np.int32)
+    start_hit_points = hit_points.copy()
+    dex_mod = np.stack([player['dex_mod'], enemy['dex_mod']])
+    str_mod = np.stack([player['str_mod'], enemy['str_mod']])
+    ac = np.stack([player['ac'], enemy['ac']])
+    dodging = np.zeros((2, count), dtype=bool)
+    turns = np.zeros(count, dtype=np.int32)
+    policies = (player_policy, enemy_policy)
+
+    # Determine who goes first based on initiative
+    player_initiative = rng.integers(1, 21, count) + dex_mod[0]
+    enemy_initiative = rng.integers(1, 21, count) + dex_mod[1]
+    attacker = np.where(player_initiative >= enemy_initiative, 0, 1)
+
+    active = np.flatnonzero((hit_points[0] > 0) & (hit_points[1] > 0))
+    while active.size:
+        actor = attacker[active]
+        defender = 1 - actor
+        actions = np.empty(active.size, dtype=np.int8)
+        for side in (0, 1):
+            on_turn = actor == side
+            actions[on_turn] = _choose_actions(policies[side],
+                                               int(on_turn.sum()), rng)
+
+        # The actor's previous dodge ends as their own turn begins
+        dodging[actor, active] = False
+        dodging[actor, active] = actions == DODGE
+
+        attacks = actions != DODGE
+        fights = active[attacks]
+        attack_actor = actor[attacks]
+        attack_defender = defender[attacks]
+        attack_actions = actions[attacks]
+        modifier = np.where(attack_actions == QUICK,
+                            dex_mod[attack_actor, fights],
+                            str_mod[attack_actor, fights])
+        attack_roll = rng.integers(1, 21, fights.size) + modifier
+        defender_dodging = dodging[attack_defender, fights]
+        dodge_bonus = np.where(
+            defender_dodging,
+            rng.integers(1, 7, fights.size)
+            + dex_mod[attack_defender, fights], 0)
+        hit = attack_roll >= ac[attack_defender, fights] + dodge_bonus
+        damage = np.where(attack_actions == QUICK, BASE_DAMAGE[QUICK],
+                          BASE_DAMAGE[HEAVY]) + modifier
+        hit_points[attack_defender[hit], fights[hit]] -= damage[hit]
+
+        turns[active] += 1
+        attacker[active] = defender
+        alive = (hit_points[0, active] > 0) & (hit_points[1, active] > 0)
+        active = active[alive]
+
+    return {
+        'player_won': hit_points[1] <= 0,
+        'turns': turns,
+        'damage_dealt': start_hit_points[1] - hit_points[1],
+        'damage_taken': start_hit_points[0] - hit_points[0],
+        'player_hit_points': np.maximum(hit_points[0], 0),
+        'enemy_hit_points': np.maximum(hit_points[1], 0),
+    }
+
+
+def summarise(results):
+    """
+    Aggregates the arrays returned by simulate into the same averages as
+    simulator.summarise.
+    """
+    count = len(results['turns'])
+    if count == 0:
+        return {'fights': 0}
+    return {
+        'fights': count,
+        'win_rate': float(results['player_won'].mean()),
+        'mean_turns': float(results['turns'].mean()),
+        'mean_damage_dealt': float(results['damage_dealt'].mean()),
+        'mean_damage_taken': float(results['damage_taken'].mean()),
+        'mean_player_hit_points':
+            float(results['player_hit_points'].mean()),
+        'mean_enemy_hit_points': float(results['enemy_hit_points'].mean()),
+    }
+
+
+def enemy_templates():
+    """
+    Returns every enemy template, common and room-specific.
+    """
+    return (enemies.COMMON_ENEMIES
+            + list(enemies.SPECIFIC_ENEMIES.values()))
+
+
+def stat_line_heroes(scores=range(3, 19)):
+    """
+    Creates one hero for every strength and dexterity pair a 4d6 roll can
+    produce. The other abilities do not affect combat.
+
+    Returns
+    -------
+    list of tuple
+        (hero, probability) pairs, the probability being that of rolling
+        that strength and dexterity.
+    """
+    distribution = four_d6_drop_lowest()
+    heroes = []
+    for strength in scores:
+        for dexterity in scores:
+            hero = run.Character('hero')
+            hero.strength = strength
+            hero.dexterity = dexterity
+            heroes.append((hero, distribution[strength]
+                           * distribution[dexterity]))
+    return heroes
+
+
+def sweep(fights_per_matchup=1000, player_policy='random',
+          enemy_policy='random', rng=None):
+    """
+    Evaluates every 4d6 strength and dexterity line against every enemy
+    template.
+
+    Parameters
+    ----------
+    fights_per_matchup : int, optional
+        Fights simulated for each hero and enemy pair. Defaults to 1000.
+    player_policy, enemy_policy : str or tuple, optional
+        The policies passed to simulate. enemy_policy is used for every
+        template, whatever policy the template names.
+    rng : numpy.random.Generator, optional
+        The random generator to draw dice from.
+
+    Returns
+    -------
+    list of dict
+        One row per matchup with the hero's strength, dexterity and
+        probability, the enemy name, the win rate and the mean turns.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    matchups = [(hero, weight, simulator.create_enemy(template))
+                for hero, weight in stat_line_heroes()
+                for template in enemy_templates()]
+    per_chunk = max(1, SWEEP_CHUNK // fights_per_matchup)
+    rows = []
+    for first in range(0, len(matchups), per_chunk):
+        chunk = matchups[first:first + per_chunk]
+        player = combatant_arrays(
+            [hero for hero, _, _ in chunk for _ in range(fights_per_matchup)])
+        enemy = combatant_arrays(
+            [foe for _, _, foe in chunk for _ in range(fights_per_matchup)])
+        results = simulate(player, enemy, player_policy, enemy_policy, rng)
+        won = results['player_won'].reshape(len(chunk), -1)
+        turns = results['turns'].reshape(len(chunk), -1)
+        for index, (hero, weight, foe) in enumerate(chunk):
+            rows.append({
+                'strength': hero.strength,
+                'dexterity': hero.dexterity,
+                'probability': weight,
+                'enemy': foe.name,
+                'win_rate': float(won[index].mean()),
+                'mean_turns': float(turns[index].mean()),
+            })
+    return rows
+
+
+def parity_report(fights=20000, seed=0, policy='random'):
+    """
+    Compares the vectorized engine with the scalar Fight class for a rolled
+    hero against every enemy template.
+
+    For each enemy the win rates must agree within four standard errors
+    and the distributions of fight length within a total variation
+    distance of 0.03. Samples much smaller than the default put the
+    sampling noise above that tolerance, so they fail even when the
+    engines agree.
+
+    Parameters
+    ----------
+    fights : int, optional
+        Fights simulated by each engine per enemy. Defaults to 20000.
+    seed : int, optional
+        Seed for the hero's stats and both engines' dice. Defaults to 0.
+    policy : str, optional
+        The player policy name used by both engines. Defaults to 'random'.
+
+    Returns
+    -------
+    list of dict
+        One row per enemy with both win rates, the turn distribution
+        distance and whether the engines agree.
+    """
+    rng = np.random.default_rng(seed)
+    hero = simulator.create_hero(seed=seed)
+    rows = []
+    for template in enemy_templates():
+        enemy = simulator.create_enemy(template)
+        scalar = list(simulator.simulate_fights(
+            hero, enemy, fights, simulator.POLICIES[policy],
+            rng=rng_service.RngService(seed).stream('combat')))
+        vector = simulate(repeat_combatant(hero, fights),
+                          repeat_combatant(enemy, fights), policy,
+                          'random', rng)
+        scalar_wins = sum(r.winner == 'player' for r in scalar) / fights
+        vector_wins = float(vector['player_won'].mean())
+        pooled = (scalar_wins + vector_wins) / 2
+        error = max((2 * pooled * (1 - pooled) / fights) ** 0.5, 1e-9)
+        scalar_turns = Counter(r.turns for r in scalar)
+        vector_turns = Counter(vector['turns'].tolist())
+        distance = sum(abs(scalar_turns[t] - vector_turns[t])
+                       for t in scalar_turns.keys() | vector_turns.keys())
+        distance /= 2 * fights
+        rows.append({
+            'enemy': enemy.name,
+            'scalar_win_rate': scalar_wins,
+            'vector_win_rate': vector_wins,
+            'turns_distance': round(distance, 4),
+            'agrees': (abs(scalar_wins - vector_wins) <= 4 * error
+                       and distance <= 0.03),
+        })
+    return rows
+
+
+def main(argv=None):
+    """
+    Runs a timed sweep or the parity check from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Evaluate fights in bulk with NumPy arrays.")
+    parser.add_argument('--parity', action='store_true',
+                        help="compare against the scalar Fight class")
+    parser.add_argument('--fights', type=int, default=None,
+                        help="fights per matchup, 1000 for a sweep and"
+                             " 20000 for --parity by default")
+    parser.add_argument('--policy', choices=sorted(POLICY_WEIGHTS),
+                        default='random')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.parity:
+        # The turn distance tolerance needs parity_report's default sample
+        # size to stay above the sampling noise
+        fights = 20000 if args.fights is None else args.fights
+        rows = parity_report(fights, args.seed or 0, args.policy)
+        print(json.dumps(rows, indent=2))
+        return 0 if all(row['agrees'] for row in rows) else 1
+
+    fights = 1000 if args.fights is None else args.fights
+    start = time.perf_counter()
+    rows = sweep(fights, args.policy, rng=np.random.default_rng(args.seed))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'matchups': len(rows),
+        'fights': len(rows) * fights,
+        'seconds': round(elapsed, 3),
+        'weighted_win_rate': sum(row['win_rate'] * row['probability']
+                                 for row in rows) / len(enemy_templates()),
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
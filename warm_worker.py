@@ -0,0 +1,42 @@
+import sys
+import termios
+
+# Importing run also imports dungeon_areas, enemies, objects and utilities
+import run
+
+# Written once the imports are done so the pool knows the worker is warm
+READY_MARKER = '\x1b]0;subterranean-script-ready\x07'
+
+
+def park():
+    """
+    Waits for the pool to hand this worker a connection.
+
+    The worker announces that it is ready and then blocks on a single line
+    of input with terminal echo switched off, so the hand-off line written
+    by the pool never reaches the player's screen.
+
+    Returns
+    -------
+    bool
+        True if a connection was handed over, False if the terminal closed
+        while the worker was parked.
+    """
+    saved_attributes = None
+    if sys.stdin.isatty():
+        saved_attributes = termios.tcgetattr(sys.stdin)
+        attributes = termios.tcgetattr(sys.stdin)
+        attributes[3] &= ~termios.ECHO
+        termios.tcsetattr(sys.stdin, termios.TCSANOW, attributes)
+    try:
+        sys.stdout.write(READY_MARKER)
+        sys.stdout.flush()
+        return sys.stdin.readline() != ''
+    finally:
+        if saved_attributes is not None:
+            termios.tcsetattr(sys.stdin, termios.TCSANOW, saved_attributes)
+
+
+if __name__ == '__main__':
+    if park():
+        run.main()